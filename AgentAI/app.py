@@ -1,18 +1,53 @@
 from typing import Dict, List, Optional, Any, Union, Tuple
 import os
 import json
-from fastapi import FastAPI, APIRouter, Body
+import asyncio
+import logging
+import hmac
+import gzip
+import hashlib
+import functools
+import itertools
+import time
+from fastapi import FastAPI, APIRouter, Body, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 import httpx
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 try:
     import pymysql
     from pymysql.cursors import DictCursor
     PYMYSQL_AVAILABLE = True
 except Exception:
     PYMYSQL_AVAILABLE = False
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except Exception:
+    BROTLI_AVAILABLE = False
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except Exception:
+    MSGPACK_AVAILABLE = False
+from plan_cache import plan_cache_from_env, plan_cache_key
+from ranking import PreferenceVector, rank_candidates, venue_attributes
+from ingest import SearchResult, ingest, parse_response, relevant_or_all
+from hedging import hedger_from_env
+from sessions import PlanSession, apply_delta, session_store_from_env
+from query_planner import INTENT_RESULTS, LOCAL_CATALOG, Query, query_planner_from_env
+from dedup import deduper_from_env
+from saturation import INFLIGHT_REQUESTS, loop_lag_monitor_from_env, run_blocking
+from capture import capture_from_env, record_upstream, recording
+from enrichment import enricher_from_env, gazetteer_city, geocode
+from itinerary import Mobility, TripSchedule, schedule_trip
+from plan_store import plan_store_from_env
+from property_index import PropertyIndex
+from scheduler import SCHEDULERS, SchedulerRejected, background
+import metrics
+import profiler
 
 # Load environment variables from .env if present
 load_dotenv()
@@ -63,6 +98,9 @@ class Booking(BaseModel):
     party_type: Optional[str] = None  # couple|family|solo|friends
     party_size: Optional[int] = None
     children_ages: Optional[List[int]] = None
+    # The stored booking this trip is for, if any; its precomputed context is reused (plan_store.py)
+    booking_id: Optional[str] = None
+    property_id: Optional[str] = None
 
 class ContextFlags(BaseModel):
     weather: Optional[str] = "auto"  # auto|provided
@@ -75,18 +113,26 @@ class AgentV2Input(BaseModel):
     nlu_query: Optional[str] = None
     context: Optional[ContextFlags] = None
     context_overrides: Optional[Dict[str, Any]] = None
+    itinerary_cursor: Optional[str] = None  # next_cursor from a previous response's itinerary_page
 
 class Geo(BaseModel):
     lat: float
     lng: float
+    precision: Optional[str] = None  # exact|place|city; a city centroid is not the venue's location
+
+def _located(geo: Optional[Geo]) -> bool:
+    """True when `geo` places the venue itself (not 0,0 and not just its city's centroid)."""
+    return geo is not None and (geo.lat, geo.lng) != (0.0, 0.0) and geo.precision != "city"
 
 class Activity(BaseModel):
     id: str
     title: str
     address: Optional[str] = ""
     geo: Optional[Geo] = None
+    hours: Optional[str] = None  # e.g. "daily 09:00-17:00", from enrichment
     price_tier: Optional[str] = None  # $|$$|$$$|$$$$
     duration_minutes: Optional[int] = None
+    best_time: Optional[str] = None  # morning|afternoon|evening, when the venue is best visited
     tags: Optional[List[str]] = None
     wheelchair_friendly: Optional[bool] = None
     child_friendly: Optional[bool] = None
@@ -98,16 +144,25 @@ class Restaurant(BaseModel):
     name: str
     address: Optional[str] = ""
     geo: Optional[Geo] = None
+    hours: Optional[str] = None
     dietary_match: Optional[List[str]] = None
     price_tier: Optional[str] = None
     kid_friendly: Optional[bool] = None
     reservation_link: Optional[str] = None
     source: Optional[Dict[str, Any]] = None
 
+class ItinerarySlot(BaseModel):
+    activity: str
+    start: str  # HH:MM
+    end: str
+    travel_minutes: int  # from the previous stop
+    mode: str  # start|walk|transit|unknown
+
 class ItineraryBlock(BaseModel):
     time_block: str  # morning|afternoon|evening
     summary: str
     activities: List[str]
+    slots: Optional[List[ItinerarySlot]] = None
 
 class ItineraryDay(BaseModel):
     date: str
@@ -136,6 +191,16 @@ class AgentLegacyInput(BaseModel):
     preferences: Dict[str, Any]
     local_context: Optional[Dict[str, Any]] = None
     nlu_prompt: Optional[str] = None
+    itinerary_cursor: Optional[str] = None
+
+class PlanDelta(BaseModel):
+    """Partial AgentV2Input for a plan-session edit; objects merge into the session's request, other values replace."""
+    booking: Optional[Dict[str, Any]] = None
+    preferences: Optional[Dict[str, Any]] = None
+    nlu_query: Optional[str] = None
+    context: Optional[Dict[str, Any]] = None
+    context_overrides: Optional[Dict[str, Any]] = None
+    itinerary_cursor: Optional[str] = None
 
 
 # ------------------------------
@@ -158,14 +223,90 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Plan-Session", "Location"],
 )
 router = APIRouter(prefix="/api/v1", tags=["concierge-agent"]) 
 
+# Requests being served, one of the custom-metric HPA's signals (saturation.py); probes and scrapes don't count
+@app.middleware("http")
+async def _track_inflight(request: Request, call_next):
+    if request.url.path in ("/health", "/metrics"):
+        return await call_next(request)
+    INFLIGHT_REQUESTS.inc()
+    try:
+        return await call_next(request)
+    finally:
+        INFLIGHT_REQUESTS.dec()
+
+loop_lag_monitor = loop_lag_monitor_from_env()
+
+@app.on_event("startup")
+async def _start_loop_lag_monitor() -> None:
+    if loop_lag_monitor is not None:
+        loop_lag_monitor.start()
+
+@app.on_event("shutdown")
+async def _stop_loop_lag_monitor() -> None:
+    if loop_lag_monitor is not None:
+        loop_lag_monitor.stop()
+
 # Simple health endpoint for container probes
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "agentai", "timestamp": datetime.utcnow().isoformat()}
 
+# Prometheus text exposition of in-process metrics
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return metrics.REGISTRY.render_prometheus()
+
+# On-demand sampling profiler. Off unless PROFILE_ENABLED is set *and* a PROFILE_TOKEN is configured;
+# callers must send the token as `X-Debug-Token`.
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 10.0, format: str = "collapsed", hz: int = 200, idle: bool = False,
+                        x_debug_token: Optional[str] = Header(None)):
+    if not (PROFILE_ENABLED and PROFILE_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not hmac.compare_digest(x_debug_token, PROFILE_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid debug token")
+    if format not in ("collapsed", "speedscope"):
+        raise HTTPException(status_code=400, detail="format must be collapsed or speedscope")
+    if not profiler.try_acquire():
+        raise HTTPException(status_code=409, detail="a profile is already running")
+    try:
+        prof = profiler.SamplingProfiler(interval=1.0 / max(1, min(hz, 1000)), include_idle=idle).start()
+        try:
+            await asyncio.sleep(max(0.1, min(seconds, PROFILE_MAX_SECONDS)))
+        finally:
+            prof.stop()
+    finally:
+        profiler.release()
+    summary = prof.summary()
+    headers = {f"X-Profile-{k.replace('_', '-').title()}": str(v) for k, v in summary.items()}
+    if format == "speedscope":
+        return JSONResponse(prof.speedscope(), headers=headers)
+    return PlainTextResponse(prof.collapsed(), headers=headers)
+
+# Sampled, PII-scrubbed request capture for replay.py (capture.py). Off unless CAPTURE_ENABLED is set; the ring is read
+# with the same `X-Debug-Token` scheme as the profiler (CAPTURE_TOKEN, defaulting to PROFILE_TOKEN).
+traffic_capture = capture_from_env()
+CAPTURE_TOKEN = os.getenv("CAPTURE_TOKEN", PROFILE_TOKEN)
+
+@app.get("/debug/capture")
+def debug_capture(clear: bool = False, x_debug_token: Optional[str] = Header(None)):
+    """The captured records as JSON lines, oldest first; `clear=true` empties the ring."""
+    if traffic_capture is None or not CAPTURE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_debug_token or not hmac.compare_digest(x_debug_token, CAPTURE_TOKEN):
+        raise HTTPException(status_code=401, detail="invalid debug token")
+    return Response(content="".join(traffic_capture.jsonl(clear)), media_type="application/x-ndjson")
+
+PLAN_REQUESTS = metrics.counter("agentai_plan_requests_total", "Concierge plans served, by cache outcome")
+
 
 # ------------------------------
 # Task 2: LangChain Tools & Agent Core
@@ -232,6 +373,25 @@ if LANGCHAIN_AVAILABLE:
         )
         return agent
 
+# Near-duplicate plan cache (None when disabled or NumPy is missing)
+plan_cache = plan_cache_from_env()
+# Upstream query planning (fewest searches per plan) and its per-intent search cache
+query_planner = query_planner_from_env()
+QUERY_PLANS = metrics.counter("agentai_query_plans_total", "Upstream query plans by level (full, reduced, minimal, cached, legacy)")
+UPSTREAM_CALLS = metrics.histogram("agentai_upstream_calls_per_plan", "Tavily searches issued per plan",
+                                   buckets=(0, 1, 2, 3, 4, 5))
+# Near-duplicate venue collapsing across a plan's searches and the city's recent venues (None when disabled)
+venue_deduper = deduper_from_env()
+VENUE_DUPLICATES = metrics.counter("agentai_venue_duplicates_total", "Search results collapsed as near-duplicate venues")
+# Plan sessions for incremental edits (None when disabled)
+plan_sessions = session_store_from_env()
+PLAN_SESSION_SECONDS = metrics.histogram("agentai_plan_session_seconds", "Plan-session latency, full plan vs edit",
+                                         buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+# Ranking stage output sizes
+ACTIVITY_TOP_K = int(os.getenv("ACTIVITY_TOP_K", "16"))
+RESTAURANT_TOP_K = int(os.getenv("RESTAURANT_TOP_K", "6"))
+
 def _slugify(s: str) -> str:
     return ''.join(ch.lower() if ch.isalnum() else '-' for ch in s).strip('-')[:64]
 
@@ -288,9 +448,62 @@ def _db_connect_to(database_name: str):
     port = int(os.getenv("DB_PORT", "3306"))
     return pymysql.connect(host=host, user=user, password=password, database=database_name, port=port, cursorclass=DictCursor, autocommit=True)
 
+# In-memory replica of active properties (see property_index.py); SQL is the fallback
+property_index = PropertyIndex(
+    _db_connect,
+    full_resync_seconds=float(os.getenv("PROPERTY_INDEX_FULL_RESYNC_SECONDS", "3600")),
+    cell_km=float(os.getenv("PROPERTY_GEO_CELL_KM", "2")),
+    band_km=float(os.getenv("PROPERTY_GEO_BAND_KM", "0.5")),
+) if PYMYSQL_AVAILABLE and os.getenv("PROPERTY_INDEX_ENABLED", "true").lower() not in ("0", "false", "no") else None
+PROPERTY_INDEX_POLL_SECONDS = float(os.getenv("PROPERTY_INDEX_POLL_SECONDS", "30"))
+PROPERTY_INDEX_MAX_STALENESS = float(os.getenv("PROPERTY_INDEX_MAX_STALENESS_SECONDS", "300"))
+
+def _property_index_staleness() -> Optional[float]:
+    """Seconds since the property index synced, or None if it is not loaded or too stale to serve."""
+    if property_index is None or not property_index.ready:
+        return None
+    staleness = property_index.staleness_seconds()
+    if staleness is None or staleness > PROPERTY_INDEX_MAX_STALENESS:
+        return None
+    return staleness
+
+def _properties_from_index(location: str, limit: int = 10) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Serve a location lookup from the property index, or None if it is not loaded or too stale."""
+    staleness = _property_index_staleness()
+    if staleness is None:
+        return None
+    rows = property_index.lookup(location, limit)
+    return rows, {
+        "source": "index",
+        "staleness_seconds": round(staleness, 1),
+        "counts": {"active_total": len(property_index), "filtered": len(rows)},
+    }
+
+# Stays near the plan: listings ranked by mean distance to the activities (then price), within PROPERTY_NEAR_MAX_KM
+PROPERTY_NEAR_MAX_KM = float(os.getenv("PROPERTY_NEAR_MAX_KM", "25"))
+
+def _properties_near(points: List[Tuple[float, float]], limit: int = 10) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+    """Listings nearest to `points` from the property index, or None if there is nothing to rank by."""
+    staleness = _property_index_staleness()
+    if not points or staleness is None or not property_index.geo_count():
+        return None
+    rows = property_index.nearest(points, limit, PROPERTY_NEAR_MAX_KM)
+    if not rows:
+        return None
+    return rows, {
+        "source": "index",
+        "ranking": "proximity",
+        "anchor_points": len(points),
+        "staleness_seconds": round(staleness, 1),
+        "counts": {"active_total": len(property_index), "filtered": len(rows)},
+    }
+
 def _fetch_properties_by_location(location: str, limit: int = 10) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
     if not location:
         return [], {"reason": "no_location"}
+    indexed = _properties_from_index(location, limit)
+    if indexed is not None:
+        return indexed
     if not PYMYSQL_AVAILABLE:
         return [], {"reason": "pymysql_not_available"}
     like_core = f"%{location.strip()}%"
@@ -366,38 +579,190 @@ def _fetch_properties_by_location(location: str, limit: int = 10) -> Tuple[List[
     dbg["counts"]["filtered"] = len(normalized)
     return normalized, dbg
 
-async def _tavily_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-    """Prefer official Tavily client if available; otherwise fallback to raw HTTP API."""
+def _fetch_booking_context(booking_id: Optional[Any] = None, property_id: Optional[Any] = None) -> Optional[Dict[str, Any]]:
+    """Look up dates/guests/location for a booking (or just the location of a property)."""
+    if not PYMYSQL_AVAILABLE or (booking_id is None and property_id is None):
+        return None
+    conn = _db_connect()
+    try:
+        with conn.cursor() as cur:
+            if booking_id is not None:
+                cur.execute(
+                    "SELECT b.id, b.check_in_date, b.check_out_date, b.number_of_guests, b.status, p.city, p.state, p.country "
+                    "FROM bookings b JOIN properties p ON p.id = b.property_id WHERE b.id = %s",
+                    (booking_id,),
+                )
+            else:
+                cur.execute("SELECT p.city, p.state, p.country FROM properties p WHERE p.id = %s", (property_id,))
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+# Shared store of plans precomputed by the booking consumer (None unless PRECOMPUTE_STORE is set)
+plan_store = plan_store_from_env(_db_connect if PYMYSQL_AVAILABLE else None)
+
+PROPERTY_INDEX_SIZE = metrics.gauge("agentai_property_index_size", "Active properties held in the in-memory index")
+PROPERTY_INDEX_STALENESS = metrics.gauge("agentai_property_index_staleness_seconds", "Seconds since the property index last synced")
+PROPERTY_INDEX_SYNCS = metrics.counter("agentai_property_index_syncs_total", "Property index sync attempts by outcome")
+
+def _collect_property_index_metrics() -> None:
+    if property_index is None:
+        return
+    PROPERTY_INDEX_SIZE.set(len(property_index))
+    staleness = property_index.staleness_seconds()
+    if staleness is not None:
+        PROPERTY_INDEX_STALENESS.set(round(staleness, 3))
+
+metrics.REGISTRY.add_collector(_collect_property_index_metrics)
+
+async def _property_index_loop() -> None:
+    """Load the property index, then poll for changes past the watermark."""
+    while True:
+        try:
+            with background():
+                changed = await _run_db(property_index.incremental_sync)
+            PROPERTY_INDEX_SYNCS.inc(outcome="ok")
+            if changed:
+                logging.getLogger("agentai").info("property index synced %d rows (%d active)", changed, len(property_index))
+        except Exception as e:
+            PROPERTY_INDEX_SYNCS.inc(outcome="error")
+            logging.getLogger("agentai").warning("property index sync failed: %s", e)
+        await asyncio.sleep(PROPERTY_INDEX_POLL_SECONDS)
+
+@app.on_event("startup")
+async def _start_property_index() -> None:
+    if property_index is not None:
+        asyncio.get_event_loop().create_task(_property_index_loop())
+
+async def _run_db(fn, *args):
+    """Run a blocking DB call in the executor under the outbound DB scheduler."""
+    async with SCHEDULERS["db"].slot():
+        return await run_blocking(fn, *args)
+
+# Enrichment (address, hours, price, coordinates) runs in a process pool off the event loop, cached by URL + content hash
+enricher = enricher_from_env()
+
+@app.on_event("startup")
+async def _start_enricher() -> None:
+    if enricher is not None:
+        await run_blocking(enricher.warm)
+
+@app.on_event("shutdown")
+async def _stop_enricher() -> None:
+    if enricher is not None:
+        enricher.close()
+
+def _geo(coords: Optional[Tuple[float, float]], precision: Optional[str] = None) -> Geo:
+    return Geo(lat=coords[0], lng=coords[1], precision=precision) if coords else Geo(lat=0.0, lng=0.0)
+
+# Hedging: a search slower than the recent HEDGE_QUANTILE latency gets a backup, either a second upstream attempt
+# or (HEDGE_BACKUP=local, when the search has a local source) the fallback catalog; first usable answer wins
+tavily_hedger = hedger_from_env("tavily")
+HEDGE_BACKUP = os.getenv("HEDGE_BACKUP", "upstream").lower()
+
+def _hedge_key(depth: str, max_results: int) -> Tuple[str, str]:
+    """Latency window for a search: depth and result-size bucket (advanced and large searches run slower)."""
+    for cap in (5, 10):
+        if max_results <= cap:
+            return depth, f"<={cap}"
+    return depth, ">10"
+
+@functools.lru_cache(maxsize=None)
+def _load_fallback(name: str) -> Dict[str, Any]:
+    with open(os.path.join(os.path.dirname(__file__), "fallbacks", f"{name}.json"), "r") as f:
+        return json.load(f)
+
+def _catalog_covers(name: str, location: Optional[str]) -> bool:
+    """True when the fallback catalog has city-specific entries (not just the defaults) for `location`."""
+    return bool(_load_fallback(name).get("by_city", {}).get((location or "").lower().strip()))
+
+def _fallback_search(name: str, location: Optional[str], limit: int) -> List[SearchResult]:
+    """Fallback catalog entries ("activities" or "restaurants") for a city, as search records."""
+    data = _load_fallback(name)
+    city_key = (location or "").lower().strip()
+    out = []
+    for it in data.get("by_city", {}).get(city_key, data.get("default", []))[:limit]:
+        title = it.get("title") or it.get("name") or ""
+        venue = venue_attributes(" ".join([title] + list(it.get("tags") or [])))
+        if it.get("dietary_match") is not None:
+            venue["dietary"] = it["dietary_match"]
+        out.append(SearchResult(title, None, "", it.get("price_tier"), venue, relevant=True, source="fallback"))
+    return out
+
+# Search endpoint; point it at a stand-in upstream for load tests (benchmarks/bench_saturation.py)
+TAVILY_DEFAULT_URL = "https://api.tavily.com/search"
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", TAVILY_DEFAULT_URL)
+
+async def _tavily_search(query: str, max_results: int = 5, location: Optional[str] = None,
+                         local: Optional[str] = None, depth: str = "advanced",
+                         deadline: Optional[float] = None) -> List[SearchResult]:
+    """Search Tavily through the outbound scheduler; returns [] when disabled or shed.
+    Results are projected at parse time, with relevance to `location` precomputed. `local` names the
+    fallback catalog usable as a hedge backup for this search. `depth` is "advanced" or "basic".
+    `deadline` (monotonic) sheds the search if it is still waiting for a slot then."""
     api_key = os.getenv("TAVILY_API_KEY")
     if not api_key:
         return []
-    # Try official client first
+    aliases = _city_aliases(location)
+
+    async def upstream() -> List[SearchResult]:
+        try:
+            async with SCHEDULERS["tavily"].slot(deadline=deadline):
+                return await _tavily_search_upstream(query, max_results, api_key, aliases, depth)
+        except SchedulerRejected:
+            return []
+
+    if tavily_hedger is None:
+        results = await upstream()
+        if enricher is not None and results:
+            await enricher.enrich(results, location)
+        return results
+    backup = upstream
+    if HEDGE_BACKUP == "local" and local:
+        async def backup() -> List[SearchResult]:
+            return _fallback_search(local, location, max_results)
+    results, _ = await tavily_hedger.run(upstream, backup, key=_hedge_key(depth, max_results))
+    if enricher is not None and results:
+        await enricher.enrich(results, location)
+    return results
+
+async def _tavily_search_upstream(query: str, max_results: int, api_key: str, aliases: List[str],
+                                  depth: str = "advanced") -> List[SearchResult]:
+    """Prefer official Tavily client if available; otherwise fallback to raw HTTP API."""
+    # Try official client first (it always talks to api.tavily.com)
     try:
+        if TAVILY_API_URL != TAVILY_DEFAULT_URL:
+            raise RuntimeError("custom Tavily endpoint")
         from tavily import TavilyClient  # type: ignore
         client = TavilyClient(api_key)
         # Tavily client is sync; call it in a thread to avoid blocking
-        import asyncio
-        loop = asyncio.get_event_loop()
-        resp = await loop.run_in_executor(None, lambda: client.search(query=query, max_results=max_results, search_depth="advanced", include_answers=False))
-        # Normalize to match our structure
-        results = resp.get("results") or []
-        return results
+        t0 = time.perf_counter()
+        resp = await run_blocking(lambda: client.search(query=query, max_results=max_results, search_depth=depth, include_answers=False, include_raw_content=False))
+        # The search call alone: hedging and enrichment time are not the upstream's
+        query_planner.observe(depth, time.perf_counter() - t0)
+        record_upstream(query, depth, max_results, time.perf_counter() - t0, 200, resp)
+        # Project to compact records
+        return ingest(resp.get("results") or [], aliases, keep_content=enricher is not None)
     except Exception:
         # Fallback to HTTP
         try:
             async with httpx.AsyncClient(timeout=20) as client:
+                t0 = time.perf_counter()
                 resp = await client.post(
-                    "https://api.tavily.com/search",
+                    TAVILY_API_URL,
                     json={
                         "api_key": api_key,
                         "query": query,
-                        "search_depth": "advanced",
+                        "search_depth": depth,
                         "include_answers": False,
+                        "include_raw_content": False,
                         "max_results": max_results,
                     },
                 )
-                data = resp.json()
-                return data.get("results", []) or []
+                if resp.status_code == 200:
+                    query_planner.observe(depth, time.perf_counter() - t0)
+                record_upstream(query, depth, max_results, time.perf_counter() - t0, resp.status_code, resp.content)
+                return parse_response(resp.content, aliases, keep_content=enricher is not None)
         except Exception:
             return []
 
@@ -469,42 +834,6 @@ def _city_aliases(location: Optional[str]) -> List[str]:
             uniq.append(a)
     return uniq
 
-def _filter_results_by_location(results: List[Dict[str, Any]], location: Optional[str]) -> List[Dict[str, Any]]:
-    """Filter Tavily results to those that likely belong to the requested city.
-    Strategy:
-    - Build city aliases and require at least one alias to appear in title/content/url
-    - If this yields nothing, loosen to matching the raw location substring
-    - If still empty, return the original results
-    """
-    if not results or not location:
-        return results
-    aliases = _city_aliases(location)
-    if not aliases:
-        return results
-    def text_of(item: Dict[str, Any]) -> str:
-        return _normalize_str(
-            f"{item.get('title','')} {item.get('content','') or item.get('snippet','')} {item.get('url','')}"
-        )
-    filtered = [it for it in results if any(a in text_of(it) for a in aliases)]
-    if filtered:
-        return filtered
-    # Loosen to raw cleaned location substring
-    loc_raw = _normalize_str(location)
-    filtered2 = [it for it in results if loc_raw in text_of(it)]
-    return filtered2 or results
-
-def _extract_price_tier(text: str) -> Optional[str]:
-    text = (text or '').lower()
-    if '$$$$' in text or 'expensive' in text or 'fine dining' in text:
-        return '$$$$'
-    if '$$$' in text:
-        return '$$$'
-    if '$$' in text or 'moderate' in text:
-        return '$$'
-    if '$' in text or 'cheap' in text or 'budget' in text:
-        return '$'
-    return None
-
 def _dietary_keys(pref: Optional[Dietary]) -> List[str]:
     out: List[str] = []
     if not pref: return out
@@ -514,28 +843,31 @@ def _dietary_keys(pref: Optional[Dietary]) -> List[str]:
         out.extend([str(x).lower() for x in pref.other])
     return out
 
-def _date_range(start: str, end: str) -> List[str]:
-    def _parse(d: str):
-        for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d"):
-            try:
-                return datetime.strptime(d, fmt).date()
-            except Exception:
-                continue
-        # try ISO 8601
+# Long stays are bounded: the trip is clamped to the horizon and the itinerary is paged
+ITINERARY_MAX_HORIZON_DAYS = int(os.getenv("ITINERARY_MAX_HORIZON_DAYS", "90"))
+ITINERARY_PAGE_DAYS = int(os.getenv("ITINERARY_PAGE_DAYS", "14"))
+
+def _parse_date(d: Optional[str]) -> Optional[date]:
+    if not d:
+        return None
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%Y/%m/%d"):
         try:
-            return datetime.fromisoformat(d).date()
+            return datetime.strptime(d, fmt).date()
         except Exception:
-            return None
-    s = _parse(start)
-    e = _parse(end)
-    if not s or not e:
-        return []
-    days = []
-    cur = s
-    while cur <= e:
-        days.append(cur.isoformat())
-        cur += timedelta(days=1)
-    return days
+            continue
+    # try ISO 8601
+    try:
+        return datetime.fromisoformat(d).date()
+    except Exception:
+        return None
+
+def _trip_span(start: str, end: str) -> Optional[Tuple[date, int]]:
+    """(first day, number of days) for a booking, or None if a date is unparsable or end < start."""
+    s = _parse_date(start)
+    e = _parse_date(end)
+    if not s or not e or e < s:
+        return None
+    return s, (e - s).days + 1
 
 def _to_dict(m: Any) -> Dict[str, Any]:
     if hasattr(m, "model_dump"):
@@ -607,9 +939,10 @@ def _infer_trip_from_query(query: Optional[str]) -> Dict[str, Any]:
         loc = " ".join(w.capitalize() for w in cand.split())
     return {"location": loc, "days": days}
 
-def _parse_date_range_from_text(query: Optional[str], today: datetime.date) -> Optional[Dict[str, str]]:
+@functools.lru_cache(maxsize=1024)
+def _parse_date_range_from_text(query: Optional[str], today: date) -> Optional[Dict[str, str]]:
     """Parse date ranges like '2025-11-11 to 2025-11-14' or '11 Nov - 14 Nov' from text.
-    Returns {start, end} ISO strings or None if not found.
+    Returns {start, end} ISO strings or None if not found. Cached per (query, today); callers must not mutate the result.
     """
     if not query:
         return None
@@ -682,33 +1015,498 @@ def _parse_date_range_from_text(query: Optional[str], today: datetime.date) -> O
             return None
     return None
 
-def _build_itinerary(dates: List[str], act_ids: List[str]) -> List[Dict[str, Any]]:
-    itinerary = []
-    idx = 0
-    for d in dates:
-        blocks = []
-        for tb in ["morning","afternoon","evening"]:
-            if act_ids:
-                # Cycle through activities so all days/blocks have items
-                a1 = act_ids[idx % len(act_ids)]
-                a2 = act_ids[(idx + 1) % len(act_ids)] if len(act_ids) > 1 else a1
-                chosen = [a1, a2]
-                idx += 2
-            else:
-                chosen = []
-            blocks.append({
-                "time_block": tb,
-                "summary": f"Suggested {tb} activities",
-                "activities": chosen
-            })
-        itinerary.append({"date": d, "blocks": blocks})
-    return itinerary
+def _mobility(prefs: Optional[Preferences]) -> Mobility:
+    needs = prefs.mobility_needs if prefs else None
+    if not needs:
+        return Mobility()
+    return Mobility(wheelchair=bool(needs.wheelchair), stroller=bool(needs.stroller), max_walk_km=needs.max_walk_km)
+
+def _itinerary_page(start: date, days: int, schedule: TripSchedule,
+                    cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """One page of the whole-trip `schedule` starting at `cursor` (an ISO date inside the trip), plus paging info.
+    Pages are slices of the one schedule stored with the plan, so they always line up."""
+    offset = 0
+    at = _parse_date(cursor)
+    if at:
+        offset = min(max((at - start).days, 0), days)
+    page = list(itertools.islice(schedule.iter_days(start, days, offset), ITINERARY_PAGE_DAYS))
+    end = offset + len(page)
+    info = {
+        "start_date": start.isoformat(),
+        "days": days,
+        "offset": offset,
+        "returned": len(page),
+        "next_cursor": (start + timedelta(days=end)).isoformat() if end < days else None,
+    }
+    return page, info
+
+def _legacy_day_by_day(itinerary: List[Dict[str, Any]], titles: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Legacy `day_by_day_plan` rows; `titles` maps activity id -> title in ranked order."""
+    out = []
+    for day in itinerary:
+        highlights = []
+        for b in day["blocks"]:
+            # Use activity titles for highlights
+            highlights.extend([t for aid, t in titles.items() if aid in b["activities"]])
+        out.append({
+            "day": day["date"],
+            "title": f"Plan for {day['date']}",
+            "highlights": highlights[:5]
+        })
+    return out
+
+def _repage(response: Dict[str, Any], cursor: Optional[str], mobility: Mobility) -> Dict[str, Any]:
+    """Serve another itinerary page from a cached plan by slicing the schedule stored with it."""
+    info = response.get("itinerary_page")
+    start = _parse_date((info or {}).get("start_date"))
+    if not info or not start:
+        return response
+    acts = response.get("activities") or []
+    days = response.get("_itinerary_days")
+    # Plans stored before the schedule was kept with them are rescheduled (the work budget makes this repeatable)
+    schedule = TripSchedule(days, {}) if days is not None else schedule_trip(acts, start, int(info["days"]), mobility)
+    page, page_info = _itinerary_page(start, int(info["days"]), schedule, cursor)
+    if page_info["offset"] == info.get("offset"):
+        return response
+    titles = {a["id"]: a["title"] for a in acts}
+    return {**response, "itinerary": page, "itinerary_page": page_info, "day_by_day_plan": _legacy_day_by_day(page, titles)}
+
+# Stages the precompute consumer fetches for a booking; they depend on the city and (restaurants) the diet filter only
+PRECOMPUTED_STAGES = ("weather", "events", "pois", "restaurants")
+
+def _precompute_keys(booking_id: Any, property_id: Any, start: Any, end: Any) -> List[str]:
+    """Plan store keys for a booking, most specific first: its id, then the property and stay dates."""
+    keys = []
+    if booking_id not in (None, ""):
+        keys.append(f"booking:{booking_id}")
+    if property_id not in (None, "") and start and end:
+        keys.append(f"property:{property_id}:{str(start)[:10]}:{str(end)[:10]}")
+    return keys
+
+async def _lookup_precomputed(keys: List[str]) -> Optional[Dict[str, Any]]:
+    """The context the booking consumer stored under the first of `keys` found, or None."""
+    if plan_store is None:
+        return None
+    for key in keys:
+        try:
+            row = await _run_db(plan_store.get, key)
+        except Exception:
+            return None
+        if row is not None:
+            return {**row, "key": key}
+    return None
+
+def _source_state(src: Optional[DebugSource]) -> Optional[Dict[str, Any]]:
+    return src.model_dump() if src is not None else None
+
+def _stage_state(memo: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe copy of the precomputed stages in `memo`, for `_stage_memo` in another process."""
+    weather_text, weather_src = memo["weather"]
+    state: Dict[str, Any] = {"weather": [weather_text, _source_state(weather_src)]}
+    for kind in ("events", "pois"):
+        relevant, found, src = memo[kind]
+        # `relevant` is picked from `found` (relevant_or_all); stored as indices so records are not written twice
+        index = {id(r): i for i, r in enumerate(found)}
+        state[kind] = [[r.to_state() for r in found], [index[id(r)] for r in relevant if id(r) in index],
+                       _source_state(src)]
+    found, src = memo["restaurants"]
+    state["restaurants"] = [[r.to_state() for r in found], _source_state(src)]
+    return state
+
+def _stage_memo(state: Dict[str, Any]) -> Dict[str, Any]:
+    def source(d: Optional[Dict[str, Any]]) -> Optional[DebugSource]:
+        return DebugSource(**d) if d else None
+
+    weather_text, weather_src = state["weather"]
+    memo: Dict[str, Any] = {"weather": (weather_text, source(weather_src))}
+    for kind in ("events", "pois"):
+        found_state, picks, src = state[kind]
+        found = [SearchResult.from_state(r) for r in found_state]
+        memo[kind] = ([found[i] for i in picks], found, source(src))
+    found_state, src = state["restaurants"]
+    memo["restaurants"] = ([SearchResult.from_state(r) for r in found_state], source(src))
+    return memo
+
+# Bump when the plan body changes shape so clients drop ETags from older builds
+PLAN_SCHEMA_VERSION = "2"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+PLAN_RESPONSES = metrics.counter("agentai_plan_responses_total",
+                                 "Concierge plan responses by status, body format and content encoding")
+PLAN_RESPONSE_BYTES = metrics.histogram("agentai_plan_response_bytes", "Concierge plan body size on the wire",
+                                        buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576))
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+# Response fields per schema variant; plan_version identifies the plan in all of them
+PLAN_SCHEMAS = {
+    "new": ("plan_version", "itinerary", "itinerary_page", "activities", "restaurants", "properties",
+            "packing_checklist", "notes", "debug"),
+    "legacy": ("plan_version", "day_by_day_plan", "activity_cards", "restaurant_recommendations", "packing_checklist",
+               "debug"),
+}
+
+def _canonical_json(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+def _fallbacks_version() -> str:
+    folder = os.path.join(os.path.dirname(__file__), "fallbacks")
+    try:
+        return ",".join(f"{n}:{int(os.path.getmtime(os.path.join(folder, n)))}" for n in sorted(os.listdir(folder)))
+    except Exception:
+        return ""
+
+FALLBACKS_VERSION = _fallbacks_version()
+
+def _plan_version(inputs: Dict[str, Any], sources: Dict[str, Any]) -> str:
+    """Hash of the normalized request and the upstream content the plan was built from.
+
+    Plans are a pure function of these, so equal hashes mean equal bodies, on any replica."""
+    h = hashlib.sha256(PLAN_SCHEMA_VERSION.encode())
+    h.update(_canonical_json({"inputs": inputs, "sources": sources, "fallbacks": FALLBACKS_VERSION}))
+    return h.hexdigest()[:32]
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        # Encoded representations carry a -gzip/-br suffix; they are the same plan
+        if tag.split("-", 1)[0] == base:
+            return True
+    return False
+
+def _wants_msgpack(accept: Optional[str]) -> bool:
+    """True when `Accept` ranks msgpack above JSON (q-values honoured; ties keep JSON)."""
+    if not MSGPACK_AVAILABLE or not accept:
+        return False
+    q = {"msgpack": 0.0, "json": 0.0}
+    for part in accept.lower().split(","):
+        media, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        media = media.strip()
+        if media in MSGPACK_MEDIA_TYPES:
+            q["msgpack"] = max(q["msgpack"], weight)
+        elif media in ("application/json", "application/*", "*/*"):
+            q["json"] = max(q["json"], weight)
+    return q["msgpack"] > q["json"]
+
+def _plan_body(response: Dict[str, Any], include_debug: bool, schema: str) -> Dict[str, Any]:
+    # Underscored keys (the stored whole-trip schedule) stay server-side
+    fields = PLAN_SCHEMAS.get(schema)
+    return {k: v for k, v in response.items()
+            if not k.startswith("_") and (include_debug or k != "debug") and (fields is None or k in fields)}
+
+def _plan_response(request: Request, response: Dict[str, Any], include_debug: bool, schema: str = "both",
+                   status_code: int = 200, extra_headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize a plan with ETag/304 handling and gzip/brotli above COMPRESS_MIN_BYTES.
+
+    The body is msgpack when `Accept` prefers it (see MSGPACK_MEDIA_TYPES), JSON otherwise. `schema` ("new",
+    "legacy" or "both") selects which response shape is sent.
+    The ETag is derived from `plan_version` and the itinerary page, so a 304 costs no serialization; the body
+    format and schema variant are part of it, since they are different representations of the plan.
+    Debug output is per-request (cache hit info), so responses that include it carry no ETag."""
+    fmt = "msgpack" if _wants_msgpack(request.headers.get("accept")) else "json"
+    headers = {"Vary": "Accept, Accept-Encoding", "Cache-Control": "private, no-cache", **(extra_headers or {})}
+    etag = None
+    if not include_debug and response.get("plan_version"):
+        variant = "".join(f".{v}" for v in (schema if schema in PLAN_SCHEMAS else None,
+                                            "mp" if fmt == "msgpack" else None) if v)
+        etag = f'"{response["plan_version"]}.{(response.get("itinerary_page") or {}).get("offset", 0)}{variant}"'
+        headers["ETag"] = etag
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            PLAN_RESPONSES.inc(status="304", format=fmt, encoding="none")
+            return Response(status_code=304, headers=headers)
+    body = _plan_body(response, include_debug, schema)
+    if fmt == "msgpack":
+        raw = msgpack.packb(body, use_bin_type=True, default=str)
+        media_type = MSGPACK_MEDIA_TYPES[0]
+    else:
+        raw = json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        media_type = "application/json"
+    encoding = "identity"
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        accept = request.headers.get("accept-encoding", "").lower()
+        if BROTLI_AVAILABLE and "br" in accept:
+            raw, encoding = brotli.compress(raw, quality=5), "br"
+        elif "gzip" in accept:
+            raw, encoding = gzip.compress(raw, compresslevel=5), "gzip"
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+        if etag:
+            headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    PLAN_RESPONSES.inc(status=str(status_code), format=fmt, encoding=encoding)
+    PLAN_RESPONSE_BYTES.observe(len(raw), format=fmt, encoding=encoding)
+    return Response(content=raw, status_code=status_code, media_type=media_type, headers=headers)
 
 @router.post("/concierge-agent")
-async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(...)):
-    """Dynamic Concierge endpoint that follows the new contract and uses Tavily when available."""
+async def concierge_agent(request: Request, payload: Union[AgentV2Input, AgentLegacyInput] = Body(...), debug: bool = False,
+                          schema: str = "both"):
+    """Dynamic Concierge endpoint that follows the new contract and uses Tavily when available.
+    `?debug=true` adds the `debug` section; otherwise the response carries an ETag and honours If-None-Match.
+    `?schema=new|legacy` returns only that response shape; `Accept: application/msgpack` returns msgpack."""
+    _check_schema(schema)
+    rec = None
+    if traffic_capture is not None:
+        kind = "legacy" if isinstance(payload, AgentLegacyInput) else "v2"
+        rec = traffic_capture.begin("/api/v1/concierge-agent", kind, payload.model_dump(exclude_unset=True),
+                                    {"debug": debug, "schema": schema})
+    if rec is None:
+        return _plan_response(request, await _plan(payload), include_debug=debug, schema=schema)
+    status = 500
+    try:
+        response = _plan_response(request, await _plan(payload, origin="capture"), include_debug=debug, schema=schema)
+        status = response.status_code
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        traffic_capture.end(rec, status)
+
+def _check_schema(schema: str) -> None:
+    if schema not in PLAN_SCHEMAS and schema != "both":
+        raise HTTPException(status_code=400, detail="schema must be new, legacy or both")
+
+async def _session_plan(session: PlanSession, payload: Union[AgentV2Input, AgentLegacyInput]) -> Dict[str, Any]:
+    """Plan within `session` and record edit vs full-plan latency in its debug section."""
+    kind = "full" if session.response is None else "edit"
+    t0 = time.perf_counter()
+    response = await _plan(payload, session=session)
+    elapsed = time.perf_counter() - t0
+    PLAN_SESSION_SECONDS.observe(elapsed, kind=kind)
+    if kind == "full":
+        session.full_ms = round(elapsed * 1e3, 2)
+    else:
+        session.edits += 1
+    info = {"id": session.id, "kind": kind, "edits": session.edits, **session.last,
+            "elapsed_ms": round(elapsed * 1e3, 2), "full_plan_ms": session.full_ms}
+    session.response = {**response, "debug": {**response.get("debug", {}), "session": info}}
+    return session.response
+
+def _get_session(session_id: str) -> PlanSession:
+    if plan_sessions is None:
+        raise HTTPException(status_code=503, detail="plan sessions are disabled")
+    session = plan_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="unknown or expired plan session")
+    return session
+
+@router.post("/plan-sessions")
+async def create_plan_session(request: Request, payload: Union[AgentV2Input, AgentLegacyInput] = Body(...),
+                              debug: bool = False, schema: str = "both"):
+    """Plan like `/concierge-agent` and keep the fetched context in a session for later edits.
+    The session id is in the `X-Plan-Session` header (and `debug.session.id`)."""
+    _check_schema(schema)
+    if plan_sessions is None:
+        raise HTTPException(status_code=503, detail="plan sessions are disabled")
+    session = plan_sessions.create()
+    async with session.lock:
+        response = await _session_plan(session, payload)
+    return _plan_response(request, response, include_debug=debug, schema=schema, status_code=201,
+                          extra_headers={"X-Plan-Session": session.id, "Location": f"/api/v1/plan-sessions/{session.id}"})
+
+@router.patch("/plan-sessions/{session_id}")
+async def edit_plan_session(session_id: str, request: Request, delta: PlanDelta = Body(...), debug: bool = False,
+                            schema: str = "both"):
+    """Apply a preference/booking delta to the session's request and re-run only the stages it affects.
+    `debug.session` lists the changed fields, recomputed and reused stages, and this edit's latency next to the
+    session's full-plan latency."""
+    _check_schema(schema)
+    session = _get_session(session_id)
+    async with session.lock:
+        try:
+            payload = AgentV2Input(**apply_delta(session.inputs or {}, delta.model_dump(exclude_unset=True)))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+        response = await _session_plan(session, payload)
+    return _plan_response(request, response, include_debug=debug, schema=schema,
+                          extra_headers={"X-Plan-Session": session.id})
+
+@router.get("/plan-sessions/{session_id}")
+async def get_plan_session(session_id: str, request: Request, debug: bool = False, schema: str = "both"):
+    """The session's current plan (ETag/If-None-Match as for `/concierge-agent`)."""
+    _check_schema(schema)
+    session = _get_session(session_id)
+    if session.response is None:
+        raise HTTPException(status_code=409, detail="plan session is still planning")
+    return _plan_response(request, session.response, include_debug=debug, schema=schema,
+                          extra_headers={"X-Plan-Session": session.id})
+
+@router.delete("/plan-sessions/{session_id}", status_code=204)
+async def delete_plan_session(session_id: str):
+    if plan_sessions is None or not plan_sessions.drop(session_id):
+        raise HTTPException(status_code=404, detail="unknown or expired plan session")
+    return Response(status_code=204)
+
+async def _fetch_context(intents: List[str], location: str, diet: Optional[str], elapsed_s: float,
+                         memo: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch the context `intents` through the query planner and store each intent's output in `memo`:
+    weather (text, source), events/pois (relevant, all, source), restaurants (all, source).
+    Returns the plan for debug output."""
+    outputs: Dict[str, Tuple[List[SearchResult], Optional[DebugSource]]] = {}
+    if not intents:
+        plan = None
+    elif not _tavily_enabled():
+        plan = None
+        outputs = {i: ([], None) for i in intents}
+    else:
+        local_covers = {i for i, name in LOCAL_CATALOG.items() if _catalog_covers(name, location)}
+        plan = query_planner.plan(intents, location, diet, elapsed_s=elapsed_s, local_covers=local_covers,
+                                  queued=SCHEDULERS["tavily"].snapshot()["interactive"]["queued"] > 0,
+                                  use_cache=not recording())
+        cache = query_planner.cache
+        for i in plan.cached:
+            outputs[i] = cache.get(cache.key(i, location, query_planner.variant(i, diet))) or ([], None)
+        for i in plan.local:
+            outputs[i] = (_fallback_search(LOCAL_CATALOG[i], location, INTENT_RESULTS[i]), None)
+        for i in plan.skipped:
+            outputs[i] = ([], None)
+
+        # A search still queued once the plan's budget is spent would answer too late to help
+        deadline = time.monotonic() + max(plan.budget_s, 0.0) if plan.budget_s is not None else None
+
+        async def run(q: Query) -> None:
+            local = "restaurants" if q.intents == ("restaurants",) else (
+                "activities" if set(q.intents) <= {"events", "pois"} else None)
+            res = await _tavily_search(q.text, q.max_results, location, local=local, depth=q.depth,
+                                       deadline=deadline)
+            source = DebugSource(type="tavily", query=q.text, url=res[0].url) if res else None
+            for i, found in query_planner.split(q, res).items():
+                outputs[i] = (found, source)
+                if found and cache is not None:
+                    cache.put(cache.key(i, location, query_planner.variant(i, diet)), (found, source))
+
+        if plan.sequential:
+            for q in plan.queries:
+                await run(q)
+        else:
+            await asyncio.gather(*(run(q) for q in plan.queries))
+        QUERY_PLANS.inc(level=plan.level)
+        UPSTREAM_CALLS.observe(len(plan.queries))
+    for i in intents:
+        found, source = outputs.get(i) or ([], None)
+        if i == "weather":
+            memo[i] = (found[0].snippet[:400] if found else None, source)
+        elif i == "restaurants":
+            memo[i] = (found, source)
+        else:
+            memo[i] = (relevant_or_all(found)[:INTENT_RESULTS[i]], found, source)
+    if plan is not None:
+        return plan.as_dict()
+    # No intents left (provided or reused from a session), or no Tavily key
+    return {"level": "disabled" if intents else "none", "upstream_calls": 0}
+
+def _build_activities(booking: Booking, pois: List[SearchResult], events: List[SearchResult],
+                      pref_vec: PreferenceVector) -> List[Activity]:
+    """Activities from POIs/events, or the fallback catalog when there are none, ranked by `pref_vec`."""
+    activities: List[Activity] = []
+    activity_tokens: List[Any] = []
+    is_family = booking.party_type == 'family' or bool(booking.children_ages)
+    id_counts: Dict[str, int] = {}
+    def add_activity_from_item(item: SearchResult, taghint: List[str]):
+        title = item.title or "Activity"
+        # The venue's first-seen title keeps its id stable across plans; distinct venues never share one
+        slug = _slugify(item.canonical_title or title) or "activity"
+        id_counts[slug] = id_counts.get(slug, 0) + 1
+        activities.append(Activity(
+            id=slug if id_counts[slug] == 1 else f"{slug}-{id_counts[slug]}",
+            title=title,
+            address=item.address or "",
+            geo=_geo(item.geo, item.geo_precision),
+            hours=item.hours,
+            price_tier=item.price_tier,
+            duration_minutes=90,
+            tags=taghint,
+            wheelchair_friendly=item.wheelchair,
+            child_friendly=item.kid if item.kid is not None else is_family,
+            stroller_friendly=item.stroller,
+            booking_link=item.url,
+            source={"name": item.source, "url": item.url}
+        ))
+        activity_tokens.append(item.token_ids)
+
+    for p in pois[:10]:
+        add_activity_from_item(p, ["outdoors" if 'park' in p.title.lower() else "sightseeing"]) 
+    for e in events[:6]:
+        add_activity_from_item(e, ["event"]) 
+
+    # Fallback activities from JSON file if Tavily returned nothing
+    if not activities:
+        try:
+            fallback_data = _load_fallback("activities")
+            city_key = booking.location.lower().strip() if booking.location else ""
+            city_activities = fallback_data.get("by_city", {}).get(city_key, fallback_data.get("default", []))
+            for idx, act in enumerate(city_activities[:10]):
+                venue = venue_attributes(" ".join([act.get("title", "")] + list(act.get("tags") or [])))
+                activities.append(Activity(
+                    id=f"fallback-activity-{idx}",
+                    title=act.get("title", "Activity"),
+                    address="",
+                    geo=_geo(*geocode(gazetteer_city(booking.location), act.get("title", ""))),
+                    price_tier=act.get("price_tier", "$$"),
+                    duration_minutes=act.get("duration_minutes", 90),
+                    best_time=act.get("best_time"),
+                    tags=act.get("tags", ["sightseeing"]),
+                    wheelchair_friendly=act.get("wheelchair_friendly", venue["wheelchair"]),
+                    child_friendly=act.get("child_friendly", venue["kid"] if venue["kid"] is not None else is_family),
+                    stroller_friendly=act.get("stroller_friendly", venue["stroller"]),
+                    booking_link=None,
+                    source={"name": "fallback", "file": "activities.json"}
+                ))
+                activity_tokens.append(None)
+        except Exception as e:
+            # If fallback loading fails, continue with empty activities
+            pass
+
+    # Preference-aware ranking (one NumPy batch)
+    act_order = rank_candidates([
+        {"title": a.title, "tags": a.tags, "price_tier": a.price_tier, "text_token_ids": t,
+         "wheelchair": a.wheelchair_friendly, "stroller": a.stroller_friendly, "kid": a.child_friendly}
+        for a, t in zip(activities, activity_tokens)
+    ], pref_vec, k=ACTIVITY_TOP_K)
+    return [activities[i] for i in act_order]
+
+async def _plan_properties(booking: Booking, activities: List[Activity]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Listings near the activities, else in the booking's city (index, then DB), with debug info."""
+    # Activities with their own coordinates: enrichment leaves 0,0 when it has nothing, and a city centroid would rank
+    # listings by distance to downtown
+    activity_points = [(a.geo.lat, a.geo.lng) for a in activities if _located(a.geo)]
+    try:
+        near = _properties_near(activity_points, 10)
+        if near is not None:
+            return near
+        if booking.location:
+            indexed = _properties_from_index(booking.location, 10)
+            if indexed is not None:
+                return indexed
+            return await _run_db(_fetch_properties_by_location, booking.location, 10)
+        return [], {"reason": "no_location"}
+    except Exception as e:
+        return [], {"error": str(e)}
+
+async def _plan(payload: Union[AgentV2Input, AgentLegacyInput], origin: str = "interactive", booking_ref: Optional[str] = None,
+                session: Optional[PlanSession] = None) -> Dict[str, Any]:
+    """Build a plan. `origin` is "interactive" for user requests, "capture" for user requests being captured
+    (no cache reads, so every upstream response is recorded) or "precompute" for the booking consumer,
+    which skips cache reads and also writes the booking's fetched context to the shared store.
+    An interactive request naming a booking (`booking_id`, or `property_id` and its dates) reuses that context.
+    With a `session`, stage outputs the request did not invalidate are reused from its previous plan."""
+    t_plan = time.perf_counter()
     # Normalize legacy payload to AgentV2Input shape
     used_default_dates = False
+    precomputed: Optional[Dict[str, Any]] = None
     if isinstance(payload, AgentLegacyInput):
         bc = payload.booking_context or {}
         prefs_raw = payload.preferences or {}
@@ -716,6 +1514,19 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
         today = datetime.utcnow().date()
         start_raw = bc.get("start_date") or bc.get("check_in") or bc.get("checkIn") or (bc.get("dates") or {}).get("start")
         end_raw = bc.get("end_date") or bc.get("check_out") or bc.get("checkOut") or (bc.get("dates") or {}).get("end")
+        booking_id = next((bc[k] for k in ("booking_id", "bookingId") if bc.get(k) not in (None, "")), None)
+        property_id = next((bc[k] for k in ("property_id", "propertyId") if bc.get(k) not in (None, "")), None)
+        if origin == "interactive" and session is None:
+            # The booking's precomputed context carries its dates and city, which this body may leave out
+            precomputed = await _lookup_precomputed(_precompute_keys(booking_id, property_id, start_raw, end_raw))
+            if precomputed is not None:
+                known = precomputed["booking"]
+                start_raw, end_raw = start_raw or known["start_date"], end_raw or known["end_date"]
+                bc = dict(bc)
+                if not (bc.get("location") or bc.get("city") or bc.get("destination")):
+                    bc["location"] = known["location"]
+                if not (bc.get("guests") or bc.get("party_size")):
+                    bc["guests"] = known.get("party_size")
         parsed = None
         if not start_raw or not end_raw:
             # Try parse from free text first
@@ -740,6 +1551,8 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
             party_type=party_type,
             party_size=party_size,
             children_ages=children_ages,
+            booking_id=str(booking_id) if booking_id is not None else None,
+            property_id=str(property_id) if property_id is not None else None,
         )
         # Preferences mapping
         mobility = prefs_raw.get("mobility_needs") or {}
@@ -769,179 +1582,182 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
         prefs = payload.preferences or Preferences()
         ctx_flags = payload.context or ContextFlags()
         nlu_query = payload.nlu_query
+        if origin == "interactive" and session is None:
+            precomputed = await _lookup_precomputed(_precompute_keys(
+                booking.booking_id, booking.property_id, booking.start_date, booking.end_date))
 
     # Heuristic fill: infer location/days from nlu_query when missing
     hints = _infer_trip_from_query(nlu_query)
     if (not booking.location) and hints.get("location"):
         booking.location = hints["location"]
     # If dates are missing or invalid, compute from parsed text or inferred days
-    if not _date_range(booking.start_date, booking.end_date):
+    span = _trip_span(booking.start_date, booking.end_date)
+    if span is None:
         today = datetime.utcnow().date()
         parsed = _parse_date_range_from_text(nlu_query, today)
-        if parsed and parsed.get("start") and parsed.get("end"):
-            booking.start_date = parsed["start"]
-            booking.end_date = parsed["end"]
-        else:
-            days = hints.get("days") or 3
-            start = today
-            booking.start_date = start.isoformat()
-            booking.end_date = (start + timedelta(days=max(0, days-1))).isoformat()
+        span = _trip_span(parsed["start"], parsed["end"]) if parsed else None
+        if span is None:
+            span = (today, max(1, hints.get("days") or 3))
     # If legacy used default dates and user asked for a specific day-count, honor it
     elif used_default_dates and hints.get("days"):
-        try:
-            start = datetime.fromisoformat(booking.start_date).date()
-            days = int(hints["days"]) or 3
-            booking.end_date = (start + timedelta(days=max(0, days-1))).isoformat()
-        except Exception:
-            pass
-
-    # 1) Context acquisition (weather/events/pois)
-    sources: List[DebugSource] = []
-    weather_text = None
-    events: List[Dict[str, Any]] = []
-    pois: List[Dict[str, Any]] = []
-    events_all: List[Dict[str, Any]] = []
-    pois_all: List[Dict[str, Any]] = []
+        span = (span[0], max(1, int(hints["days"]) or 3))
+    # Parsed once; everything downstream works from (start, days) bounded by the horizon
+    trip_start, trip_days = span
+    horizon_clamped = trip_days > ITINERARY_MAX_HORIZON_DAYS
+    if horizon_clamped:
+        trip_days = ITINERARY_MAX_HORIZON_DAYS
+    booking.start_date = trip_start.isoformat()
+    booking.end_date = (trip_start + timedelta(days=trip_days - 1)).isoformat()
+    itinerary_cursor = payload.itinerary_cursor
 
     context_overrides = None
     if not isinstance(payload, AgentLegacyInput):
         context_overrides = payload.context_overrides if isinstance(payload.context_overrides, dict) else None
-    if context_overrides:
-        weather_text = (context_overrides.get("weather") or {}).get("summary") if isinstance(context_overrides.get("weather"), dict) else None
-        events = context_overrides.get("events") or []
-        pois = context_overrides.get("pois") or []
-
-    if ctx_flags.weather == "auto" and not weather_text:
-        q = f"current weather and typical conditions this week in {booking.location}"
-        res = await _tavily_search(q, 3)
-        if res:
-            weather_text = (res[0].get("content") or res[0].get("snippet") or "").strip()[:400]
-            sources.append(DebugSource(type="tavily", query=q, url=res[0].get("url")))
-
-    if ctx_flags.events == "auto" and not events:
-        q = f"events this week for families in {booking.location}"
-        res = await _tavily_search(q, 5)
-        if res:
-            events_all = res
-            events = _filter_results_by_location(events_all, booking.location)[:5]
-            sources.append(DebugSource(type="tavily", query=q, url=res[0].get("url")))
-
-    if ctx_flags.pois == "auto" and not pois:
-        q = f"top attractions and kid-friendly points of interest in {booking.location} with hours and prices"
-        res = await _tavily_search(q, 8)
-        if res:
-            pois_all = res
-            pois = _filter_results_by_location(pois_all, booking.location)[:8]
-            sources.append(DebugSource(type="tavily", query=q, url=res[0].get("url")))
-
-    # 2) Build activities from POIs/events (with graceful fallback)
-    activities: List[Activity] = []
-    def add_activity_from_item(item: Dict[str, Any], taghint: List[str]):
-        title = item.get("title") or item.get("name") or "Activity"
-        aid = _slugify(title)
-        price = _extract_price_tier(str(item.get("content") or ""))
-        activities.append(Activity(
-            id=aid,
-            title=title,
-            address="",
-            geo=Geo(lat=0.0, lng=0.0),
-            price_tier=price,
-            duration_minutes=90,
-            tags=taghint,
-            wheelchair_friendly=bool(getattr(prefs.mobility_needs or MobilityNeeds(), 'wheelchair', False)),
-            child_friendly=(booking.party_type == 'family' or bool(booking.children_ages)),
-            stroller_friendly=bool(getattr(prefs.mobility_needs or MobilityNeeds(), 'stroller', False)),
-            booking_link=item.get("url"),
-            source={"name": "tavily", "url": item.get("url")}
-        ))
 
-    for p in pois[:10]:
-        add_activity_from_item(p, ["outdoors" if 'park' in (p.get('title','').lower()) else "sightseeing"]) 
-    for e in events[:6]:
-        add_activity_from_item(e, ["event"]) 
+    # Stage outputs by name (see sessions.STAGE_INPUTS); a session carries them over from its previous plan
+    memo: Dict[str, Any] = {}
+    if session is not None:
+        session.begin({"booking": booking.model_dump(), "preferences": prefs.model_dump(), "nlu_query": nlu_query,
+                       "context": ctx_flags.model_dump(), "context_overrides": context_overrides,
+                       "itinerary_cursor": itinerary_cursor})
+        memo = session.stages
+
+    # 0) Near-duplicate plan cache, then precomputed plans (skipped when the caller supplies its own context,
+    #    and for sessions, which keep their own stage outputs)
+    cache_text, cache_fp = plan_cache_key(nlu_query, booking, prefs, ctx_flags)
+    use_cache = origin == "interactive" and not context_overrides and session is None
+    if use_cache and plan_cache is not None:
+        cached = plan_cache.get(cache_text, cache_fp)
+        if cached is not None:
+            cached_resp, cached_meta = cached
+            PLAN_REQUESTS.inc(cache="precompute" if cached_meta.get("source") == "precompute" else "hit")
+            cached_resp = _repage(cached_resp, itinerary_cursor, _mobility(prefs))
+            return {**cached_resp, "debug": {**cached_resp.get("debug", {}), "plan_cache": {"hit": True, **cached_meta}}}
+    # The booking's precomputed context stands in for the upstream searches it covers; ranking, the itinerary and
+    # properties still follow this request's preferences and prompt
+    reused: List[str] = []
+    if precomputed is not None and precomputed["booking"]["location"] == booking.location:
+        stored = _stage_memo(precomputed["stages"])
+        reusable = {"weather": ctx_flags.weather == "auto", "events": ctx_flags.events == "auto",
+                    "pois": ctx_flags.pois == "auto",
+                    # fetched without a diet filter
+                    "restaurants": not _dietary_keys(prefs.dietary)}
+        for stage in PRECOMPUTED_STAGES:
+            if reusable[stage] and not context_overrides:
+                memo[stage] = stored[stage]
+                reused.append(stage)
+    PLAN_REQUESTS.inc(cache="precompute" if reused else ("miss" if use_cache else origin))
+
+    # 1) Context acquisition: caller-provided context first, then the fewest upstream searches for the rest
+    needed: List[str] = []
+    if "weather" not in memo:
+        weather_text = None
+        if context_overrides and isinstance(context_overrides.get("weather"), dict):
+            weather_text = context_overrides["weather"].get("summary")
+        if ctx_flags.weather == "auto" and not weather_text:
+            needed.append("weather")
+        else:
+            memo["weather"] = (weather_text, None)
+    for kind, flag in (("events", ctx_flags.events), ("pois", ctx_flags.pois)):
+        if kind in memo:
+            continue
+        found: List[SearchResult] = []
+        if context_overrides:
+            found = ingest(context_overrides.get(kind) or [], keep_content=enricher is not None)
+            if enricher is not None and found:
+                await enricher.enrich(found, booking.location)
+        if flag == "auto" and not found:
+            needed.append(kind)
+        else:
+            memo[kind] = (found, [], None)
+    dietary_filters = _dietary_keys(prefs.dietary)
+    diet = dietary_filters[0].replace('_', ' ') if dietary_filters else None
+    if "restaurants" not in memo:
+        needed.append("restaurants")
+    query_plan = await _fetch_context(needed, booking.location, diet, time.perf_counter() - t_plan, memo)
+    if origin == "precompute" and plan_store is not None and not context_overrides and not diet:
+        keys = _precompute_keys(booking.booking_id, booking.property_id, booking.start_date, booking.end_date)
+        context = {"booking": {"location": booking.location, "start_date": booking.start_date,
+                               "end_date": booking.end_date, "party_size": booking.party_size},
+                   "stages": _stage_state(memo)}
+        for key in keys:
+            await _run_db(plan_store.put, key, context, booking_ref)
+
+    weather_text, weather_source = memo["weather"]
+    events, events_all, events_source = memo["events"]
+    pois, pois_all, pois_source = memo["pois"]
+    rest_results_raw, rest_source = memo["restaurants"]
+    dedup_info = None
+    if venue_deduper is not None:
+        (events, pois, rest_results_raw), dedup_info = venue_deduper.dedupe([events, pois, rest_results_raw],
+                                                                           booking.location)
+        VENUE_DUPLICATES.inc(dedup_info["collapsed"])
+    sources: List[DebugSource] = []
+    for src in (weather_source, events_source, pois_source, rest_source):
+        # A combined search is the source of several intents; list it once
+        if src is not None and all(src.query != s.query for s in sources):
+            sources.append(src)
+    pref_vec = PreferenceVector.from_request(prefs, booking, _nlu_extract(nlu_query).get("extracted_interests"))
 
-    # Fallback activities from JSON file if Tavily returned nothing
-    if not activities:
-        try:
-            import os
-            fallback_path = os.path.join(os.path.dirname(__file__), "fallbacks", "activities.json")
-            with open(fallback_path, "r") as f:
-                fallback_data = json.load(f)
-            city_key = booking.location.lower().strip() if booking.location else ""
-            city_activities = fallback_data.get("by_city", {}).get(city_key, fallback_data.get("default", []))
-            for idx, act in enumerate(city_activities[:10]):
-                activities.append(Activity(
-                    id=f"fallback-activity-{idx}",
-                    title=act.get("title", "Activity"),
-                    address="",
-                    geo=Geo(lat=0.0, lng=0.0),
-                    price_tier=act.get("price_tier", "$$"),
-                    duration_minutes=act.get("duration_minutes", 90),
-                    tags=act.get("tags", ["sightseeing"]),
-                    wheelchair_friendly=bool(getattr(prefs.mobility_needs or MobilityNeeds(), 'wheelchair', False)),
-                    child_friendly=(booking.party_type == 'family' or bool(booking.children_ages)),
-                    stroller_friendly=bool(getattr(prefs.mobility_needs or MobilityNeeds(), 'stroller', False)),
-                    booking_link=None,
-                    source={"name": "fallback", "file": "activities.json"}
-                ))
-        except Exception as e:
-            # If fallback loading fails, continue with empty activities
-            pass
+    # 2) Build activities from POIs/events (with graceful fallback), ranked by preference
+    if "activities" not in memo:
+        memo["activities"] = _build_activities(booking, pois, events, pref_vec)
+    activities: List[Activity] = memo["activities"]
 
     # 3) Restaurants based on dietary
-    dietary_filters = _dietary_keys(prefs.dietary)
-    rest_query = None
-    if dietary_filters:
-        key = dietary_filters[0].replace('_', ' ')
-        rest_query = f"best {key} restaurants in {booking.location} with price info"
-    else:
-        rest_query = f"best family friendly restaurants in {booking.location} with price info"
-    rest_results_raw = await _tavily_search(rest_query, 6)
-    rest_results = _filter_results_by_location(rest_results_raw or [], booking.location)[:6]
+    rest_results = relevant_or_all(rest_results_raw)[:6]
     restaurants: List[Restaurant] = []
+    restaurant_tokens: List[Any] = []
     for r in rest_results:
-        price = _extract_price_tier(str(r.get("content") or ""))
         restaurants.append(Restaurant(
-            name=r.get("title") or "Restaurant",
-            address="",
-            geo=Geo(lat=0.0, lng=0.0),
-            dietary_match=[d for d in dietary_filters],
-            price_tier=price,
-            kid_friendly=(booking.party_type == 'family'),
-            reservation_link=r.get("url"),
-            source={"name": "tavily", "url": r.get("url")}
+            name=r.title or "Restaurant",
+            address=r.address or "",
+            geo=_geo(r.geo, r.geo_precision),
+            hours=r.hours,
+            dietary_match=list(r.dietary),
+            price_tier=r.price_tier,
+            kid_friendly=r.kid if r.kid is not None else (booking.party_type == 'family'),
+            reservation_link=r.url,
+            source={"name": r.source, "url": r.url}
         ))
-    if rest_results:
-        sources.append(DebugSource(type="tavily", query=rest_query, url=rest_results[0].get("url")))
+        restaurant_tokens.append(r.token_ids)
     
     # Fallback restaurants from JSON file if Tavily returned nothing
     if not restaurants:
         try:
-            import os
-            fallback_path = os.path.join(os.path.dirname(__file__), "fallbacks", "restaurants.json")
-            with open(fallback_path, "r") as f:
-                fallback_data = json.load(f)
+            fallback_data = _load_fallback("restaurants")
             city_key = booking.location.lower().strip() if booking.location else ""
             city_restaurants = fallback_data.get("by_city", {}).get(city_key, fallback_data.get("default", []))
             for rest in city_restaurants[:6]:
                 restaurants.append(Restaurant(
                     name=rest.get("name", "Restaurant"),
                     address="",
-                    geo=Geo(lat=0.0, lng=0.0),
-                    dietary_match=rest.get("dietary_match", dietary_filters),
+                    geo=_geo(*geocode(gazetteer_city(booking.location), rest.get("name", ""))),
+                    dietary_match=rest.get("dietary_match", venue_attributes(rest.get("name", ""))["dietary"]),
                     price_tier=rest.get("price_tier", "$$"),
                     kid_friendly=(booking.party_type == 'family'),
                     reservation_link=None,
                     source={"name": "fallback", "file": "restaurants.json"}
                 ))
+                restaurant_tokens.append(None)
         except Exception as e:
             # If fallback loading fails, continue with empty restaurants
             pass
 
-    # 4) Itinerary mapping across dates
-    dates = _date_range(booking.start_date, booking.end_date)
-    act_ids = [a.id for a in activities]
-    itinerary = _build_itinerary(dates or [booking.start_date], act_ids)
+    # 3b) Preference-aware ranking (one NumPy batch per candidate list)
+    rest_order = rank_candidates([
+        {"title": r.name, "price_tier": r.price_tier, "text_token_ids": t, "kid": r.kid_friendly, "dietary": r.dietary_match}
+        for r, t in zip(restaurants, restaurant_tokens)
+    ], pref_vec, k=RESTAURANT_TOP_K)
+    restaurants = [restaurants[i] for i in rest_order]
+
+    # 4) Itinerary: ranked activities scheduled by travel time, opening hours and mobility
+    #    The whole trip is scheduled once and kept with the plan; each page is a slice of it
+    if "itinerary" not in memo:
+        memo["itinerary"] = schedule_trip([_to_dict(a) for a in activities], trip_start, trip_days, _mobility(prefs))
+    schedule: TripSchedule = memo["itinerary"]
+    itinerary, itinerary_page = _itinerary_page(trip_start, trip_days, schedule, itinerary_cursor)
+    itinerary_stats = schedule.stats
 
     # 5) Packing checklist and notes
     packing = _pack_list_from_weather(weather_text or "")
@@ -956,21 +1772,18 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
     if dietary_filters:
         notes.append(Note(type="dietary", text=f"Filtering restaurants for: {', '.join(dietary_filters)}"))
     if prefs.mobility_needs and (getattr(prefs.mobility_needs, 'wheelchair', False) or getattr(prefs.mobility_needs, 'stroller', False)):
-        notes.append(Note(type="mobility", text="Routes kept wheelchair/stroller-friendly where possible."))
+        skipped = len(itinerary_stats["excluded_for_mobility"])
+        notes.append(Note(type="mobility", text="Routes kept wheelchair/stroller-friendly where possible."
+                          + (f" {skipped} unsuitable activities left out of the itinerary." if skipped else "")))
+    if horizon_clamped:
+        notes.append(Note(type="dates", text=f"Trip is longer than {ITINERARY_MAX_HORIZON_DAYS} days; planning covers {booking.start_date} to {booking.end_date}."))
 
     # 6) Airbnb properties in the requested location (from DB)
-    properties_list: List[Dict[str, Any]] = []
-    properties_dbg: Dict[str, Any] = {"reason": "skipped"}
-    try:
-        if booking.location:
-            properties_list, properties_dbg = _fetch_properties_by_location(booking.location, limit=10)
-        else:
-            properties_list, properties_dbg = [], {"reason": "no_location"}
-    except Exception as e:
-        properties_list, properties_dbg = [], {"error": str(e)}
+    if "properties" not in memo:
+        memo["properties"] = await _plan_properties(booking, activities)
+    properties_list, properties_dbg = memo["properties"]
 
     tavily_on = _tavily_enabled()
-    computed_dates = _date_range(booking.start_date, booking.end_date)
     debug = {
         "query_understanding": _nlu_extract(nlu_query),
         "inferred": hints,
@@ -978,7 +1791,8 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
         "date_range": {
             "start": booking.start_date,
             "end": booking.end_date,
-            "days": len(computed_dates),
+            "days": trip_days,
+            "clamped": horizon_clamped,
         },
         "sources": [_to_dict(s) for s in sources],
         "location_filter": {
@@ -988,20 +1802,15 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
             "restaurants": {"before": len(rest_results_raw or []), "after": len(rest_results or [])},
         },
     "properties": {"location": booking.location, "count": len(properties_list), **(properties_dbg or {})},
+        "itinerary": itinerary_stats,
+        "query_plan": query_plan,
+        "dedup": dedup_info,
     }
+    if reused:
+        debug["precompute"] = {"key": precomputed["key"], "stages": reused}
 
     # Build backward-compatible response shape along with the new one
-    legacy_day_by_day = []
-    for day in itinerary:
-        highlights = []
-        for b in day["blocks"]:
-            # Use activity titles for highlights
-            highlights.extend([a.title for a in activities if a.id in b["activities"]])
-        legacy_day_by_day.append({
-            "day": day["date"],
-            "title": f"Plan for {day['date']}",
-            "highlights": highlights[:5]
-        })
+    legacy_day_by_day = _legacy_day_by_day(itinerary, {a.id: a.title for a in activities})
     legacy_activity_cards = [
         {
             "name": a.title,
@@ -1027,9 +1836,17 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
             "link": link,
         })
 
+    plan_version = _plan_version(
+        {"booking": booking.model_dump(), "preferences": prefs.model_dump(), "query": (nlu_query or "").strip(),
+         "context": ctx_flags.model_dump(), "overrides": context_overrides},
+        {"weather": weather_text, "events": [e.as_dict() for e in events], "pois": [p.as_dict() for p in pois],
+         "restaurants": [r.as_dict() for r in rest_results], "properties": properties_list},
+    )
     response = {
+        "plan_version": plan_version,
         # New schema
         "itinerary": itinerary,
+        "itinerary_page": itinerary_page,
         "activities": [a.model_dump() if hasattr(a, "model_dump") else a.dict() for a in activities],
         "restaurants": [r.model_dump() if hasattr(r, "model_dump") else r.dict() for r in restaurants],
         "properties": (properties_list if properties_list else "no property"),
@@ -1040,10 +1857,38 @@ async def concierge_agent(payload: Union[AgentV2Input, AgentLegacyInput] = Body(
         "day_by_day_plan": legacy_day_by_day,
         "activity_cards": legacy_activity_cards,
         "restaurant_recommendations": legacy_restaurants,
+        "_itinerary_days": schedule.days,
     }
+    if plan_cache is not None and not context_overrides:
+        plan_cache.put(cache_text, cache_fp, response, meta={"source": origin})
     return response
 
 
+@router.get("/properties/nearby")
+async def properties_nearby(lat: Optional[float] = None, lng: Optional[float] = None, radius_km: Optional[float] = None,
+                            points: Optional[str] = None, k: int = 10):
+    """Listings near a point or a set of points (e.g. one itinerary day's activities).
+
+    - `lat`/`lng` with `radius_km`: every listing within the radius (up to `k`).
+    - `lat`/`lng` alone, or `points=lat,lng;lat,lng`: the `k` listings nearest on average.
+    Ranked by distance, cheaper first among listings in the same distance band."""
+    if _property_index_staleness() is None:
+        raise HTTPException(status_code=503, detail="property index not ready")
+    try:
+        anchors = [tuple(float(v) for v in p.split(",")) for p in points.split(";") if p.strip()] if points else []
+    except ValueError:
+        raise HTTPException(status_code=400, detail="points must be 'lat,lng;lat,lng'")
+    if lat is not None and lng is not None:
+        anchors.insert(0, (lat, lng))
+    if not anchors or any(len(a) != 2 for a in anchors):
+        raise HTTPException(status_code=400, detail="give lat and lng, or points")
+    k = max(1, min(k, 100))
+    if radius_km is not None and len(anchors) == 1:
+        rows = await run_blocking(property_index.within, anchors[0][0], anchors[0][1], radius_km, k)
+    else:
+        rows = await run_blocking(property_index.nearest, anchors, k, radius_km)
+    return {"count": len(rows), "results": rows}
+
 @router.get("/concierge-agent/diag")
 async def concierge_diag():
     """Diagnostic endpoint to verify dynamic mode.
@@ -1057,7 +1902,18 @@ async def concierge_diag():
             sample_count = len(res)
         except Exception:
             sample_count = 0
-    return {"tavily_enabled": enabled, "sample_results": sample_count}
+    cache_stats = {"enabled": plan_cache is not None}
+    if plan_cache is not None:
+        cache_stats.update(size=len(plan_cache), capacity=plan_cache.capacity, **plan_cache.stats)
+    schedulers = {name: sch.snapshot() for name, sch in SCHEDULERS.items()}
+    hedging = {"tavily": tavily_hedger.snapshot() if tavily_hedger is not None else None, "backup": HEDGE_BACKUP}
+    enrichment = enricher.snapshot() if enricher is not None else None
+    sessions = plan_sessions.snapshot() if plan_sessions is not None else None
+    return {"tavily_enabled": enabled, "sample_results": sample_count, "plan_cache": cache_stats, "schedulers": schedulers,
+            "hedging": hedging, "enrichment": enrichment, "plan_sessions": sessions,
+            "query_planner": query_planner.snapshot(),
+            "venue_dedup": venue_deduper.snapshot() if venue_deduper is not None else None,
+            "capture": traffic_capture.snapshot() if traffic_capture is not None else None}
 
     # Build a combined prompt from all inputs
     combined_prompt = (
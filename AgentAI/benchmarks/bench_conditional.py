@@ -0,0 +1,62 @@
+"""Repeat views of the same plan: bytes on the wire and latency.
+
+Re-requests one plan (served from the plan cache, as when the itinerary panel
+is re-opened) through the ASGI app and compares the previous full response
+(debug included, uncompressed) with the trimmed body under gzip and brotli and
+with a conditional request that gets a 304. Run from the AgentAI folder:
+python -m benchmarks.bench_conditional
+"""
+import argparse
+import os
+import time
+
+os.environ.pop("TAVILY_API_KEY", None)
+os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import app as A  # noqa: E402
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--views", type=int, default=300)
+    ap.add_argument("--days", type=int, default=7)
+    args = ap.parse_args()
+
+    client = TestClient(A.app)
+    body = {
+        "booking_context": {"location": "San Francisco", "start_date": "2026-03-01",
+                            "end_date": f"2026-03-{args.days:02d}"},
+        "preferences": {"dietary": {"vegetarian": True}},
+        "nlu_prompt": "family trip with kids, museums and parks",
+    }
+    first = client.post("/api/v1/concierge-agent", json=body, headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+
+    scenarios = [
+        ("full + debug, identity", "?debug=true", {"Accept-Encoding": "identity"}),
+        ("trimmed, identity", "", {"Accept-Encoding": "identity"}),
+        ("trimmed, gzip", "", {"Accept-Encoding": "gzip"}),
+        ("trimmed, br", "", {"Accept-Encoding": "br, gzip"}),
+        ("If-None-Match -> 304", "", {"Accept-Encoding": "br, gzip", "If-None-Match": etag}),
+    ]
+    print(f"{args.views} repeat views, {args.days}-day plan, brotli={'yes' if A.BROTLI_AVAILABLE else 'no'}")
+    print(f"{'scenario':<24} {'status':>6} {'bytes':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, qs, headers in scenarios:
+        lat = []
+        for _ in range(args.views):
+            t0 = time.perf_counter()
+            r = client.post("/api/v1/concierge-agent" + qs, json=body, headers=headers)
+            lat.append(time.perf_counter() - t0)
+        print(f"{name:<24} {r.status_code:>6} {r.num_bytes_downloaded:>7} "
+              f"{_pct(lat, 50) * 1e3:>7.2f} {_pct(lat, 95) * 1e3:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
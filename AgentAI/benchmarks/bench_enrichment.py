@@ -0,0 +1,99 @@
+"""Enrichment throughput per core, inline vs process pool, and event-loop lag.
+
+Builds synthetic search records (multi-KB content with a street address,
+opening hours, prices and landmark names somewhere in the text) and enriches
+them in request-sized groups the way `_tavily_search` does: inline on the
+event loop (ENRICH_WORKERS=0) and in process pools of increasing size. Reports
+records/s, records/s per core used, the worst event-loop stall seen by a 5 ms
+ticker while enriching, and the throughput of a second pass served from the
+(URL, content hash) cache. Run from the AgentAI folder:
+python -m benchmarks.bench_enrichment
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from enrichment import Enricher, extract
+from ingest import project
+
+WORDS = ("museum park family kids vegan gallery trail market tour view historic bar garden beach tasting "
+         "wheelchair accessible stroller friendly brunch skyline ferry pier").split()
+STREETS = ["Market St", "Mission Street", "Beach St", "Van Ness Ave", "Embarcadero", "Lombard St", "Geary Blvd"]
+PLACES = ["Fisherman's Wharf", "Golden Gate Park", "Union Square", "Ferry Building", "North Beach", "Presidio"]
+HOURS = ["Open daily 9am-5pm", "Hours: Mon-Fri 10:00 AM - 6:00 PM", "Tue–Sun 11 a.m. to 9 p.m.", "Open 24 hours"]
+PRICES = ["Admission $25 for adults, $15 for kids", "Entrées $12-$18", "Free admission", "Tickets from $45", "$$"]
+
+
+def _records(n: int, content_chars: int, seed: int = 11):
+    rnd = random.Random(seed)
+    items = []
+    for i in range(n):
+        words = [rnd.choice(WORDS) for _ in range(content_chars // 7)]
+        for fact in (f"{rnd.randint(1, 2999)} {rnd.choice(STREETS)}, San Francisco, CA 941{rnd.randint(0, 99):02d}",
+                     rnd.choice(HOURS), rnd.choice(PRICES), f"near {rnd.choice(PLACES)}"):
+            words.insert(rnd.randrange(len(words)), fact)
+        items.append({"title": f"{rnd.choice(['Harbor', 'Sunset', 'Mission'])} {rnd.choice(['Museum', 'Kitchen'])} {i}",
+                      "url": f"https://www.example.com/sf/{i}", "content": " ".join(words)})
+    return items
+
+
+async def _drive(enricher: Enricher, items, group: int, concurrency: int):
+    """Enrich `items` in groups of `group` with `concurrency` requests at once; returns (seconds, worst loop lag)."""
+    worst = 0.0
+    stop = False
+
+    async def ticker():
+        nonlocal worst
+        while not stop:
+            t = time.perf_counter()
+            await asyncio.sleep(0.005)
+            worst = max(worst, time.perf_counter() - t - 0.005)
+
+    groups = [[project(it, keep_content=True) for it in items[i:i + group]] for i in range(0, len(items), group)]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(recs):
+        async with sem:
+            await enricher.enrich(recs, "San Francisco")
+
+    tick = asyncio.ensure_future(ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(g) for g in groups))
+    elapsed = time.perf_counter() - t0
+    stop = True
+    await tick
+    return elapsed, worst
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=4000)
+    ap.add_argument("--content-chars", type=int, default=3000)
+    ap.add_argument("--group", type=int, default=8, help="records per search (one enrich call)")
+    ap.add_argument("--concurrency", type=int, default=8, help="searches in flight")
+    ap.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    args = ap.parse_args()
+    items = _records(args.records, args.content_chars)
+    cores = os.cpu_count() or 1
+
+    sample = extract(items[0]["title"], items[0]["content"], "san francisco")
+    print(f"{args.records} records, ~{args.content_chars} chars each, {args.group}/search, "
+          f"{args.concurrency} searches in flight, {cores} CPU(s)")
+    print(f"sample: {sample}")
+    print(f"{'mode':<10} {'rec/s':>8} {'rec/s/core':>11} {'worst lag ms':>13} {'cached rec/s':>13}")
+    for workers in [0] + list(range(1, args.workers + 1)):
+        enricher = Enricher(workers=workers, batch_size=args.group, cache_size=args.records * 2)
+        enricher.warm()
+        elapsed, lag = asyncio.run(_drive(enricher, items, args.group, args.concurrency))
+        cached, _ = asyncio.run(_drive(enricher, items, args.group, args.concurrency))
+        enricher.close()
+        used = 1 if workers == 0 else min(workers, cores)
+        rate = args.records / elapsed
+        name = "inline" if workers == 0 else f"pool x{workers}"
+        print(f"{name:<10} {rate:>8.0f} {rate / used:>11.0f} {lag * 1e3:>13.1f} {args.records / cached:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
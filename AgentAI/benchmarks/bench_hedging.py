@@ -0,0 +1,83 @@
+"""Tail latency of the planning pipeline with and without hedged Tavily searches.
+
+Replaces the Tavily upstream with a simulated one whose latency is mostly
+fast with an occasional slow response (each plan makes four sequential
+searches, so the tail compounds), then runs the offline pipeline with hedging
+off, with a second upstream attempt as backup, and with the local fallback
+catalog as backup. Reports plan latency percentiles and the hedge rate. Run
+from the AgentAI folder:  python -m benchmarks.bench_hedging
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ["TAVILY_API_KEY"] = "bench"
+os.environ["PLAN_CACHE_ENABLED"] = "false"
+os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+# Keep the four sequential searches this benchmark measures the tail of
+os.environ.setdefault("QUERY_PLANNER_ENABLED", "false")
+os.environ.setdefault("SEARCH_CACHE_ENABLED", "false")
+
+import app as A  # noqa: E402
+from hedging import Hedger  # noqa: E402
+from ingest import ingest  # noqa: E402
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+def _fake_upstream(rnd: random.Random, fast: float, slow: float, slow_share: float):
+    async def upstream(query, max_results, api_key, aliases, depth="advanced"):
+        r = rnd.random()
+        latency = rnd.uniform(0.5, 1.5) * fast if r >= slow_share else rnd.uniform(0.7, 1.3) * slow
+        await asyncio.sleep(latency)
+        return ingest([{"title": f"{query[:20]} {i}", "url": f"https://example.com/{i}",
+                        "content": f"San Francisco museum park family $$ {query}"} for i in range(max_results)], aliases)
+    return upstream
+
+
+async def _run(n: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+
+    async def one(i):
+        payload = A.AgentV2Input(booking={"start_date": "2026-05-01", "end_date": "2026-05-03",
+                                          "location": "San Francisco"}, preferences={}, nlu_query=f"trip {i}")
+        async with sem:
+            t0 = time.perf_counter()
+            await A._plan(payload)
+            lat.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return lat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--plans", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--fast-ms", type=float, default=20)
+    ap.add_argument("--slow-ms", type=float, default=600)
+    ap.add_argument("--slow-share", type=float, default=0.03)
+    args = ap.parse_args()
+
+    print(f"{args.plans} plans x 4 searches, upstream {args.fast_ms:.0f} ms typical, "
+          f"{100 * args.slow_share:.0f}% at ~{args.slow_ms:.0f} ms")
+    print(f"{'mode':<16} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'hedge rate':>10}")
+    for mode in ("off", "upstream", "local"):
+        A._tavily_search_upstream = _fake_upstream(random.Random(42), args.fast_ms / 1e3, args.slow_ms / 1e3,
+                                                   args.slow_share)
+        A.tavily_hedger = None if mode == "off" else Hedger("bench", quantile=0.95, min_delay=0.005)
+        A.HEDGE_BACKUP = mode
+        lat = asyncio.run(_run(args.plans, args.concurrency))
+        rate = A.tavily_hedger.hedge_rate() if A.tavily_hedger else 0.0
+        print(f"{mode:<16} {_pct(lat, 50) * 1e3:>7.1f} {_pct(lat, 95) * 1e3:>7.1f} {_pct(lat, 99) * 1e3:>7.1f} "
+              f"{max(lat) * 1e3:>7.1f} {100 * rate:>9.1f}%")
+
+
+if __name__ == "__main__":
+    main()
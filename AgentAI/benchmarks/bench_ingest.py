@@ -0,0 +1,101 @@
+"""Memory and time per 1k Tavily results: raw dicts vs projected records.
+
+Parses a synthetic upstream payload (results with multi-KB `content`) and
+compares keeping the raw dicts and deriving fields downstream (the previous
+path: location filter, price tier, venue flags and ranking tokens per
+consumer) with projecting after parsing and with projecting inside the
+parser (`parse_response`). Reports retained bytes, peak traced allocation and
+live blocks per 1k results, plus processing time. Run from the AgentAI folder:
+python -m benchmarks.bench_ingest
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from ingest import ingest, parse_response, price_tier, relevant_or_all
+from ranking import text_token_ids, venue_attributes
+
+WORDS = ("museum park family kids vegan gallery trail market tour view historic bar garden beach tasting "
+         "wheelchair accessible stroller friendly brunch skyline ferry pier").split()
+HOSTS = ["www.tripadvisor.com", "www.yelp.com", "www.timeout.com", "www.sfgate.com", "www.eater.com"]
+ALIASES = ["san francisco", "sf", "fisherman's wharf", "golden gate", "mission district"]
+
+
+def _payload(n: int, content_chars: int, seed: int = 7) -> bytes:
+    rnd = random.Random(seed)
+    results = []
+    for i in range(n):
+        body = " ".join(rnd.choice(WORDS) for _ in range(content_chars // 7))
+        results.append({
+            "title": f"{rnd.choice(['Golden', 'Mission', 'Harbor', 'Sunset'])} {rnd.choice(['Museum', 'Park', 'Kitchen'])} {i}",
+            "url": f"https://{rnd.choice(HOSTS)}/sf/{i}",
+            "content": f"{'San Francisco' if i % 3 else 'Oakland'} {'$$' if i % 2 else 'cheap'} {body}",
+            "score": rnd.random(),
+            "raw_content": None,
+        })
+    return json.dumps({"results": results}).encode()
+
+
+def _legacy_derive(results):
+    """Previous downstream work on raw dicts for one consumer (ranking tokenized the kept ones)."""
+    def text_of(item):
+        return f"{item.get('title', '')} {item.get('content', '') or item.get('snippet', '')} {item.get('url', '')}".strip().lower()
+    kept = [it for it in results if any(a in text_of(it) for a in ALIASES)] or results
+    for it in kept:
+        text = str(it.get("content") or "")
+        price_tier(text)
+        venue_attributes(f"{it.get('title') or ''} {text}")
+        text_token_ids(f"{it.get('title') or ''} {text}".lower())
+    return kept
+
+
+def _measure(fn):
+    # Time untraced, then trace a second run for memory
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    kept = fn()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return kept, current - base, peak - base, blocks, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--results", type=int, default=1000)
+    ap.add_argument("--content-chars", type=int, default=3000)
+    args = ap.parse_args()
+    payload = _payload(args.results, args.content_chars)
+    per_k = 1000.0 / args.results
+
+    def raw_path():
+        results = json.loads(payload)["results"]
+        _legacy_derive(results)
+        return results
+
+    def projected_path():
+        return relevant_or_all(ingest(json.loads(payload)["results"], ALIASES))
+
+    def streamed_path():
+        return relevant_or_all(parse_response(payload, ALIASES))
+
+    ingest(json.loads(_payload(50, args.content_chars, seed=1))["results"], ALIASES)  # warm the token vocabulary
+    print(f"{args.results} results, ~{args.content_chars} chars of content each (figures per 1k results)")
+    print(f"{'path':<10} {'retained KB':>12} {'peak KB':>9} {'live blocks':>12} {'ms':>8}")
+    for name, fn in (("raw", raw_path), ("projected", projected_path), ("streamed", streamed_path)):
+        kept, retained, peak, blocks, elapsed = _measure(fn)
+        print(f"{name:<10} {retained * per_k / 1024:>12.1f} {peak * per_k / 1024:>9.1f} {blocks * per_k:>12.0f} "
+              f"{elapsed * per_k * 1e3:>8.1f}")
+        del kept
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Itinerary cost for 1- to 365-day stays: eager full build vs lazy paged build.
+
+The eager reference reproduces the previous behaviour (three date-range
+expansions, every day built round-robin, legacy highlights scanned against
+every activity); the lazy path parses the dates once, schedules the trip and
+builds one page. Also runs
+the whole offline pipeline (plan cache off) to report end-to-end latency and
+response size. Run from the AgentAI folder:  python -m benchmarks.bench_itinerary
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import date, timedelta
+
+os.environ.pop("TAVILY_API_KEY", None)
+os.environ["PLAN_CACHE_ENABLED"] = "false"
+os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+
+import app as A  # noqa: E402
+
+ACTS = [{"id": f"a{i}", "title": f"Activity {i}"} for i in range(16)]
+
+
+def _date_range(start: str, end: str):
+    s, e = A._parse_date(start), A._parse_date(end)
+    days = []
+    while s <= e:
+        days.append(s.isoformat())
+        s += timedelta(days=1)
+    return days
+
+
+def round_robin(start: date, days: int, act_ids, offset: int = 0):
+    """The original itinerary builder: activities cycle two per block, no geography or timing."""
+    n = len(act_ids)
+    for i in range(offset, days):
+        idx = i * 6
+        blocks = []
+        for tb in ("morning", "afternoon", "evening"):
+            chosen = [act_ids[idx % n], act_ids[(idx + 1) % n]] if n else []
+            idx += 2
+            blocks.append({"time_block": tb, "summary": f"Suggested {tb} activities", "activities": chosen})
+        yield {"date": (start + timedelta(days=i)).isoformat(), "blocks": blocks}
+
+
+def _eager(start: str, end: str):
+    dates = _date_range(start, end)
+    for _ in range(2):
+        _date_range(start, end)
+    ids = [a["id"] for a in ACTS]
+    itinerary = list(round_robin(A._parse_date(start), len(dates), ids))
+    legacy = []
+    for day in itinerary:
+        highlights = []
+        for b in day["blocks"]:
+            highlights.extend([a["title"] for a in ACTS if a["id"] in b["activities"]])
+        legacy.append({"day": day["date"], "title": f"Plan for {day['date']}", "highlights": highlights[:5]})
+    return itinerary, legacy
+
+
+def _lazy(start: str, end: str):
+    s, days = A._trip_span(start, end)
+    days = min(days, A.ITINERARY_MAX_HORIZON_DAYS)
+    page, _ = A._itinerary_page(s, days, A.schedule_trip(ACTS, s, days, A.Mobility()))
+    return page, A._legacy_day_by_day(page, {a["id"]: a["title"] for a in ACTS})
+
+
+def _time(fn, *args, repeat=200):
+    fn(*args)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(*args)
+    return (time.perf_counter() - t0) / repeat, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", default="1,7,30,90,180,365")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    start = date(2026, 1, 1)
+    print(f"page={A.ITINERARY_PAGE_DAYS} days  horizon={A.ITINERARY_MAX_HORIZON_DAYS} days")
+    print(f"{'days':>5} {'eager ms':>9} {'eager KB':>9} {'lazy ms':>8} {'lazy KB':>8} {'plan ms':>8} {'plan KB':>8}")
+    for n in (int(x) for x in args.days.split(",")):
+        s, e = start.isoformat(), (start + timedelta(days=n - 1)).isoformat()
+        t_eager, out_eager = _time(_eager, s, e, repeat=args.repeat)
+        t_lazy, out_lazy = _time(_lazy, s, e, repeat=args.repeat)
+        payload = A.AgentV2Input(booking={"start_date": s, "end_date": e, "location": "Seattle"}, preferences={})
+        t_plan, resp = _time(lambda: asyncio.run(A._plan(payload)), repeat=max(5, args.repeat // 20))
+        kb = lambda o: len(json.dumps(o)) / 1024  # noqa: E731
+        print(f"{n:>5} {t_eager * 1e3:>9.3f} {kb(out_eager):>9.1f} {t_lazy * 1e3:>8.3f} {kb(out_lazy):>8.1f} "
+              f"{t_plan * 1e3:>8.2f} {kb(resp):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Throughput, recall and false hits of the near-duplicate plan cache with 100k cached prompts.
+
+Recall: the same trip with the prompt reworded (abbreviations, filler words).
+False hits: the same prompt with one structured field changed (budget,
+interests, party, context flags), or with a constraint added to the prompt;
+none of these may be served another request's plan.
+
+Run from the AgentAI folder:  python -m benchmarks.bench_plan_cache [--size 100000]
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from plan_cache import SemanticPlanCache, plan_cache_key
+
+CITIES = ["San Francisco", "New York", "Los Angeles", "Chicago", "Miami", "Seattle", "Boston", "Austin",
+          "Denver", "Portland", "San Diego", "San Jose", "Atlanta", "Nashville", "Phoenix", "Dallas"]
+CONTEXT = lambda: SimpleNamespace(weather="auto", events="auto", pois="auto")  # noqa: E731
+ABBREV = {"San Francisco": "SF", "New York": "NYC", "Los Angeles": "LA"}
+
+STORED = [
+    "{n} days in {c} with kids",
+    "romantic {n} day getaway to {c}",
+    "{n} days of museums and food in {c}",
+]
+PARAPHRASES = [
+    "{n} days in {c} with the kids",
+    "a romantic {n} day getaway to {c}!",
+    "{n} days of museums and food in {c} please",
+]
+# One structured field changed; each must miss
+CHANGES = [
+    ("budget", lambda b, p, c: setattr(p, "budget", "high")),
+    ("interests", lambda b, p, c: setattr(p, "interests", ["nightlife"])),
+    ("party size", lambda b, p, c: setattr(b, "party_size", 6)),
+    ("children", lambda b, p, c: setattr(b, "children_ages", [4])),
+    ("context flags", lambda b, p, c: setattr(c, "events", "provided")),
+]
+
+
+def _intent(i: int):
+    rnd = random.Random(i)
+    city = CITIES[i % len(CITIES)]
+    n = 1 + (i // len(CITIES)) % 7
+    start = date(2025, 1, 1) + timedelta(days=(i // (len(CITIES) * 7)) % 3650)
+    t = rnd.randrange(len(STORED))
+    booking = SimpleNamespace(location=city, start_date=start.isoformat(),
+                              end_date=(start + timedelta(days=n - 1)).isoformat(),
+                              party_type="family" if t == 0 else None, party_size=None, children_ages=None)
+    prefs = SimpleNamespace(budget="low", interests=["museums"], dietary=None, mobility_needs=None)
+    return city, n, t, booking, prefs
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--size", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=5_000)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--threshold", type=float, default=0.85)
+    args = ap.parse_args()
+
+    cache = SemanticPlanCache(capacity=args.size, dim=args.dim, threshold=args.threshold, ttl_seconds=3600)
+    t0 = time.perf_counter()
+    for i in range(args.size):
+        city, n, t, booking, prefs = _intent(i)
+        text, fp = plan_cache_key(STORED[t].format(n=n, c=ABBREV.get(city, city)), booking, prefs, CONTEXT())
+        cache.put(text, fp, i)
+    insert_s = time.perf_counter() - t0
+
+    rnd = random.Random(0)
+    ids = [rnd.randrange(args.size) for _ in range(args.queries)]
+    hits = correct = 0
+    t0 = time.perf_counter()
+    for i in ids:
+        city, n, t, booking, prefs = _intent(i)
+        text, fp = plan_cache_key(PARAPHRASES[t].format(n=n, c=city), booking, prefs, CONTEXT())
+        res = cache.get(text, fp)
+        if res is not None:
+            hits += 1
+            correct += int(res[0] == i)
+    lookup_s = time.perf_counter() - t0
+
+    false_hits = {name: 0 for name, _ in CHANGES}
+    false_hits["prompt + constraint"] = 0
+    for i in ids[:1000]:
+        city, n, t, booking, prefs = _intent(i)
+        stored = STORED[t].format(n=n, c=ABBREV.get(city, city))
+        for name, change in CHANGES:
+            b, p, c = SimpleNamespace(**vars(booking)), SimpleNamespace(**vars(prefs)), CONTEXT()
+            change(b, p, c)
+            false_hits[name] += cache.get(*plan_cache_key(stored, b, p, c)) is not None
+        false_hits["prompt + constraint"] += cache.get(
+            *plan_cache_key(stored + ", no museums please", booking, prefs, CONTEXT())) is not None
+
+    # Full-matrix top-k scan (no fingerprint bucket) for reference
+    scan_n = min(500, args.queries)
+    t0 = time.perf_counter()
+    for i in ids[:scan_n]:
+        city, n, t, booking, prefs = _intent(i)
+        cache.search(plan_cache_key(PARAPHRASES[t].format(n=n, c=city), booking, prefs, CONTEXT())[0], k=10)
+    scan_s = time.perf_counter() - t0
+
+    mem_mb = cache._matrix.nbytes / 1e6
+    print(f"cached prompts     : {len(cache):,} (matrix {mem_mb:.1f} MB, dim={args.dim})")
+    print(f"insert throughput  : {args.size / insert_s:,.0f} puts/s")
+    print(f"lookup throughput  : {args.queries / lookup_s:,.0f} gets/s ({lookup_s / args.queries * 1e6:.1f} us/get)")
+    print(f"full-scan top-10   : {scan_n / scan_s:,.0f} queries/s ({scan_s / scan_n * 1e3:.2f} ms/query)")
+    print(f"paraphrase recall  : {hits / args.queries:.3f} (precision {correct / max(hits, 1):.3f})")
+    print("false hits / 1000  : " + ", ".join(f"{k} {v}" for k, v in false_hits.items()))
+
+
+if __name__ == "__main__":
+    main()
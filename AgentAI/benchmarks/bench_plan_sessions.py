@@ -0,0 +1,110 @@
+"""Plan-session edits vs full re-plans.
+
+Replaces the Tavily upstream with a simulated one (fixed latency with jitter,
+results that enrichment can place on the map), opens a plan session and
+applies typical edits: toggle a dietary flag, add mobility needs, extend the
+stay, page the itinerary, add interests, move the trip to another city. Each
+edit is timed through the session and as a full re-plan of the edited request
+(plan cache off), with the upstream searches each one made. Run from the
+AgentAI folder:
+
+    python -m benchmarks.bench_plan_sessions [--upstream-ms 300]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ["TAVILY_API_KEY"] = "bench"
+os.environ["PLAN_CACHE_ENABLED"] = "false"
+os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+os.environ.setdefault("ENRICH_WORKERS", "0")
+os.environ.setdefault("HEDGE_ENABLED", "false")
+# Full re-plans should search, not hit the search cache a previous plan filled
+os.environ.setdefault("SEARCH_CACHE_ENABLED", "false")
+
+import app as A  # noqa: E402
+from ingest import ingest  # noqa: E402
+from sessions import SessionStore, apply_delta  # noqa: E402
+
+EDITS = [
+    ("dietary: vegan", {"preferences": {"dietary": {"vegan": True}}}),
+    ("mobility: wheelchair", {"preferences": {"mobility_needs": {"wheelchair": True}}}),
+    ("extend stay", {"booking": {"end_date": "2026-05-09"}}),
+    ("next itinerary page", {"itinerary_cursor": "2026-05-04"}),
+    ("interests", {"preferences": {"interests": ["museum", "park"]}}),
+    ("other city", {"booking": {"location": "Seattle"}}),
+]
+STREETS = ["Market St", "Mission St", "Valencia St", "Geary Blvd", "Columbus Ave", "Lombard St"]
+
+
+class Upstream:
+    def __init__(self, latency: float, rnd: random.Random):
+        self.latency, self.rnd, self.calls = latency, rnd, 0
+
+    async def __call__(self, query, max_results, api_key, aliases, depth="advanced"):
+        self.calls += 1
+        await asyncio.sleep(self.latency * self.rnd.uniform(0.8, 1.2))
+        city = aliases[0].title() if aliases else "San Francisco"
+        return ingest([{
+            "title": f"{query.split(' in ')[0][:24].title()} {i}", "url": f"https://example.com/{abs(hash(query)) % 997}/{i}",
+            "content": f"{100 + 7 * i} {self.rnd.choice(STREETS)}, {city}. Open daily 10:00 am - 6:00 pm. "
+                       f"Tickets ${10 + 5 * i}. Family friendly, wheelchair accessible museum and park.",
+        } for i in range(max_results)], aliases, keep_content=A.enricher is not None)
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+async def _timed(upstream, coro):
+    calls = upstream.calls
+    t0 = time.perf_counter()
+    await coro
+    return time.perf_counter() - t0, upstream.calls - calls
+
+
+async def _run(args):
+    upstream = Upstream(args.upstream_ms / 1e3, random.Random(5))
+    A._tavily_search_upstream = upstream
+    A.plan_sessions = SessionStore()
+    base = {"booking": {"start_date": "2026-05-01", "end_date": "2026-05-05", "location": "San Francisco",
+                        "party_type": "family", "children_ages": [7]},
+            "preferences": {"budget": "medium"}, "nlu_query": "family trip"}
+    results = {name: ([], [], 0, 0) for name, _ in EDITS}
+    full_ms = []
+    for _ in range(args.rounds):
+        session = A.plan_sessions.create()
+        elapsed, _ = await _timed(upstream, A._session_plan(session, A.AgentV2Input(**base)))
+        full_ms.append(elapsed)
+        # Each edit builds on the previous one, as a traveler refining one plan would
+        for name, delta in EDITS:
+            edited = apply_delta(session.inputs, delta)
+            t_edit, c_edit = await _timed(upstream, A._session_plan(session, A.AgentV2Input(**edited)))
+            t_full, c_full = await _timed(upstream, A._plan(A.AgentV2Input(**edited)))
+            edit_lat, full_lat, _, _ = results[name]
+            edit_lat.append(t_edit)
+            full_lat.append(t_full)
+            results[name] = (edit_lat, full_lat, c_edit, c_full)
+    return full_ms, results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--upstream-ms", type=float, default=300)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+    full_ms, results = asyncio.run(_run(args))
+    print(f"upstream search ~{args.upstream_ms:.0f} ms, {args.rounds} sessions, "
+          f"initial plan p50 {_pct(full_ms, 50) * 1e3:.0f} ms")
+    print(f"{'edit':<22} {'edit p50 ms':>11} {'searches':>8} {'full re-plan p50 ms':>19} {'searches':>8} {'speedup':>8}")
+    for name, _ in EDITS:
+        edit_lat, full_lat, c_edit, c_full = results[name]
+        e, f = _pct(edit_lat, 50), _pct(full_lat, 50)
+        print(f"{name:<22} {e * 1e3:>11.1f} {c_edit:>8} {f * 1e3:>19.1f} {c_full:>8} {f / e:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Drive the precompute consumer against the in-memory broker stand-in.
+
+Publishes booking-created/confirmed events, lets the consumer precompute each
+booking's context into an in-memory plan store, then sends the interactive
+requests the frontend would (legacy body naming the booking, a free-text
+prompt, no dates) and reports consumer lag and precompute hit rate.
+
+Run from the AgentAI folder:  python -m benchmarks.bench_precompute [--bookings 200]
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("PRECOMPUTE_STORE", "memory")
+os.environ.pop("TAVILY_API_KEY", None)
+
+import app as agent_app  # noqa: E402
+from consumer import InMemoryBroker, PrecomputeConsumer  # noqa: E402
+
+CITIES = ["San Francisco", "New York", "Los Angeles", "Chicago", "Seattle", "Boston", "Miami"]
+PROMPTS = ["family trip ideas; stroller accessible", "museums and good coffee", "what should we do this weekend?"]
+
+
+async def _run(n: int, concurrency: int) -> None:
+    broker = InMemoryBroker()
+    for i in range(n):
+        start = date(2026, 1, 1) + timedelta(days=i % 300)
+        msg = {"booking_id": i, "property_id": i, "location": CITIES[i % len(CITIES)],
+               "check_in_date": start.isoformat(), "check_out_date": (start + timedelta(days=2 + i % 4)).isoformat(),
+               "number_of_guests": 2, "status": "pending"}
+        broker.produce("bookings.requests", msg)
+        if i % 2 == 0:
+            broker.produce("bookings.status", {**msg, "status": "accepted"})
+    pc = PrecomputeConsumer(broker.consumer(["bookings.requests", "bookings.status"], "bench"),
+                            agent_app._plan, lookup=None, concurrency=concurrency, store=agent_app.plan_store)
+    print("lag before          :", (await pc.report())["lag"])
+    t0 = time.perf_counter()
+    while await pc.run_once(max_records=50, timeout_ms=0):
+        pass
+    elapsed = time.perf_counter() - t0
+    print(f"precompute          : {n} bookings in {elapsed:.2f}s ({n / elapsed:.1f} bookings/s, concurrency={concurrency})")
+    print("lag after           :", (await pc.report())["lag"])
+
+    # Interactive requests from a fresh web replica: clear the local cache so reuse comes from the store
+    if agent_app.plan_cache is not None:
+        agent_app.plan_cache.clear()
+    served = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        payload = agent_app.AgentLegacyInput(booking_context={"booking_id": i}, preferences={}, local_context={},
+                                             nlu_prompt=PROMPTS[i % len(PROMPTS)])
+        resp = await agent_app._plan(payload)
+        served += int("precompute" in resp.get("debug", {}))
+    print(f"interactive         : {n} requests in {time.perf_counter() - t0:.2f}s, {served} planned from precompute")
+    print("report              :", await pc.report())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bookings", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=4)
+    args = ap.parse_args()
+    asyncio.run(_run(args.bookings, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Upstream searches per plan and plan latency: fixed searches vs the query planner.
+
+Replaces the Tavily upstream with a simulated one whose latency depends on the
+search depth (advanced ~3x basic, with jitter) and on how many results are
+asked for, and which returns a mix of attractions, events and restaurants so
+combined queries can be split back. Each scenario runs the same plans with the
+planner off (the previous four sequential `advanced` searches) and on, and
+reports upstream calls per plan, results requested and plan latency. Run from
+the AgentAI folder:
+
+    python -m benchmarks.bench_query_planner [--advanced-ms 600 --basic-ms 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+
+os.environ["TAVILY_API_KEY"] = "bench"
+os.environ["PLAN_CACHE_ENABLED"] = "false"
+os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+os.environ.setdefault("ENRICH_WORKERS", "0")
+os.environ.setdefault("HEDGE_ENABLED", "false")
+
+import app as A  # noqa: E402
+import query_planner  # noqa: E402
+from ingest import ingest  # noqa: E402
+
+KINDS = [
+    ("{} Science Museum", "Open daily 10am-5pm, tickets $25, kids love the exhibits."),
+    ("{} Botanical Garden", "Gardens and trails, free entry, family friendly park."),
+    ("Summer Music Festival", "Live music this weekend, tickets from $30."),
+    ("Harbor Bistro", "Seasonal menu, vegetarian options, $$."),
+]
+BASE = {"booking": {"start_date": "2026-05-01", "end_date": "2026-05-05", "location": "San Francisco",
+                    "party_type": "family", "children_ages": [7]},
+        "preferences": {"budget": "medium", "dietary": {"vegetarian": True}}, "nlu_query": "family trip"}
+
+
+class Upstream:
+    def __init__(self, advanced: float, basic: float, rnd: random.Random):
+        self.latency = {"advanced": advanced, "basic": basic}
+        self.rnd, self.calls, self.results = rnd, 0, 0
+
+    async def __call__(self, query, max_results, api_key, aliases, depth="advanced"):
+        self.calls += 1
+        self.results += max_results
+        # Latency grows a little with the number of results asked for
+        await asyncio.sleep(self.latency[depth] * (1 + max_results / 40) * self.rnd.uniform(0.8, 1.2))
+        city = aliases[0].title() if aliases else "San Francisco"
+        out = []
+        for i in range(max_results):
+            title, content = KINDS[i % len(KINDS)]
+            out.append({"title": f"{title.format(city)} {i}", "content": f"{content} {city}.",
+                        "url": f"https://example.com/{abs(hash(query)) % 997}/{i}"})
+        return ingest(out, aliases, keep_content=A.enricher is not None)
+
+
+# name -> (request overrides, planner settings, warm the search cache first)
+SCENARIOS = [
+    ("default", {}, {}, False),
+    ("events off", {"context": {"events": "off"}}, {}, False),
+    ("weather provided", {"context_overrides": {"weather": {"summary": "Sunny, 21C"}}}, {}, False),
+    ("warm search cache", {}, {}, True),
+    ("tight budget", {}, {"QUERY_PLAN_BUDGET_MS": "700"}, False),
+    # San Francisco is in the local catalog, so the minimal plan serves POIs and restaurants from it
+    ("severe pressure", {}, {"QUERY_PLAN_BUDGET_MS": "200"}, False),
+]
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+def _payload(overrides):
+    body = {k: dict(v) if isinstance(v, dict) else v for k, v in BASE.items()}
+    for k, v in overrides.items():
+        body[k] = {**body.get(k, {}), **v} if isinstance(v, dict) and isinstance(body.get(k), dict) else v
+    return A.AgentV2Input(**body)
+
+
+async def _plans(upstream, payload, n):
+    lat, calls, results, level = [], [], [], None
+    for _ in range(n):
+        c, r = upstream.calls, upstream.results
+        t0 = time.perf_counter()
+        response = await A._plan(payload)
+        lat.append(time.perf_counter() - t0)
+        calls.append(upstream.calls - c)
+        results.append(upstream.results - r)
+        level = response["debug"]["query_plan"]["level"]
+    return lat, calls, results, level
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--advanced-ms", type=float, default=600)
+    ap.add_argument("--basic-ms", type=float, default=200)
+    ap.add_argument("--plans", type=int, default=8)
+    args = ap.parse_args()
+    print(f"upstream ~{args.advanced_ms:.0f} ms advanced / ~{args.basic_ms:.0f} ms basic, {args.plans} plans each")
+    print(f"{'scenario':<20} {'mode':<8} {'calls/plan':>10} {'results/plan':>12} {'p50 ms':>7} {'p95 ms':>7} {'level':<8}")
+    for name, overrides, env, warm in SCENARIOS:
+        payload = _payload(overrides)
+        for mode in ("legacy", "planner"):
+            os.environ.update(env)
+            os.environ["QUERY_PLANNER_ENABLED"] = "false" if mode == "legacy" else "true"
+            # Seed the latency estimates with the simulated upstream's, as a warmed-up process would have
+            os.environ["QUERY_PLAN_ADVANCED_MS"] = str(args.advanced_ms * 1.3)
+            os.environ["QUERY_PLAN_BASIC_MS"] = str(args.basic_ms * 1.3)
+            A.query_planner = query_planner.query_planner_from_env()
+            for k in env:
+                os.environ.pop(k)
+            if not warm:
+                A.query_planner.cache = None
+            upstream = Upstream(args.advanced_ms / 1e3, args.basic_ms / 1e3, random.Random(11))
+            A._tavily_search_upstream = upstream
+            if warm:
+                asyncio.run(A._plan(payload))
+            lat, calls, results, level = asyncio.run(_plans(upstream, payload, args.plans))
+            print(f"{name:<20} {mode:<8} {sum(calls) / len(calls):>10.1f} {sum(results) / len(results):>12.1f} "
+                  f"{_pct(lat, 50) * 1e3:>7.0f} {_pct(lat, 95) * 1e3:>7.0f} {level:<8}")
+
+
+if __name__ == "__main__":
+    main()
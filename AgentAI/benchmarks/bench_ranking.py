@@ -0,0 +1,89 @@
+"""Ranking stage cost at 10k candidates per request.
+
+Run from the AgentAI folder:  python -m benchmarks.bench_ranking [--candidates 10000]
+"""
+import argparse
+import random
+import time
+
+from ranking import (INTEREST_WORDS, PreferenceVector, encode_candidates, rank_candidates, score_candidates,
+                     venue_attributes)
+
+WORDS = ["museum", "park", "tour", "gallery", "market", "historic", "bar", "zoo", "garden", "cafe", "view", "beach"]
+EXTRAS = ["wheelchair accessible", "stroller-friendly", "family-friendly", "adults only", "vegan options",
+          "gluten-free menu", "stairs only", ""]
+
+
+def _candidates(n: int, seed: int = 0):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        text = " ".join(rnd.sample(WORDS, 3) + [rnd.choice(EXTRAS), rnd.choice(EXTRAS)])
+        venue = venue_attributes(text)
+        out.append({
+            "title": f"Place {i} {rnd.choice(WORDS)}",
+            "tags": [rnd.choice(WORDS)],
+            "price_tier": rnd.choice(["$", "$$", "$$$", "$$$$", None]),
+            "text": text,
+            "wheelchair": venue["wheelchair"], "stroller": venue["stroller"], "kid": venue["kid"],
+            "dietary": venue["dietary"],
+        })
+    return out
+
+
+def _python_rank(cands, pv, k):
+    """Item-by-item reference scorer, for comparison only."""
+    order = {"$": 1, "$$": 2, "$$$": 3, "$$$$": 4}
+    def score(c):
+        s = 0.0
+        p = order.get(c["price_tier"] or "", 0)
+        if pv.budget_target:
+            s += 0.5 if p == 0 else 1 - abs(p - pv.budget_target) / 3
+        hay = f"{c['title']} {' '.join(c['tags'])} {c['text']}".lower()
+        if pv.interests:
+            s += 2 * sum(any(w in hay for w in [i] + INTEREST_WORDS.get(i, [])) for i in pv.interests) / len(pv.interests)
+        tri = lambda v: 0 if v is None else (1 if v else -1)
+        s += 1.5 * tri(c["wheelchair"]) * pv.wheelchair + 1.5 * tri(c["stroller"]) * pv.stroller + tri(c["kid"]) * pv.kids
+        if pv.dietary:
+            s += 2 * sum(d in c["dietary"] for d in pv.dietary) / len(pv.dietary)
+        return s
+    return sorted(range(len(cands)), key=lambda i: -score(cands[i]))[:k]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--candidates", type=int, default=10_000)
+    ap.add_argument("--k", type=int, default=16)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+    cands = _candidates(args.candidates)
+    pv = PreferenceVector(budget="medium", interests=["museum", "outdoors"], wheelchair=True, kids=True, dietary=["vegan"])
+
+    # Cold: first request tokenizes every candidate; warm: token ids are cached on the records
+    t0 = time.perf_counter()
+    rank_candidates(cands, pv, k=args.k)
+    cold_ms = (time.perf_counter() - t0) * 1e3
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        rank_candidates(cands, pv, k=args.k)
+    vec_ms = (time.perf_counter() - t0) / args.repeat * 1e3
+    feats = encode_candidates(cands, pv)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat):
+        score_candidates(feats, pv)
+    score_ms = (time.perf_counter() - t0) / args.repeat * 1e3
+
+    t0 = time.perf_counter()
+    for _ in range(max(1, args.repeat // 4)):
+        _python_rank(cands, pv, args.k)
+    py_ms = (time.perf_counter() - t0) / max(1, args.repeat // 4) * 1e3
+
+    print(f"candidates       : {args.candidates:,} (top-{args.k})")
+    print(f"numpy cold       : {cold_ms:.2f} ms (first request, tokenizes candidates)")
+    print(f"numpy warm       : {vec_ms:.2f} ms/request (encode + score + top-k)")
+    print(f"  score only     : {score_ms:.2f} ms/request")
+    print(f"python reference : {py_ms:.2f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Load test of the autoscaling signals against a local stand-in upstream.
+
+Starts a stand-in Tavily (a small HTTP server in a subprocess, so its CPU is
+not counted, answering after `--upstream-ms` with jitter) and points the app
+at it with `TAVILY_API_URL`. The app is then driven through its ASGI
+interface by closed-loop clients at increasing concurrency. During each step
+/metrics is scraped every second and the saturation gauges are averaged, as
+the prometheus-adapter rules do. Reported per step: throughput, latency,
+process CPU as a share of the pod's 150m request (the load generator runs
+in-process, so this is an upper bound), each gauge, and the replicas each HPA
+would ask for from one pod. "cpu HPA" is the previous CPU-only autoscaler,
+"saturation HPA" is deploy/k8s/12-agentai-hpa.yaml. Run from the AgentAI
+folder:
+
+    python -m benchmarks.bench_saturation [--steps 1,4,16,48 --seconds 8 --upstream-ms 1500]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+
+CPU_REQUEST = 0.150  # cores, 08-agentai.yaml
+# 12-agentai-hpa.yaml: (metric, labels) -> per-pod target
+TARGETS = {
+    ("agentai_inflight_requests", ""): 8.0,
+    ("agentai_upstream_inflight", 'resource="tavily"'): 6.0,
+    ("agentai_pool_wait_seconds", 'pool="tavily"'): 0.1,
+    ("agentai_pool_wait_seconds", 'pool="threads"'): 0.05,
+    ("agentai_event_loop_lag_seconds", ""): 0.1,
+}
+CPU_TARGET = 0.75
+CITIES = ["San Francisco", "New York", "Seattle", "Chicago", "Boston", "Austin", "Denver", "Portland"]
+_SAMPLE_RE = re.compile(r"^(agentai_[a-z_]+)(?:\{([^}]*)\})? ([0-9.eE+-]+)$")
+
+
+async def _serve_upstream(port: int, latency: float) -> None:
+    """Stand-in Tavily: POST /search answers after `latency` (±30%) with `max_results` results."""
+    rnd = random.Random(7)
+
+    async def handle(reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(re.search(rb"(?i)content-length: *(\d+)", head).group(1))
+            body = json.loads(await reader.readexactly(length))
+            await asyncio.sleep(latency * rnd.uniform(0.7, 1.3))
+            query = body.get("query", "")
+            city = query.rsplit(" in ", 1)[-1].split(" with ")[0]
+            results = [{"title": f"{city} venue {i}", "url": f"https://example.com/{abs(hash(query)) % 9973}/{i}",
+                        "content": f"{100 + i} Main St, {city}. Open daily 10:00 am - 6:00 pm. Tickets ${10 + i}. "
+                                   f"Family friendly museum and park."} for i in range(int(body.get("max_results", 5)))]
+            payload = json.dumps({"results": results}).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                         b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+    print("ready", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def _free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _scrape(text):
+    out = {}
+    for line in text.splitlines():
+        m = _SAMPLE_RE.match(line)
+        if m:
+            out[(m.group(1), m.group(2) or "")] = float(m.group(3))
+    return out
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))] if xs else float("nan")
+
+
+async def _step(client, concurrency, seconds):
+    latencies, errors = [], 0
+    stop = time.perf_counter() + seconds
+
+    async def user(i):
+        nonlocal errors
+        rnd = random.Random(i)
+        while time.perf_counter() < stop:
+            body = {"booking": {"start_date": "2026-05-01", "end_date": "2026-05-04", "location": rnd.choice(CITIES),
+                                "party_type": "family", "children_ages": [7]},
+                    "preferences": {"budget": "medium"}, "nlu_query": "family trip"}
+            t0 = time.perf_counter()
+            r = await client.post("/api/v1/concierge-agent", json=body)
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - t0)
+            else:
+                errors += 1
+
+    async def scraper(samples):
+        while time.perf_counter() < stop:
+            await asyncio.sleep(1.0)
+            samples.append(_scrape((await client.get("/metrics")).text))
+
+    samples = []
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    await asyncio.gather(scraper(samples), *(user(i) for i in range(concurrency)))
+    cpu = (time.process_time() - cpu0) / (time.perf_counter() - t0)
+    gauges = {k: sum(s.get(k, 0.0) for s in samples) / max(1, len(samples)) for k in TARGETS}
+    return latencies, errors, cpu, gauges
+
+
+async def _run(args, port):
+    import httpx
+    import app as A
+    if A.loop_lag_monitor is not None:
+        A.loop_lag_monitor.start()  # startup events do not run under ASGITransport
+    transport = httpx.ASGITransport(app=A.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agentai", timeout=120) as client:
+        print(f"stand-in upstream ~{args.upstream_ms:.0f} ms on :{port}, Tavily concurrency "
+              f"{os.environ['SCHED_TAVILY_CONCURRENCY']}, {args.seconds:.0f} s per step, one pod")
+        print(f"{'users':>5} {'plans/s':>7} {'p50 s':>6} {'p95 s':>6} {'cpu%req':>7} {'inflight':>8} "
+              f"{'tavily':>6} {'wait s':>6} {'thr s':>6} {'lag s':>6} {'cpu HPA':>7} {'sat. HPA':>8}")
+        for concurrency in (int(x) for x in args.steps.split(",")):
+            latencies, errors, cpu, g = await _step(client, concurrency, args.seconds)
+            util = cpu / CPU_REQUEST
+            cpu_replicas = max(1, math.ceil(util / CPU_TARGET))
+            sat_replicas = max([cpu_replicas] + [math.ceil(g[k] / t) for k, t in TARGETS.items()])
+            inflight, tavily, wait, threads, lag = (g[k] for k in TARGETS)
+            print(f"{concurrency:>5} {len(latencies) / args.seconds:>7.1f} {_pct(latencies, 50):>6.2f} "
+                  f"{_pct(latencies, 95):>6.2f} {util * 100:>6.0f}% {inflight:>8.1f} {tavily:>6.1f} {wait:>6.2f} "
+                  f"{threads:>6.3f} {lag:>6.3f} {cpu_replicas:>7} {sat_replicas:>8}"
+                  + (f"  ({errors} errors)" if errors else ""))
+            await asyncio.sleep(args.cooldown)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--steps", default="1,4,16,48")
+    ap.add_argument("--seconds", type=float, default=8)
+    ap.add_argument("--cooldown", type=float, default=2)
+    ap.add_argument("--upstream-ms", type=float, default=1500)
+    ap.add_argument("--tavily-concurrency", type=int, default=8)
+    ap.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.serve:
+        asyncio.run(_serve_upstream(args.serve, args.upstream_ms / 1e3))
+        return
+    port = _free_port()
+    upstream = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_saturation", "--serve", str(port),
+                                 "--upstream-ms", str(args.upstream_ms)], stdout=subprocess.PIPE, text=True)
+    try:
+        upstream.stdout.readline()
+        os.environ.update({
+            "TAVILY_API_KEY": "bench", "TAVILY_API_URL": f"http://127.0.0.1:{port}/search",
+            "PLAN_CACHE_ENABLED": "false", "SEARCH_CACHE_ENABLED": "false", "PROPERTY_INDEX_ENABLED": "false",
+            "ENRICH_WORKERS": "0", "HEDGE_ENABLED": "false", "PLAN_SESSIONS_ENABLED": "false",
+            "SATURATION_WINDOW_SECONDS": "5", "SCHED_TAVILY_CONCURRENCY": str(args.tavily_concurrency),
+        })
+        asyncio.run(_run(args, port))
+    finally:
+        upstream.terminate()
+
+
+if __name__ == "__main__":
+    main()
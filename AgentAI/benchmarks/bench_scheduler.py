@@ -0,0 +1,73 @@
+"""Interactive vs background queue wait under a background flood.
+
+Simulates an upstream with fixed latency and limited concurrency, a steady
+stream of interactive calls and a burst of background (precompute) calls, and
+compares per-class queue wait with the priority scheduler against a single
+FIFO class. Run from the AgentAI folder:  python -m benchmarks.bench_scheduler
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from scheduler import ClassConfig, PriorityScheduler, SchedulerRejected
+
+
+def _pct(xs, p):
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+async def _scenario(sched: PriorityScheduler, n_bg: int, n_int: int, latency: float, gap: float, fifo: bool):
+    waits = {"interactive": [], "background": []}
+    shed = {"interactive": 0, "background": 0}
+
+    async def call(cls):
+        t0 = time.perf_counter()
+        try:
+            async with sched.slot("interactive" if fifo else cls):
+                waits[cls].append(time.perf_counter() - t0)
+                await asyncio.sleep(latency)
+        except SchedulerRejected:
+            shed[cls] += 1
+
+    tasks = [asyncio.create_task(call("background")) for _ in range(n_bg)]
+    for _ in range(n_int):
+        tasks.append(asyncio.create_task(call("interactive")))
+        await asyncio.sleep(gap)
+    await asyncio.gather(*tasks)
+    return waits, shed
+
+
+def _make(concurrency: int, queue: int, fifo: bool) -> PriorityScheduler:
+    if fifo:
+        return PriorityScheduler("fifo", concurrency, queue, {"interactive": ClassConfig(1, concurrency, queue)})
+    return PriorityScheduler("wfq", concurrency, queue, {
+        "interactive": ClassConfig(8, concurrency, queue),
+        "background": ClassConfig(1, max(1, concurrency // 4), max(1, queue // 4)),
+    })
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--queue", type=int, default=400)
+    ap.add_argument("--background", type=int, default=300)
+    ap.add_argument("--interactive", type=int, default=100)
+    ap.add_argument("--latency", type=float, default=0.02)
+    ap.add_argument("--gap", type=float, default=0.005)
+    args = ap.parse_args()
+    for fifo in (True, False):
+        sched = _make(args.concurrency, args.queue, fifo)
+        waits, shed = asyncio.run(_scenario(sched, args.background, args.interactive, args.latency, args.gap, fifo))
+        name = "single FIFO class " if fifo else "priority scheduler"
+        for cls in ("interactive", "background"):
+            w = waits[cls]
+            print(f"{name} {cls:<12} n={len(w):4d} shed={shed[cls]:4d} "
+                  f"wait p50={statistics.median(w) * 1e3 if w else 0:7.1f}ms p95={_pct(w, 95) * 1e3:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Spatial property queries at 100k listings: grid index vs a linear scan.
+
+Loads 100k listings clustered around a dozen metros into a `PropertyIndex`
+through the fake cursor from bench_property_index (so the sync path builds the
+spatial index), then times k-nearest to one point, k-nearest to a day's
+activities (mean distance to four points) and within-radius queries against a
+full scan of every listing. A sample of queries is checked against the scan
+for identical results. Run from the AgentAI folder:
+
+    python -m benchmarks.bench_spatial [--properties 100000]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_property_index import FakeDB
+from property_index import PropertyIndex
+from spatial import haversine_km
+
+METROS = [(37.7749, -122.4194), (40.7128, -74.0060), (34.0522, -118.2437), (41.8781, -87.6298), (47.6062, -122.3321),
+          (42.3601, -71.0589), (25.7617, -80.1918), (30.2672, -97.7431), (39.7392, -104.9903), (45.5152, -122.6784),
+          (32.7157, -117.1611), (29.9511, -90.0715)]
+
+
+def _rows(n, t0, rnd):
+    out = []
+    for i in range(1, n + 1):
+        lat, lng = rnd.choice(METROS)
+        out.append({
+            "id": i, "name": f"Listing {i}", "city": "X", "state": "XX", "country": "USA",
+            "price_per_night": rnd.randint(60, 600), "is_active": 1,
+            "latitude": lat + rnd.gauss(0, 0.12), "longitude": lng + rnd.gauss(0, 0.15),
+            "created_at": t0 + timedelta(seconds=i), "updated_at": t0 + timedelta(seconds=i), "main_image": None,
+        })
+    return out
+
+
+def _scan(records, points, k=None, radius=None, band=0.5):
+    """Reference: score every listing, same ranking as the index."""
+    scored = []
+    for r in records:
+        d = sum(haversine_km(a, b, r.latitude, r.longitude) for a, b in points) / len(points)
+        if radius is None or d <= radius:
+            scored.append((int(d / band), r.price_per_night, d, r.id))
+    scored.sort()
+    return [s[3] for s in (scored if k is None else scored[:k])]
+
+
+def _pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+def _time(fn, args_list):
+    lat = []
+    for a in args_list:
+        t0 = time.perf_counter()
+        fn(*a)
+        lat.append(time.perf_counter() - t0)
+    return lat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--properties", type=int, default=100_000)
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--scan-queries", type=int, default=5)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+    rnd = random.Random(3)
+    idx = PropertyIndex(FakeDB(_rows(args.properties, datetime(2025, 1, 1), rnd)), page_size=20_000)
+    t0 = time.perf_counter()
+    idx.full_sync()
+    load_s = time.perf_counter() - t0
+    records = idx.records()
+
+    def near(spread=0.05, metro=None):
+        lat, lng = metro or rnd.choice(METROS)
+        return lat + rnd.gauss(0, spread), lng + rnd.gauss(0, spread)
+
+    def day():
+        metro = near()
+        return [near(0.03, metro) for _ in range(4)]
+
+    singles = [([near()],) for _ in range(args.queries)]
+    days = [(day(),) for _ in range(args.queries)]
+    radii = [(*near(), r) for r in (1.0, 5.0) for _ in range(args.queries // 2)]
+
+    # Exactness: same ids, same order as the scan
+    for pts, in singles[:args.scan_queries] + days[:args.scan_queries]:
+        assert [p["id"] for p in idx.nearest(pts, args.k)] == _scan(records, pts, args.k)
+    for lat, lng, r in radii[:args.scan_queries]:
+        assert [p["id"] for p in idx.within(lat, lng, r)] == _scan(records, [(lat, lng)], radius=r)
+
+    print(f"{len(idx):,} listings ({idx.geo_count():,} with coordinates), index build during full sync {load_s:.2f}s")
+    print(f"{'query':<26} {'index p50 ms':>12} {'p95 ms':>8} {'scan p50 ms':>12} {'speedup':>8}")
+    cases = [
+        (f"{args.k}-nearest, 1 point", lambda pts: idx.nearest(pts, args.k), lambda pts: _scan(records, pts, args.k), singles),
+        (f"{args.k}-nearest, day (4 pts)", lambda pts: idx.nearest(pts, args.k), lambda pts: _scan(records, pts, args.k), days),
+        ("within 1 km", lambda a, b, r: idx.within(a, b, r), lambda a, b, r: _scan(records, [(a, b)], radius=r),
+         radii[:args.queries // 2]),
+        ("within 5 km", lambda a, b, r: idx.within(a, b, r), lambda a, b, r: _scan(records, [(a, b)], radius=r),
+         radii[args.queries // 2:]),
+    ]
+    for name, fn, scan, qs in cases:
+        lat = _time(fn, qs)
+        scan_lat = _time(scan, qs[:args.scan_queries])
+        print(f"{name:<26} {_pct(lat, 50) * 1e3:>12.3f} {_pct(lat, 95) * 1e3:>8.3f} {_pct(scan_lat, 50) * 1e3:>12.1f} "
+              f"{_pct(scan_lat, 50) / _pct(lat, 50):>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Near-duplicate venue detection: dedup rate, accuracy and cost.
+
+Generates search results for a set of distinct venues, where each venue
+comes back one to four times as a typical upstream would return it: with
+"The"/"Official Site"/"Tripadvisor" decorations, "&" for "and", a typo, from
+the venue's own site, a listing site or a tracking-tagged link, in the POI,
+event or restaurant list. Compares what each approach collapses against the
+known venues (pair precision and recall):
+
+- slug: the previous behavior, one activity per `_slugify(title)`
+- exact pairs: exact 3-gram Jaccard over every pair (quadratic; small sizes only)
+- minhash: `VenueDeduper` (MinHash + LSH bands + canonical URLs)
+
+Then re-sends a fresh sample of the same venues, as cached results for the
+city would be, and reports how many resolve to a venue already seen. Run from
+the AgentAI folder:
+
+    python -m benchmarks.bench_venue_dedup [--sizes 1000,2000,5000,10000]
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from app import _slugify
+from dedup import VenueDeduper, _shingles, normalize_title, same_words
+from ingest import ingest
+
+ADJ = ["Golden", "Harbor", "Sunset", "Mission", "Union", "Pacific", "Presidio", "Bayview", "Twin Peaks", "Marina",
+       "Chinatown", "Nob Hill", "Embarcadero", "Lombard", "Ocean", "Civic", "Lakeside", "Redwood", "Cypress", "Alamo"]
+NOUN = ["Science", "Art", "History", "Maritime", "Children's", "Modern", "Asian", "Natural", "Music", "Railway",
+        "Garden", "Botanical", "Jazz", "Farmers", "Night", "Film", "Street", "Craft", "Wine", "Seafood"]
+KIND = [("Museum", 1), ("Gallery", 1), ("Park", 1), ("Conservatory", 1), ("Festival", 0), ("Market", 1),
+        ("Theater", 1), ("Concert Series", 0), ("Bistro", 2), ("Kitchen", 2), ("Trattoria", 2), ("Cafe", 2)]
+DECORATIONS = ["{}", "The {}", "{} | Official Site", "{} - Tripadvisor", "{}: Tickets & Hours", "{} - Yelp",
+               "{} (San Francisco)", "Visit {}"]
+HOSTS = ["tripadvisor.com", "yelp.com", "timeout.com", "sfgate.com"]
+
+
+def _typo(rnd, s):
+    i = rnd.randrange(1, len(s) - 1)
+    return s[:i] + s[i + 1] + s[i] + s[i + 2:] if s[i] != " " and s[i + 1] != " " else s
+
+
+def venues(n, rnd):
+    seen, out = set(), []
+    while len(out) < n:
+        kind, group = rnd.choice(KIND)
+        name = f"{rnd.choice(ADJ)} {rnd.choice(NOUN)} {kind}"
+        if rnd.random() < 0.5:
+            name += f" {rnd.randrange(2, 400)}"  # numbered venues: piers, stages, branches
+        if name not in seen:
+            seen.add(name)
+            out.append((name, group))
+    return out
+
+
+def results(catalog, n, rnd):
+    """`n` results over `catalog`, each venue repeated 1-4 times; returns (groups, true venue per record)."""
+    groups, truth = [[], [], []], [[], [], []]
+    while sum(len(g) for g in groups) < n:
+        v = rnd.randrange(len(catalog))
+        name, group = catalog[v]
+        own = f"https://www.{_slugify(name)}.org/"
+        for _ in range(rnd.choice((1, 1, 2, 2, 3, 4))):
+            title = rnd.choice(DECORATIONS).format(name.replace(" and ", " & "))
+            if rnd.random() < 0.15:
+                title = _typo(rnd, title)
+            url = rnd.choice((own, f"{own}?utm_source=tavily", f"https://{rnd.choice(HOSTS)}/{_slugify(name)}"))
+            # Events and POIs swap lists now and then; restaurants stay restaurants
+            g = group if group == 2 else rnd.choice((group, group, 1 - group))
+            groups[g].append({"title": title, "url": url, "content": f"{name} in San Francisco. $$"})
+            truth[g].append(v)
+    return [ingest(g, ["san francisco"]) for g in groups], [v for t in truth for v in t]
+
+
+def _pairs(counts):
+    return sum(c * (c - 1) // 2 for c in counts)
+
+
+def score(clusters, truth):
+    """Pair precision and recall of `clusters` (lists of record indices) against the true venues."""
+    predicted = _pairs(len(c) for c in clusters)
+    correct = sum(_pairs(Counter(truth[i] for i in c).values()) for c in clusters)
+    actual = _pairs(Counter(truth).values())
+    return correct / predicted if predicted else 1.0, correct / actual if actual else 1.0
+
+
+def slug_clusters(records):
+    by_slug = {}
+    for i, r in enumerate(records):
+        by_slug.setdefault(_slugify(r.title), []).append(i)
+    return list(by_slug.values())
+
+
+def exact_clusters(records, threshold):
+    titles = [normalize_title(r.title, {"san", "francisco"}) for r in records]
+    grams = [set(_shingles(t)) for t in titles]
+    words = [set(t.split()) for t in titles]
+    parent = list(range(len(records)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i in range(len(records)):
+        for j in range(i):
+            if len(grams[i] & grams[j]) >= threshold * len(grams[i] | grams[j]) and same_words(words[i], words[j]):
+                parent[find(i)] = find(j)
+    out = {}
+    for i in range(len(records)):
+        out.setdefault(find(i), []).append(i)
+    return list(out.values())
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,2000,5000,10000")
+    ap.add_argument("--exact-max", type=int, default=2000, help="largest size to run the all-pairs baseline at")
+    args = ap.parse_args()
+    print(f"{'results':>7} {'method':<12} {'kept':>6} {'collapsed':>9} {'precision':>9} {'recall':>7} "
+          f"{'ms':>8} {'µs/result':>9}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        rnd = random.Random(n)
+        catalog = venues(n // 2, rnd)
+        groups, truth = results(catalog, n, rnd)
+        records = [r for g in groups for r in g]
+        true_venues = len(set(truth))
+        dedup = VenueDeduper(per_city=n)  # room for every venue, so the repeat pass can match all it has seen
+        runs = [("slug", lambda: slug_clusters(records))]
+        if n <= args.exact_max:
+            runs.append(("exact pairs", lambda: exact_clusters(records, dedup.threshold)))
+        runs.append(("minhash", lambda: dedup.clusters(records, "San Francisco")[0]))
+        for name, fn in runs:
+            t0 = time.perf_counter()
+            clusters = fn()
+            elapsed = time.perf_counter() - t0
+            precision, recall = score(clusters, truth)
+            print(f"{len(records):>7} {name:<12} {len(clusters):>6} {len(records) - len(clusters):>9} "
+                  f"{precision:>9.3f} {recall:>7.3f} {elapsed * 1e3:>8.1f} {elapsed / len(records) * 1e6:>9.1f}")
+        t0 = time.perf_counter()
+        _, info = dedup.dedupe(groups, "San Francisco")
+        elapsed = time.perf_counter() - t0
+        print(f"{'':>7} {'(true venues':<12} {true_venues:>6}) full dedupe with city index {elapsed * 1e3:.1f} ms")
+        # The same venues again, as cached results for the city would bring them back
+        again, again_truth = results(catalog, n // 4, random.Random(n + 1))
+        t0 = time.perf_counter()
+        out, info = dedup.dedupe(again, "San Francisco")
+        elapsed = time.perf_counter() - t0
+        known = len(set(again_truth) & set(truth)) / len(set(again_truth))
+        print(f"{'':>7} {'repeat 25%':<12} {info['kept']:>6} {info['collapsed']:>9} matched a known venue: "
+              f"{info['matched'] / max(1, info['kept']):.1%} (seen before: {known:.1%}), {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Plan body encode/decode: JSON vs msgpack, per schema variant.
+
+Builds real plans offline (1-, 7- and 14-day trips, debug included as the
+internal callers ask for it) and times the encoders `_plan_response` uses
+(compact `json.dumps` / `msgpack.packb`) and the matching decoders a caller
+would run (`json.loads` / `msgpack.unpackb`). Reports µs per plan and body
+size raw and under brotli (gzip when brotli is absent) for the full
+new+legacy body and each schema variant. Run from the AgentAI folder:
+
+    python -m benchmarks.bench_wire_format [--repeat 2000]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+
+os.environ.pop("TAVILY_API_KEY", None)
+os.environ["PLAN_CACHE_ENABLED"] = "false"
+os.environ["PROPERTY_INDEX_ENABLED"] = "false"
+
+import msgpack  # noqa: E402
+
+import app as A  # noqa: E402
+
+
+def _json_encode(body):
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def _msgpack_encode(body):
+    return msgpack.packb(body, use_bin_type=True, default=str)
+
+
+CODECS = {
+    "json": (_json_encode, json.loads),
+    "msgpack": (_msgpack_encode, msgpack.unpackb),
+}
+
+
+def _compress(raw):
+    return A.brotli.compress(raw, quality=5) if A.BROTLI_AVAILABLE else gzip.compress(raw, compresslevel=5)
+
+
+def _time(fn, arg, repeat):
+    fn(arg)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", default="1,7,14")
+    ap.add_argument("--repeat", type=int, default=2000)
+    args = ap.parse_args()
+    print(f"{'days':>4} {'schema':<7} {'format':<8} {'encode µs':>9} {'decode µs':>9} {'enc+dec':>8} "
+          f"{'bytes':>7} {'compressed':>10}")
+    for days in (int(x) for x in args.days.split(",")):
+        payload = A.AgentV2Input(
+            booking={"start_date": "2026-03-01", "end_date": f"2026-03-{days:02d}", "location": "San Francisco",
+                     "party_type": "family", "children_ages": [6, 9]},
+            preferences={"interests": ["museums", "parks"], "dietary": {"vegetarian": True}},
+            nlu_query="family trip with kids, museums and parks")
+        plan = asyncio.run(A._plan(payload))
+        for schema in ("both", "new", "legacy"):
+            body = A._plan_body(plan, include_debug=True, schema=schema)
+            base = None
+            for fmt, (encode, decode) in CODECS.items():
+                raw = encode(body)
+                assert decode(raw) == json.loads(_json_encode(body))
+                t_enc = _time(encode, body, args.repeat)
+                t_dec = _time(decode, raw, args.repeat)
+                total = t_enc + t_dec
+                base = base or total
+                print(f"{days:>4} {schema:<7} {fmt:<8} {t_enc * 1e6:>9.1f} {t_dec * 1e6:>9.1f} "
+                      f"{total / base:>7.2f}x {len(raw):>7} {len(_compress(raw)):>10}")
+
+
+if __name__ == "__main__":
+    main()
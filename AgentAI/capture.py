@@ -0,0 +1,174 @@
+"""Sampled traffic capture for replay (replay.py).
+
+With CAPTURE_ENABLED, a CAPTURE_SAMPLE_RATE share of `/concierge-agent`
+requests is kept in an in-memory ring of the last CAPTURE_CAPACITY records,
+served as JSON lines by `/debug/capture`. A record holds:
+
+- the request as the endpoint parsed it (`kind` "v2" or "legacy"), normalized
+  to its set fields and scrubbed of PII: legacy `booking_context` and
+  `preferences` keys the planner does not read and the free-form legacy
+  `local_context` (UI state the planner ignores) are redacted, and emails, phone
+  numbers and long digit runs in every string are replaced by placeholders.
+  Names in free text are not detected.
+- every Tavily response the plan fetched: query, depth, max_results, status,
+  latency and the parsed body. The API key is never recorded.
+- the response status and the request's latency.
+
+Upstream calls are tied to their request through a context variable, so the
+tasks a plan fans out to (hedges, concurrent queries) record into it. A sampled
+request skips the plan and search caches (`recording()`), so its upstream
+responses are all recorded; that costs extra searches for sampled requests
+only.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Union
+import collections
+import contextvars
+import json
+import os
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+
+import metrics
+
+CAPTURE_RECORDS = metrics.counter("agentai_capture_records_total", "Requests captured for replay, by kind")
+
+# Legacy keys _plan reads; any other value is redacted (the key stays, so the request's shape does too)
+LEGACY_BOOKING_KEYS = {"start_date", "end_date", "check_in", "check_out", "checkIn", "checkOut", "dates", "location",
+                       "city", "destination", "party_type", "partyType", "guests", "party_size", "children_ages",
+                       "booking_id", "bookingId", "property_id", "propertyId"}
+LEGACY_PREFERENCE_KEYS = {"budget", "interests", "mobility_needs", "dietary"}
+REDACTED = "<redacted>"
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE_RE = re.compile(r"(?<![\w+])\+?\(?\d[\d\s().-]{6,}\d(?!\w)")
+_DATE_RE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}(?:/\d{2,4})?")
+_DIGITS_RE = re.compile(r"\b\d{6,}\b")
+
+_ACTIVE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("agentai_capture", default=None)
+
+
+def _phone(m: "re.Match[str]") -> str:
+    s = m.group(0)
+    # Date ranges ("2026-05-01 2026-05-04") look like digit runs too; the planner needs them intact
+    digits = sum(c.isdigit() for c in s)
+    if _DATE_RE.search(s) or digits < 9:
+        return s
+    return "<phone>" if digits <= 15 else "<number>"  # longer runs are card numbers
+
+
+def scrub_text(text: str) -> str:
+    """`text` with emails, phone and card numbers, and digit runs of 6+ (booking, account numbers) replaced."""
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _PHONE_RE.sub(_phone, text)
+    return _DIGITS_RE.sub("<number>", text)
+
+
+def scrub(value: Any) -> Any:
+    if isinstance(value, str):
+        return scrub_text(value)
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    return value
+
+
+def _allow(d: Any, keys: set) -> Any:
+    if not isinstance(d, dict):
+        return d
+    return {k: (v if k in keys else REDACTED) for k, v in d.items()}
+
+
+def scrub_request(kind: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """A scrubbed copy of a parsed request (`model_dump(exclude_unset=True)`) of the given kind."""
+    if kind == "legacy":
+        request = dict(request)
+        if "booking_context" in request:
+            request["booking_context"] = _allow(request["booking_context"], LEGACY_BOOKING_KEYS)
+        if "preferences" in request:
+            request["preferences"] = _allow(request["preferences"], LEGACY_PREFERENCE_KEYS)
+        if "local_context" in request:
+            request["local_context"] = REDACTED
+    return scrub(request)
+
+
+def recording() -> bool:
+    """True inside a request that is being captured."""
+    return _ACTIVE.get() is not None
+
+
+def record_upstream(query: str, depth: str, max_results: int, seconds: float, status: int,
+                    body: Union[bytes, Dict[str, Any]]) -> None:
+    """Attach one Tavily response to the request being captured, if any."""
+    rec = _ACTIVE.get()
+    if rec is None:
+        return
+    if isinstance(body, (bytes, bytearray)):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = {"results": []}
+    rec["upstream"].append({"query": query, "depth": depth, "max_results": max_results, "status": status,
+                            "latency_ms": round(seconds * 1e3, 2), "body": body})
+
+
+class TrafficCapture:
+    """Ring of the last `capacity` sampled requests with their upstream responses."""
+
+    def __init__(self, capacity: int = 1000, sample_rate: float = 0.01):
+        self.capacity = int(capacity)
+        self.sample_rate = float(sample_rate)
+        self._ring: "collections.deque[Dict[str, Any]]" = collections.deque(maxlen=self.capacity)
+        self.seen = 0
+        self.captured = 0
+
+    def begin(self, endpoint: str, kind: str, request: Dict[str, Any],
+              params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Start capturing this request if it is sampled; returns the open record or None.
+        Every record returned must be passed to `end` from the same task."""
+        self.seen += 1
+        if random.random() >= self.sample_rate:
+            return None
+        now = time.time()
+        # Requests without dates are planned from "today"; replay warns when that is no longer the capture day
+        rec = {"id": uuid.uuid4().hex[:16], "ts": round(now, 3),
+               "captured_on": datetime.utcfromtimestamp(now).date().isoformat(), "endpoint": endpoint,
+               "kind": kind, "params": params, "request": scrub_request(kind, request), "upstream": [],
+               "_t0": time.perf_counter()}
+        rec["_token"] = _ACTIVE.set(rec)
+        return rec
+
+    def end(self, rec: Dict[str, Any], status: int) -> None:
+        _ACTIVE.reset(rec.pop("_token"))
+        rec["status"] = status
+        rec["latency_ms"] = round((time.perf_counter() - rec.pop("_t0")) * 1e3, 2)
+        self._ring.append(rec)
+        self.captured += 1
+        CAPTURE_RECORDS.inc(kind=rec["kind"])
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def records(self, clear: bool = False) -> List[Dict[str, Any]]:
+        out = list(self._ring)
+        if clear:
+            self._ring.clear()
+        return out
+
+    def jsonl(self, clear: bool = False) -> Iterator[str]:
+        for rec in self.records(clear):
+            yield json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"size": len(self._ring), "capacity": self.capacity, "sample_rate": self.sample_rate,
+                "seen": self.seen, "captured": self.captured}
+
+
+def capture_from_env() -> Optional[TrafficCapture]:
+    if os.getenv("CAPTURE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    return TrafficCapture(capacity=int(os.getenv("CAPTURE_CAPACITY", "1000")),
+                          sample_rate=float(os.getenv("CAPTURE_SAMPLE_RATE", "0.01")))
@@ -0,0 +1,342 @@
+"""Booking-event consumer that precomputes concierge plans.
+
+Separate entry point from the web app:
+
+    python consumer.py                    # Kafka (aiokafka), topics from PRECOMPUTE_TOPICS
+    python consumer.py --broker memory    # local in-process broker stand-in
+
+Subscribes to booking-created (`bookings.requests`) and booking-confirmed
+(`bookings.status` with status accepted/confirmed) events, builds an
+`AgentV2Input` from the booking, and plans it with bounded parallelism. The
+plan's upstream context (weather, events, POIs, restaurants) goes to the shared
+plan store (PRECOMPUTE_STORE) keyed by booking, so an interactive request for
+that booking plans from it without searching, whatever its preferences and
+prompt. Consumer lag and precompute hit rate are exported as metrics and
+logged periodically.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+
+import metrics
+from saturation import run_blocking
+from scheduler import PRIORITY, SCHEDULERS
+
+try:
+    from aiokafka import AIOKafkaConsumer, TopicPartition  # type: ignore
+    AIOKAFKA_AVAILABLE = True
+except Exception:
+    AIOKAFKA_AVAILABLE = False
+
+log = logging.getLogger("agentai.consumer")
+
+CREATED_TOPIC = "bookings.requests"
+STATUS_TOPIC = "bookings.status"
+CONFIRMED_STATUSES = {"accepted", "confirmed"}
+
+CONSUMER_LAG = metrics.gauge("agentai_precompute_consumer_lag", "Messages behind the log end, per topic/partition")
+PRECOMPUTE_JOBS = metrics.counter("agentai_precompute_jobs_total", "Precompute jobs by outcome")
+PRECOMPUTE_SECONDS = metrics.histogram("agentai_precompute_seconds", "Time to precompute one plan",
+                                       buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+PRECOMPUTE_HIT_RATE = metrics.gauge("agentai_precompute_hit_rate", "Share of stored precomputed plans served at least once")
+
+
+class Record:
+    __slots__ = ("topic", "partition", "offset", "value")
+
+    def __init__(self, topic: str, partition: int, offset: int, value: Any):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+        self.value = value
+
+
+# ------------------------------
+# Brokers
+# ------------------------------
+class InMemoryBroker:
+    """Local broker stand-in: append-only topics with one partition and per-group committed offsets."""
+
+    def __init__(self):
+        self.logs: Dict[str, List[Any]] = {}
+        self.committed: Dict[Tuple[str, str], int] = {}
+
+    def produce(self, topic: str, message: Dict[str, Any]) -> None:
+        # Same wire format as Backend/src/services/kafka.js (JSON value)
+        self.logs.setdefault(topic, []).append(json.dumps(message).encode("utf-8"))
+
+    def consumer(self, topics: List[str], group_id: str) -> "InMemoryConsumer":
+        return InMemoryConsumer(self, topics, group_id)
+
+
+class InMemoryConsumer:
+    def __init__(self, broker: InMemoryBroker, topics: List[str], group_id: str):
+        self.broker = broker
+        self.topics = topics
+        self.group_id = group_id
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    async def getmany(self, max_records: int = 100, timeout_ms: int = 500) -> List[Record]:
+        out: List[Record] = []
+        for t in self.topics:
+            log_ = self.broker.logs.get(t, [])
+            pos = self.broker.committed.get((self.group_id, t), 0)
+            for off in range(pos, min(len(log_), pos + max_records - len(out))):
+                out.append(Record(t, 0, off, log_[off]))
+        if not out:
+            await asyncio.sleep(timeout_ms / 1000.0)
+        return out
+
+    async def commit(self, records: List[Record]) -> None:
+        for r in records:
+            key = (self.group_id, r.topic)
+            self.broker.committed[key] = max(self.broker.committed.get(key, 0), r.offset + 1)
+
+    async def lag(self) -> Dict[Tuple[str, int], int]:
+        return {
+            (t, 0): len(self.broker.logs.get(t, [])) - self.broker.committed.get((self.group_id, t), 0)
+            for t in self.topics
+        }
+
+
+class KafkaConsumerAdapter:
+    """aiokafka consumer with manual commits, exposing the same surface as InMemoryConsumer."""
+
+    def __init__(self, topics: List[str], group_id: str, brokers: str):
+        if not AIOKAFKA_AVAILABLE:
+            raise RuntimeError("aiokafka not installed. Run: pip install aiokafka")
+        self._consumer = AIOKafkaConsumer(
+            *topics, bootstrap_servers=brokers, group_id=group_id,
+            enable_auto_commit=False, auto_offset_reset="latest",
+            client_id=os.getenv("KAFKA_CLIENT_ID", "agentai-precompute"),
+        )
+
+    async def start(self) -> None:
+        await self._consumer.start()
+
+    async def stop(self) -> None:
+        await self._consumer.stop()
+
+    async def getmany(self, max_records: int = 100, timeout_ms: int = 500) -> List[Record]:
+        batches = await self._consumer.getmany(timeout_ms=timeout_ms, max_records=max_records)
+        return [Record(tp.topic, tp.partition, m.offset, m.value) for tp, msgs in batches.items() for m in msgs]
+
+    async def commit(self, records: List[Record]) -> None:
+        offsets: Dict[Any, int] = {}
+        for r in records:
+            tp = TopicPartition(r.topic, r.partition)
+            offsets[tp] = max(offsets.get(tp, 0), r.offset + 1)
+        if offsets:
+            await self._consumer.commit(offsets)
+
+    async def lag(self) -> Dict[Tuple[str, int], int]:
+        out: Dict[Tuple[str, int], int] = {}
+        for tp in self._consumer.assignment():
+            high = self._consumer.highwater(tp)
+            if high is None:
+                continue
+            pos = await self._consumer.position(tp)
+            out[(tp.topic, tp.partition)] = max(0, high - pos)
+        return out
+
+
+# ------------------------------
+# Event -> AgentV2Input
+# ------------------------------
+def _iso(d: Any) -> Optional[str]:
+    if d is None:
+        return None
+    if isinstance(d, (datetime, date)):
+        return d.isoformat()[:10]
+    return str(d)[:10]
+
+
+def classify_event(topic: str, msg: Dict[str, Any]) -> Optional[str]:
+    if topic == CREATED_TOPIC:
+        return "created"
+    if topic == STATUS_TOPIC and str(msg.get("status") or "").lower() in CONFIRMED_STATUSES:
+        return "confirmed"
+    return None
+
+
+def build_agent_input(msg: Dict[str, Any], lookup=None):
+    """Build an AgentV2Input from a booking event, filling gaps (location, dates) from the database via `lookup`."""
+    from app import AgentV2Input, Booking, Preferences
+    booking_id = msg.get("booking_id") or msg.get("bookingId") or msg.get("id")
+    start = _iso(msg.get("check_in_date") or msg.get("start_date"))
+    end = _iso(msg.get("check_out_date") or msg.get("end_date"))
+    location = msg.get("location") or msg.get("city")
+    guests = msg.get("number_of_guests") or msg.get("guests")
+    property_id = msg.get("property_id") or msg.get("propertyId")
+    if lookup is not None and (not location or not start or not end):
+        row = lookup(booking_id=booking_id) if booking_id is not None else lookup(property_id=msg.get("property_id"))
+        if row:
+            location = location or row.get("city")
+            start = start or _iso(row.get("check_in_date"))
+            end = end or _iso(row.get("check_out_date"))
+            guests = guests or row.get("number_of_guests")
+    if not location or not start or not end:
+        return None, booking_id
+    booking = Booking(start_date=start, end_date=end, location=str(location),
+                      party_size=int(guests) if guests else None,
+                      booking_id=str(booking_id) if booking_id is not None else None,
+                      property_id=str(property_id) if property_id is not None else None)
+    return AgentV2Input(booking=booking, preferences=Preferences()), booking_id
+
+
+# ------------------------------
+# Consumer loop
+# ------------------------------
+class PrecomputeConsumer:
+    def __init__(self, consumer, plan_fn, lookup=None, concurrency: int = 4, report_every: float = 30.0, store=None):
+        self.consumer = consumer
+        self.plan_fn = plan_fn
+        self.lookup = lookup
+        self.store = store
+        self.report_every = report_every
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._seen: Dict[str, float] = {}
+        self._stopping = False
+
+    async def _handle(self, rec: Record) -> None:
+        # Precompute competes with live users for Tavily/MySQL: everything below runs as background work
+        PRIORITY.set("background")
+        try:
+            msg = json.loads(rec.value) if isinstance(rec.value, (bytes, str)) else rec.value
+        except Exception:
+            PRECOMPUTE_JOBS.inc(outcome="bad_message")
+            return
+        kind = classify_event(rec.topic, msg or {})
+        if kind is None:
+            PRECOMPUTE_JOBS.inc(outcome="ignored")
+            return
+        async with self._sem:
+            try:
+                async with SCHEDULERS["db"].slot():
+                    payload, booking_id = await run_blocking(build_agent_input, msg, self.lookup)
+            except Exception as e:
+                log.warning("booking lookup failed for %s: %s", msg, e)
+                payload, booking_id = None, None
+            if payload is None:
+                PRECOMPUTE_JOBS.inc(outcome="unresolved", event=kind)
+                return
+            # created + confirmed for the same booking: compute once within the store TTL window. Other bookings of
+            # the same city and dates still get their own row, since requests look context up by booking
+            b = payload.booking
+            dedup_key = (f"booking:{booking_id}" if booking_id is not None
+                         else f"property:{b.property_id}|{b.location}|{b.start_date}|{b.end_date}")
+            now = time.time()
+            if len(self._seen) > 10000:
+                self._seen = {k: v for k, v in self._seen.items() if v > now}
+            if self._seen.get(dedup_key, 0) > now:
+                PRECOMPUTE_JOBS.inc(outcome="duplicate", event=kind)
+                return
+            # Claimed before planning, so the other event of a pair arriving meanwhile is a duplicate; released on failure
+            self._seen[dedup_key] = now + float(os.getenv("PRECOMPUTE_DEDUP_SECONDS", "3600"))
+            t0 = time.perf_counter()
+            try:
+                await self.plan_fn(payload, origin="precompute", booking_ref=str(booking_id) if booking_id is not None else None)
+                PRECOMPUTE_JOBS.inc(outcome="ok", event=kind)
+            except Exception as e:
+                log.warning("precompute failed for booking %s: %s", booking_id, e)
+                self._seen.pop(dedup_key, None)
+                PRECOMPUTE_JOBS.inc(outcome="error", event=kind)
+            finally:
+                PRECOMPUTE_SECONDS.observe(time.perf_counter() - t0)
+
+    async def report(self) -> Dict[str, Any]:
+        lag = await self.consumer.lag()
+        for (topic, partition), v in lag.items():
+            CONSUMER_LAG.set(v, topic=topic, partition=str(partition))
+        out: Dict[str, Any] = {"lag": {f"{t}[{p}]": v for (t, p), v in lag.items()}}
+        if self.store is not None:
+            try:
+                st = await run_blocking(self.store.stats)
+                rate = st["hit"] / st["stored"] if st["stored"] else 0.0
+                PRECOMPUTE_HIT_RATE.set(rate)
+                out.update(stored=st["stored"], hit_rate=round(rate, 4))
+            except Exception as e:
+                log.warning("plan store stats failed: %s", e)
+        out["jobs"] = {",".join(f"{a}={b}" for a, b in sorted(labels.items())): v for labels, v in PRECOMPUTE_JOBS.items()}
+        return out
+
+    async def run_once(self, max_records: int = 100, timeout_ms: int = 500) -> int:
+        records = await self.consumer.getmany(max_records=max_records, timeout_ms=timeout_ms)
+        if records:
+            await asyncio.gather(*(self._handle(r) for r in records))
+            await self.consumer.commit(records)
+        return len(records)
+
+    async def run(self) -> None:
+        await self.consumer.start()
+        last_report = 0.0
+        try:
+            while not self._stopping:
+                await self.run_once()
+                if time.time() - last_report >= self.report_every:
+                    last_report = time.time()
+                    log.info("precompute status %s", json.dumps(await self.report()))
+        finally:
+            await self.consumer.stop()
+
+    def stop(self) -> None:
+        self._stopping = True
+
+
+def _serve_metrics(port: int) -> None:
+    """Expose /metrics for the consumer process on a side thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import threading
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.REGISTRY.render_prometheus().encode("utf-8")
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            return None
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="AgentAI booking-event precompute consumer")
+    ap.add_argument("--broker", choices=["kafka", "memory"], default=os.getenv("PRECOMPUTE_BROKER", "kafka"))
+    ap.add_argument("--concurrency", type=int, default=int(os.getenv("PRECOMPUTE_CONCURRENCY", "4")))
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    import app as agent_app
+    topics = [t.strip() for t in os.getenv("PRECOMPUTE_TOPICS", f"{CREATED_TOPIC},{STATUS_TOPIC}").split(",") if t.strip()]
+    if args.broker == "memory":
+        consumer = InMemoryBroker().consumer(topics, "agentai-precompute")
+    else:
+        consumer = KafkaConsumerAdapter(topics, os.getenv("PRECOMPUTE_GROUP_ID", "agentai-precompute"),
+                                        os.getenv("KAFKA_BROKERS", "localhost:9092"))
+    if agent_app.plan_store is None:
+        log.warning("PRECOMPUTE_STORE is not set; precomputed plans stay in this process only")
+    metrics_port = int(os.getenv("PRECOMPUTE_METRICS_PORT", "9100"))
+    if metrics_port:
+        _serve_metrics(metrics_port)
+    pc = PrecomputeConsumer(consumer, agent_app._plan, lookup=agent_app._fetch_booking_context,
+                            concurrency=args.concurrency, store=agent_app.plan_store,
+                            report_every=float(os.getenv("PRECOMPUTE_REPORT_SECONDS", "30")))
+    asyncio.run(pc.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""Near-duplicate venue detection across events, POIs and restaurants.
+
+The same venue often comes back several times in one plan's searches: from
+different URLs (the venue's site, a listing site, a tracking-tagged link),
+with different title decorations ("The Exploratorium", "Exploratorium |
+Official Site"), or from both the POI and the event search. Every record is
+reduced to a normalized title, and a MinHash signature is taken over the
+title's character 3-grams. Locality-sensitive hashing (signature bands)
+proposes candidate pairs in close to linear time, and a candidate pair is a
+duplicate when its estimated Jaccard similarity reaches `threshold` and its
+titles have the same words up to one typo ("Exploratorum" is the
+Exploratorium, but "Pier 39" is not "Pier 45" and the "Asian Art Museum" is not
+the "Asian History Museum"). Records with the same canonical URL are
+duplicates regardless of title.
+
+Each cluster of duplicates keeps its best-sourced record (`quality`), which
+picks up the address, hours, coordinates and price it lacks from the others.
+Survivors are then matched against the venues already seen in the city over
+recent plans, cached search results included. A match keeps the better of
+the two records and the first-seen title, so a venue keeps the same activity
+id across plans. Input records are never modified: they may be cached search
+results shared with other plans, so survivors are copies, and the city index
+keeps copies of its own.
+"""
+from collections import OrderedDict
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+NUM_PERM = 64
+# 16 bands of 4 values: a pair at Jaccard 0.6 shares a band with probability ~0.89, at 0.8 ~1.0, at 0.3 ~0.12
+BANDS = 16
+_MASK = (1 << 64) - 1
+_SEPARATORS = re.compile(r"\s+(?:\||-|–|—|::)\s+|:\s+")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_STOPWORDS = frozenset(("the", "a", "an", "and", "of", "at", "in", "on", "official", "site", "website", "home",
+                        "page", "tickets", "visit"))
+_TRACKING = re.compile(r"^(?:utm_|gclid|fbclid|ref|src)")
+_INDEX_PAGE = re.compile(r"/(?:index\.html?)?$")
+# Listing and review sites: a record from the venue's own site is better sourced
+AGGREGATORS = ("tripadvisor.", "yelp.", "eventbrite.", "timeout.", "expedia.", "booking.", "viator.",
+               "getyourguide.", "opentable.", "thrillist.", "facebook.")
+
+
+def normalize_title(title: Optional[str], drop: Set[str] = frozenset()) -> str:
+    """Lowercase ASCII title without site decorations (" | Official Site", " - Tripadvisor", ": Tickets"),
+    stopwords or the words in `drop` (the city's name)."""
+    text = unicodedata.normalize("NFKD", title or "").encode("ascii", "ignore").decode("ascii")
+    parts = _SEPARATORS.split(text)
+    head = parts[0] if len(parts[0]) >= 4 or len(parts) == 1 else " ".join(parts[:2])
+    words = _NON_WORD.sub(" ", head.lower().replace("&", " and ")).split()
+    return " ".join(w for w in words if w not in _STOPWORDS and w not in drop) or " ".join(words)
+
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """Host and path without scheme, "www."/"m.", trailing slash, index page or tracking parameters."""
+    if not url:
+        return None
+    rest = url.strip().lower().split("#", 1)[0]
+    rest = rest.split("://", 1)[-1]
+    rest, _, query = rest.partition("?")
+    host, slash, path = rest.partition("/")
+    host = host.rsplit("@", 1)[-1].split(":", 1)[0]
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = _INDEX_PAGE.sub("", slash + path)
+    if query:
+        query = "&".join(sorted(q for q in query.split("&") if q and not _TRACKING.match(q)))
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+def quality(r: Any) -> Tuple:
+    """Sort key for how well sourced a record is; higher is better."""
+    host = getattr(r, "host", "") or ""
+    return (getattr(r, "source", "tavily") != "fallback", bool(host) and not any(a in host for a in AGGREGATORS),
+            r.geo is not None and r.geo_precision != "city", r.geo is not None, bool(r.address), bool(r.hours), r.price_tier is not None, bool(r.relevant),
+            len(r.snippet or ""))
+
+
+def _shingles(title: str) -> List[int]:
+    padded = f" {title} ".encode("ascii")
+    return [int.from_bytes(padded[i:i + 3], "big") for i in range(len(padded) - 2)]
+
+
+class MinHasher:
+    """MinHash over 3-gram ids with `num_perm` multiply-shift hashes (high 32 bits of a*x+b mod 2**64)."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rnd = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = [rnd.getrandbits(64) | 1 for _ in range(num_perm)]
+        self._b = [rnd.getrandbits(64) for _ in range(num_perm)]
+        if NUMPY_AVAILABLE:
+            self._a_np = np.array(self._a, dtype=np.uint64)[:, None]
+            self._b_np = np.array(self._b, dtype=np.uint64)[:, None]
+
+    def signatures(self, titles: Sequence[str]) -> List[Optional[bytes]]:
+        """One signature per normalized (ASCII) title, `num_perm` uint32 values as bytes; None for an empty title."""
+        if not NUMPY_AVAILABLE:
+            return [b"".join(min(((a * g + b) & _MASK) >> 32 for g in _shingles(t)).to_bytes(4, "little")
+                             for a, b in zip(self._a, self._b)) if t else None for t in titles]
+        # Every title's 3-grams from one buffer ("\n" between titles, grams spanning one are dropped),
+        # then a min over each title's run of grams per hash
+        padded = [f" {t} " if t else "" for t in titles]
+        buf = np.frombuffer("\n".join(padded).encode("ascii", "ignore"), dtype=np.uint8).astype(np.uint64)
+        out: List[Optional[bytes]] = [None] * len(titles)
+        if len(buf) < 3:
+            return out
+        x, y, z = buf[:-2], buf[1:-1], buf[2:]
+        flat = ((x << np.uint64(16)) | (y << np.uint64(8)) | z)[(x != 10) & (y != 10) & (z != 10)]
+        lengths = [max(0, len(p) - 2) for p in padded]
+        hashed = ((self._a_np * flat[None, :] + self._b_np) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.cumsum([0] + lengths[:-1])
+        nonempty = [i for i, n in enumerate(lengths) if n]
+        mins = np.minimum.reduceat(hashed, offsets[nonempty], axis=1).T
+        for i, row in zip(nonempty, mins):
+            out[i] = row.tobytes()
+        return out
+
+
+def _typo(a: str, b: str) -> bool:
+    """True when `a` and `b` are one edit or one adjacent swap apart (numbers must match exactly)."""
+    if a.isdigit() or b.isdigit() or abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        return len(diff) == 1 or (len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]]
+                                  and a[diff[1]] == b[diff[0]])
+    short, long_ = (a, b) if len(a) < len(b) else (b, a)
+    i = 0
+    while i < len(short) and short[i] == long_[i]:
+        i += 1
+    return short[i:] == long_[i + 1:]
+
+
+def same_words(a: Set[str], b: Set[str]) -> bool:
+    """Two titles' word sets name the same venue: equal, or one word apart by a typo."""
+    only_a, only_b = a - b, b - a
+    if not only_a and not only_b:
+        return True
+    return len(only_a) == 1 and len(only_b) == 1 and _typo(next(iter(only_a)), next(iter(only_b)))
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimated Jaccard similarity: share of equal signature values."""
+    if NUMPY_AVAILABLE:
+        equal = np.count_nonzero(np.frombuffer(a, dtype=np.uint32) == np.frombuffer(b, dtype=np.uint32))
+        return float(equal) / (len(a) // 4)
+    n = len(a) // 4
+    return sum(a[4 * i:4 * i + 4] == b[4 * i:4 * i + 4] for i in range(n)) / n
+
+
+def _similarities(sigs: Sequence[Optional[bytes]], pairs: Sequence[Tuple[int, int]]) -> List[float]:
+    """`similarity` for many pairs at once."""
+    if not pairs:
+        return []
+    if not NUMPY_AVAILABLE:
+        return [similarity(sigs[j], sigs[i]) for j, i in pairs]
+    index = {k: n for n, k in enumerate({k for pair in pairs for k in pair})}
+    mat = np.frombuffer(b"".join(sigs[k] for k in index), dtype=np.uint32).reshape(len(index), -1)
+    left = mat[[index[j] for j, _ in pairs]]
+    right = mat[[index[i] for _, i in pairs]]
+    return (np.count_nonzero(left == right, axis=1) / mat.shape[1]).tolist()
+
+
+def _band_keys(sig: bytes, bands: int) -> List[bytes]:
+    width = len(sig) // bands
+    return [bytes((b,)) + sig[b * width:(b + 1) * width] for b in range(bands)]
+
+
+class _CityVenues:
+    __slots__ = ("records", "sigs", "words", "buckets", "expires_at")
+
+    def __init__(self, ttl_seconds: float):
+        self.records: List[Any] = []
+        self.sigs: List[bytes] = []
+        self.words: List[Set[str]] = []
+        self.buckets: Dict[bytes, int] = {}
+        self.expires_at = time.time() + ttl_seconds
+
+
+class VenueDeduper:
+    """Collapses near-duplicate records within a plan and against the venues recently seen in its city."""
+
+    def __init__(self, threshold: float = 0.6, bands: int = BANDS, num_perm: int = NUM_PERM,
+                 max_cities: int = 256, per_city: int = 2000, ttl_seconds: float = 3600.0):
+        self.threshold = threshold
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        self.max_cities = max_cities
+        self.per_city = per_city
+        self.ttl_seconds = ttl_seconds
+        self._cities: "OrderedDict[str, _CityVenues]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"records": 0, "collapsed": 0, "matched": 0}
+
+    def _same(self, sig_a: bytes, sig_b: bytes, words_a: Set[str], words_b: Set[str]) -> bool:
+        return similarity(sig_a, sig_b) >= self.threshold and same_words(words_a, words_b)
+
+    def clusters(self, records: Sequence[Any], city: Optional[str] = None
+                 ) -> Tuple[List[List[int]], List[Optional[bytes]], List[Set[str]]]:
+        """Duplicate clusters (record indices, input order) with each record's signature and title words."""
+        drop = set(_NON_WORD.sub(" ", (city or "").lower()).split())
+        titles = [normalize_title(r.title, drop) for r in records]
+        sigs = self.hasher.signatures(titles)
+        words = [set(t.split()) for t in titles]
+        parent = list(range(len(records)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int) -> None:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+        urls: Dict[str, int] = {}
+        buckets: Dict[bytes, int] = {}
+        candidates: Set[Tuple[int, int]] = set()
+        for i, r in enumerate(records):
+            url = canonical_url(r.url)
+            if url is not None:
+                j = urls.setdefault(url, i)
+                if j != i:
+                    union(j, i)
+            if sigs[i] is None:
+                continue
+            # Each bucket remembers its latest member, so a bucket's members are checked as a chain
+            for key in _band_keys(sigs[i], self.bands):
+                j = buckets.get(key)
+                buckets[key] = i
+                if j is not None:
+                    candidates.add((j, i))
+        pairs = sorted(candidates)
+        for (j, i), sim in zip(pairs, _similarities(sigs, pairs)):
+            if sim >= self.threshold and same_words(words[j], words[i]):
+                union(j, i)
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(records)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values()), sigs, words
+
+    def dedupe(self, groups: Sequence[List[Any]], city: Optional[str] = None) -> Tuple[List[List[Any]], Dict[str, Any]]:
+        """`groups` (e.g. events, POIs, restaurants) with near-duplicates collapsed across all of them.
+        Each survivor stays in its own group at the position of its cluster's first record."""
+        records = [r for g in groups for r in g]
+        owner = [k for k, g in enumerate(groups) for _ in g]
+        clusters, sigs, words = self.clusters(records, city)
+        keep: Dict[int, Any] = {}
+        for members in clusters:
+            best = max(members, key=lambda i: quality(records[i]))
+            survivor = copy.copy(records[best])
+            for i in members:
+                if i != best:
+                    _fill(survivor, records[i])
+            keep[members[0]] = (best, survivor)
+        resolved: Dict[int, Any] = {}
+        matched = 0
+        if city:
+            matched = self._match_city(city, [(survivor, sigs[best], words[best]) for best, survivor in keep.values()],
+                                       resolved)
+        out: List[List[Any]] = [[] for _ in groups]
+        emitted: Set[int] = set()
+        for first in sorted(keep):
+            best, survivor = keep[first]
+            record = resolved.get(id(survivor), survivor)
+            # Two survivors can match the same known venue without matching each other
+            if id(record) not in emitted:
+                emitted.add(id(record))
+                out[owner[best]].append(record)
+        kept = len(emitted)
+        info = {"records": len(records), "kept": kept, "collapsed": len(records) - kept, "matched": matched}
+        with self._lock:
+            self.stats["records"] += len(records)
+            self.stats["collapsed"] += len(records) - kept
+            self.stats["matched"] += matched
+        return out, info
+
+    def _match_city(self, city: str, survivors: List[Tuple[Any, Optional[bytes], Set[str]]],
+                    resolved: Dict[int, Any]) -> int:
+        """Match survivors (this plan's own copies) against the city's recent venues, recording in `resolved`
+        (by survivor id) the record to use where a known venue is better sourced. Returns how many matched a
+        known venue. Index entries are never handed out: a plan gets a copy."""
+        key = " ".join(city.lower().split())
+        now = time.time()
+        matched = 0
+        handed: Dict[int, Any] = {}  # index entry -> this plan's record for it
+        with self._lock:
+            venues = self._cities.get(key)
+            if venues is None or venues.expires_at < now:
+                venues = self._cities[key] = _CityVenues(self.ttl_seconds)
+            self._cities.move_to_end(key)
+            while len(self._cities) > self.max_cities:
+                self._cities.popitem(last=False)
+            for record, sig, title_words in survivors:
+                if sig is None:
+                    continue
+                band_keys = _band_keys(sig, self.bands)
+                hit = None
+                for bk in band_keys:
+                    j = venues.buckets.get(bk)
+                    if j is not None and self._same(venues.sigs[j], sig, venues.words[j], title_words):
+                        hit = j
+                        break
+                if hit is None:
+                    if len(venues.records) < self.per_city:
+                        record.canonical_title = record.canonical_title or record.title
+                        venues.records.append(copy.copy(record))
+                        handed[len(venues.records) - 1] = record
+                        venues.sigs.append(sig)
+                        venues.words.append(title_words)
+                        for bk in band_keys:
+                            venues.buckets.setdefault(bk, len(venues.records) - 1)
+                    continue
+                matched += 1
+                known = venues.records[hit]
+                if hit in handed:
+                    # Another survivor of this plan is already that venue: it stays, with what this one adds
+                    better, other = handed[hit], record
+                else:
+                    better, other = (record, known) if quality(record) > quality(known) else (copy.copy(known), record)
+                    handed[hit] = better
+                _fill(better, other)
+                better.canonical_title = known.canonical_title or known.title
+                venues.records[hit] = copy.copy(better)
+                resolved[id(record)] = better
+        return matched
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            cities = len(self._cities)
+            venues = sum(len(v.records) for v in self._cities.values())
+        return {"cities": cities, "venues": venues, "threshold": self.threshold, **self.stats}
+
+
+def _fill(best: Any, other: Any) -> None:
+    """Copy the location details `best` lacks from a duplicate of it."""
+    if other.geo is not None and (best.geo is None or (best.geo_precision == "city" and other.geo_precision != "city")):
+        best.geo, best.geo_precision = other.geo, other.geo_precision
+    if not best.address and other.address:
+        best.address = other.address
+    if not best.hours and other.hours:
+        best.hours = other.hours
+    if best.price_tier is None and other.price_tier is not None:
+        best.price_tier = other.price_tier
+
+
+def deduper_from_env() -> Optional[VenueDeduper]:
+    if os.getenv("VENUE_DEDUP_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return VenueDeduper(
+        threshold=float(os.getenv("VENUE_DEDUP_THRESHOLD", "0.6")),
+        max_cities=int(os.getenv("VENUE_INDEX_CITIES", "256")),
+        per_city=int(os.getenv("VENUE_INDEX_PER_CITY", "2000")),
+        ttl_seconds=float(os.getenv("VENUE_INDEX_TTL_SECONDS", "3600")),
+    )
@@ -0,0 +1,279 @@
+"""Enrichment of search records: street address, opening hours, price and coordinates.
+
+Each record's full text is run through compiled extractors and the venue is
+geocoded offline against a small gazetteer of cities and landmarks
+(data/gazetteer.tsv): explicit coordinates in the text win, then a landmark or
+neighbourhood named in the title/address/text, then the city centroid. The
+match is kept as `geo_precision` ("exact" | "place" | "city"); a city centroid
+only says which city the venue is in, so planners treat it as no location. This is
+CPU-bound, so `Enricher` ships batches of cache misses to a process pool and
+keeps the event loop free; results are cached by (URL, content hash) so a page
+seen again (repeat searches, hedged duplicates, precompute) is not re-parsed.
+
+The extraction functions are module-level and import nothing heavier than `re`
+so pool workers start quickly under the `spawn` start method.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import time
+
+import metrics
+
+ENRICH_ITEMS = metrics.counter("agentai_enrich_items_total", "Search records enriched, by cache outcome")
+ENRICH_BATCH_SECONDS = metrics.histogram("agentai_enrich_batch_seconds", "Time to enrich one batch of cache misses",
+                                         buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+_STREET = (r"St|Street|Ave|Avenue|Blvd|Boulevard|Rd|Road|Dr|Drive|Way|Ln|Lane|Pl|Place|Ct|Court|Pkwy|Parkway"
+           r"|Hwy|Highway|Sq|Square|Ter|Terrace|Embarcadero|Broadway")
+ADDRESS_RE = re.compile(
+    r"\b\d{1,5}[A-Z]?\s+(?:[NSEW]\.?\s+)?(?:[A-Z0-9][\w'.-]*\s+){0,4}?(?:" + _STREET + r")\b\.?"
+    r"(?:,?\s+(?:Suite|Ste\.?|Unit|#)\s*[\w-]+)?"
+    r"(?:,\s*[A-Z][a-zA-Z.]+(?:\s+[A-Z][a-zA-Z.]+){0,2})?"
+    r"(?:,\s*[A-Z]{2})?(?:\s+\d{5}(?:-\d{4})?)?")
+# The hours and free-entry patterns run on lowercased text. Hours are found by their time range (which starts
+# with a digit, so the scan is fast) and the day range is then matched just before it.
+_DAY = r"(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?"
+_TIME = r"\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)"
+HOURS_RE = re.compile(r"(?P<open>" + _TIME + r")\s*(?:-|–|—|to|until)\s*(?P<close>" + _TIME + r")")
+DAYS_RE = re.compile(r"(" + _DAY + r"(?:\s*(?:-|–|to|&|,|and)\s*" + _DAY + r")*)\s*:?\s*$")
+PRICE_RE = re.compile(r"\$\s?(\d{1,4}(?:\.\d{2})?)(?:\s?(?:-|–|to)\s?\$?\s?(\d{1,4}(?:\.\d{2})?))?")
+FREE_RE = re.compile(r"\bfree (?:admission|entry|entrance|to visit)\b|\badmission is free\b")
+TIER_RE = re.compile(r"(?<![\$\w])(\${2,4})(?![\$\d])")
+COORDS_RE = re.compile(r"(-?\d{1,2}\.\d{3,})\s*[,/ ]\s*(-?\d{1,3}\.\d{3,})")
+_DECIMAL_RE = re.compile(r"\d\.\d{3}")  # cheap pre-check before COORDS_RE
+
+# Booking locations that name a gazetteer city differently
+_CITY_ALIASES = {"nyc": "new york", "new york city": "new york", "sf": "san francisco", "la": "los angeles",
+                 "l.a.": "los angeles", "washington dc": "washington", "washington d.c.": "washington", "dc": "washington"}
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.tsv"))
+
+# Loaded once per process: {city: (centroid, place regex, {place: (lat, lng)})}
+_GAZETTEER: Optional[Dict[str, Any]] = None
+
+
+def _load_gazetteer() -> Dict[str, Any]:
+    global _GAZETTEER
+    if _GAZETTEER is None:
+        cities: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(GAZETTEER_PATH, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    city, place, lat, lng = line.rstrip("\n").split("\t")
+                    entry = cities.setdefault(city, {"centroid": None, "places": {}})
+                    if place:
+                        entry["places"][place] = (float(lat), float(lng))
+                    else:
+                        entry["centroid"] = (float(lat), float(lng))
+        except OSError:
+            pass
+        out = {}
+        for city, entry in cities.items():
+            # Longest names first so "santa monica pier" wins over "santa monica"
+            names = sorted(entry["places"], key=len, reverse=True)
+            pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, names)) + r")\b") if names else None
+            out[city] = (entry["centroid"], pattern, entry["places"])
+        _GAZETTEER = out
+    return _GAZETTEER
+
+
+def gazetteer_city(location: Optional[str]) -> Optional[str]:
+    """Gazetteer key for a booking location ("New York, NY" -> "new york"), or None if unknown."""
+    primary = (location or "").split(",")[0].strip().lower()
+    primary = _CITY_ALIASES.get(primary, primary)
+    return primary if primary in _load_gazetteer() else None
+
+
+def price_tier_for(amount: float) -> str:
+    if amount < 15:
+        return "$"
+    if amount < 40:
+        return "$$"
+    if amount < 80:
+        return "$$$"
+    return "$$$$"
+
+
+def _clock(t: str) -> str:
+    """'9am' / '10:30 p.m.' -> '09:00' / '22:30'."""
+    t = t.lower().replace(".", "").replace(" ", "")
+    pm = t.endswith("pm")
+    hh, _, mm = t[:-2].partition(":")
+    h = int(hh) % 12 + (12 if pm else 0)
+    return f"{h:02d}:{int(mm or 0):02d}"
+
+
+def geocode(city: Optional[str], *texts: str) -> Tuple[Optional[Tuple[float, float]], Optional[str]]:
+    """Coordinates and precision ("place" | "city") for a venue in `city`; texts are searched in order."""
+    entry = _load_gazetteer().get(city or "")
+    if entry is None:
+        return None, None
+    centroid, pattern, places = entry
+    if pattern is not None:
+        for text in texts:
+            m = pattern.search(text if text.islower() else text.lower()) if text else None
+            if m:
+                return places[m.group(0)], "place"
+    return centroid, ("city" if centroid else None)
+
+
+def extract(title: str, text: str, city: Optional[str]) -> Dict[str, Any]:
+    """Address, hours, price and coordinates for one record. `city` is a gazetteer key or None."""
+    out: Dict[str, Any] = {"address": None, "hours": None, "price_min": None, "price_max": None,
+                           "price_tier": None, "geo": None, "geo_precision": None}
+    m = ADDRESS_RE.search(text)
+    if m:
+        out["address"] = m.group(0).strip().rstrip(",.")
+    low = text.lower()
+    if "open 24 hours" in low or "24/7" in low:
+        out["hours"] = "00:00-24:00"
+    else:
+        m = HOURS_RE.search(low)
+        if m:
+            days = DAYS_RE.search(low, max(0, m.start() - 40), m.start())
+            span = f"{_clock(m.group('open'))}-{_clock(m.group('close'))}"
+            out["hours"] = f"{days.group(1)} {span}" if days else f"daily {span}"
+    amounts = [float(a) for pair in PRICE_RE.findall(text) for a in pair if a]
+    if amounts:
+        out["price_min"], out["price_max"] = min(amounts), max(amounts)
+        out["price_tier"] = price_tier_for(max(amounts))
+    elif "free" in low and FREE_RE.search(low):
+        out["price_min"] = out["price_max"] = 0.0
+        out["price_tier"] = "$"
+    elif "$$" in text:
+        m = TIER_RE.search(text)
+        if m:
+            out["price_tier"] = m.group(1)
+    for lat, lng in COORDS_RE.findall(text) if _DECIMAL_RE.search(text) else ():
+        lat_f, lng_f = float(lat), float(lng)
+        if -90 <= lat_f <= 90 and -180 <= lng_f <= 180 and (lat_f, lng_f) != (0.0, 0.0):
+            out["geo"], out["geo_precision"] = (lat_f, lng_f), "exact"
+            break
+    else:
+        out["geo"], out["geo_precision"] = geocode(city, title, out["address"] or "", text)
+    return out
+
+
+def enrich_batch(batch: Sequence[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+    """Pool entry point: [(title, text, city)] -> [extract(...)]."""
+    return [extract(title, text, city) for title, text, city in batch]
+
+
+def content_key(url: Optional[str], title: str, text: str) -> str:
+    digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=12).hexdigest()
+    return f"{url or title}#{digest}"
+
+
+class Enricher:
+    """Enriches records in place, in a process pool (`workers` > 0) or inline, behind an LRU cache.
+
+    Records are duck-typed: `title`, `url` and a transient `content` (full text, released here) are
+    read; `address`, `hours`, `geo`, `geo_precision` and a sharper `price_tier` are written."""
+
+    def __init__(self, workers: int = 1, batch_size: int = 16, cache_size: int = 4096):
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.cache_size = cache_size
+        self._cache: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: the app process has threads (profiler, executors) that fork would copy mid-state
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def warm(self) -> None:
+        """Start the workers ahead of the first request."""
+        if self.workers > 0:
+            pool = self._executor()
+            list(pool.map(enrich_batch, [[("", "", None)]] * self.workers))
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _remember(self, key: str, fields: Dict[str, Any]) -> None:
+        self._cache[key] = fields
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _run(self, batches: List[List[Tuple[str, str, Optional[str]]]]) -> List[List[Dict[str, Any]]]:
+        if self.workers <= 0:
+            return [enrich_batch(b) for b in batches]
+        loop = asyncio.get_event_loop()
+        try:
+            return list(await asyncio.gather(*(loop.run_in_executor(self._executor(), enrich_batch, b)
+                                               for b in batches)))
+        except concurrent.futures.process.BrokenProcessPool:
+            # A worker died (OOM kill); replace the pool and finish this request inline
+            logging.getLogger("agentai").warning("enrichment pool broken; recreating it")
+            self._pool = None
+            return [enrich_batch(b) for b in batches]
+
+    async def enrich(self, records: Sequence[Any], location: Optional[str] = None) -> None:
+        city = gazetteer_city(location)
+        pending: List[Tuple[str, Any]] = []
+        for rec in records:
+            text = rec.content or ""
+            key = content_key(rec.url, rec.title, text) + f"@{city or ''}"
+            fields = self._cache.get(key)
+            if fields is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                _apply(rec, fields)
+            else:
+                pending.append((key, rec))
+        ENRICH_ITEMS.inc(len(records) - len(pending), outcome="cache_hit")
+        if not pending:
+            return
+        self.misses += len(pending)
+        ENRICH_ITEMS.inc(len(pending), outcome="extracted")
+        jobs = [(rec.title or "", rec.content or "", city) for _, rec in pending]
+        batches = [jobs[i:i + self.batch_size] for i in range(0, len(jobs), self.batch_size)]
+        t0 = time.perf_counter()
+        results = [fields for batch in await self._run(batches) for fields in batch]
+        ENRICH_BATCH_SECONDS.observe(time.perf_counter() - t0)
+        for (key, rec), fields in zip(pending, results):
+            self._remember(key, fields)
+            _apply(rec, fields)
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {"workers": self.workers, "cache_size": len(self._cache),
+                "hit_rate": round(self.hits / total, 4) if total else None}
+
+
+def _apply(rec: Any, fields: Dict[str, Any]) -> None:
+    rec.address = fields["address"]
+    rec.hours = fields["hours"]
+    rec.geo = fields["geo"]
+    rec.geo_precision = fields["geo_precision"]
+    # An explicit amount beats the keyword tier from ingestion; a "$$" marker only fills a gap
+    if fields["price_min"] is not None or (fields["price_tier"] and not rec.price_tier):
+        rec.price_tier = fields["price_tier"]
+    rec.content = None
+
+
+def enricher_from_env() -> Optional[Enricher]:
+    """ENRICH_ENABLED (default true), ENRICH_WORKERS (0 = inline), ENRICH_BATCH_SIZE, ENRICH_CACHE_SIZE."""
+    if os.getenv("ENRICH_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    default_workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+    return Enricher(
+        workers=int(os.getenv("ENRICH_WORKERS", str(default_workers))),
+        batch_size=int(os.getenv("ENRICH_BATCH_SIZE", "16")),
+        cache_size=int(os.getenv("ENRICH_CACHE_SIZE", "4096")),
+    )
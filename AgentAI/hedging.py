@@ -0,0 +1,158 @@
+"""Hedged calls: send a backup when the primary is slower than usual.
+
+A `Hedger` tracks the recent latency of its primary calls, in a separate
+window per call key (e.g. search depth and result-size bucket, whose latencies
+differ several-fold). When a call has not answered by the configured quantile
+of its key's window, it starts a backup
+(a second upstream attempt, or a local source), returns whichever usable
+answer arrives first and cancels the other. An empty answer only wins if it
+is the last one left. Hedges are capped to a fraction of recent calls (all
+keys together) so a slow upstream is not hit with double load.
+"""
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, Tuple
+import asyncio
+import collections
+import os
+import time
+
+import metrics
+
+HEDGE_CALLS = metrics.counter("agentai_hedge_calls_total", "Hedged-call outcomes by resource")
+HEDGE_DELAY = metrics.gauge("agentai_hedge_delay_seconds", "Current hedge trigger delay by resource")
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 256):
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        xs = sorted(self._samples)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+class Hedger:
+    def __init__(self, name: str, quantile: float = 0.95, min_delay: float = 0.05, max_delay: float = 5.0,
+                 min_samples: int = 20, max_rate: float = 0.1, window: int = 256):
+        self.name = name
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.max_rate = max_rate
+        self.window = window
+        self._latency: Dict[Hashable, LatencyTracker] = {}
+        self._recent: Deque[bool] = collections.deque(maxlen=window)
+        self._hedged = 0
+
+    def _record(self, hedged: bool) -> None:
+        if len(self._recent) == self._recent.maxlen and self._recent[0]:
+            self._hedged -= 1
+        self._recent.append(hedged)
+        self._hedged += hedged
+
+    def hedge_rate(self) -> float:
+        return self._hedged / len(self._recent) if self._recent else 0.0
+
+    def latency(self, key: Hashable = None) -> LatencyTracker:
+        tracker = self._latency.get(key)
+        if tracker is None:
+            tracker = self._latency[key] = LatencyTracker(self.window)
+        return tracker
+
+    def delay(self, key: Hashable = None) -> Optional[float]:
+        """Seconds to wait before hedging a `key` call, or None while that key is warming up."""
+        latency = self.latency(key)
+        if len(latency) < self.min_samples:
+            return None
+        return min(self.max_delay, max(self.min_delay, latency.quantile(self.quantile) or 0.0))
+
+    async def run(self, primary: Callable[[], Awaitable[Any]], backup: Callable[[], Awaitable[Any]],
+                  key: Hashable = None) -> Tuple[Any, str]:
+        """Run `primary`, hedging with `backup` if needed; returns (result, "primary" | "backup").
+        `key` picks the latency window the hedge delay comes from.
+
+        The losing call is cancelled, but cancelling only stops the await: a primary running in a worker
+        thread (the Tavily client goes through `run_blocking`) keeps that thread until its request returns."""
+        t0 = time.perf_counter()
+        latency = self.latency(key)
+        p = asyncio.ensure_future(primary())
+
+        def observe(t: "asyncio.Future[Any]") -> None:
+            # Only calls that returned results, or were still running when cancelled (a lower bound that
+            # keeps the tail visible). A shed search returns [] at once and a failed one errors early:
+            # neither is the upstream's latency
+            if t.cancelled() or (t.exception() is None and t.result()):
+                latency.observe(time.perf_counter() - t0)
+
+        p.add_done_callback(observe)
+        delay = self.delay(key)
+        outcome = "unhedged"
+        if delay is not None:
+            HEDGE_DELAY.set(delay, resource=self.name, key=_label(key))
+            if self.hedge_rate() >= self.max_rate:
+                delay, outcome = None, "budget_exhausted"
+        if delay is None:
+            self._record(False)
+            HEDGE_CALLS.inc(resource=self.name, outcome=outcome)
+            return await p, "primary"
+        done, _ = await asyncio.wait({p}, timeout=delay)
+        if done:
+            self._record(False)
+            HEDGE_CALLS.inc(resource=self.name, outcome="unhedged")
+            return p.result(), "primary"
+        self._record(True)
+        b = asyncio.ensure_future(backup())
+        labels = {p: "primary", b: "backup"}
+        pending = {p, b}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    if t.exception() is None and (t.result() or not pending):
+                        HEDGE_CALLS.inc(resource=self.name, outcome=f"hedged_{labels[t]}_won")
+                        return t.result(), labels[t]
+                if not pending:
+                    # Both failed: surface the primary's error
+                    HEDGE_CALLS.inc(resource=self.name, outcome="hedged_failed")
+                    return p.result(), "primary"
+        finally:
+            for t in (p, b):
+                if not t.done():
+                    t.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "hedge_rate": round(self.hedge_rate(), 4),
+            "keys": {
+                _label(k): {"delay_seconds": self.delay(k), "samples": len(t),
+                            "p50": t.quantile(0.5), "p99": t.quantile(0.99)}
+                for k, t in list(self._latency.items())
+            },
+        }
+
+
+def _label(key: Hashable) -> str:
+    if key is None:
+        return "all"
+    return "/".join(map(str, key)) if isinstance(key, tuple) else str(key)
+
+
+def hedger_from_env(name: str) -> Optional[Hedger]:
+    """HEDGE_ENABLED (default true), HEDGE_QUANTILE, HEDGE_MIN_DELAY_MS, HEDGE_MAX_DELAY_MS, HEDGE_MAX_RATE."""
+    if os.getenv("HEDGE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return Hedger(
+        name,
+        quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+        min_delay=float(os.getenv("HEDGE_MIN_DELAY_MS", "50")) / 1000.0,
+        max_delay=float(os.getenv("HEDGE_MAX_DELAY_MS", "5000")) / 1000.0,
+        max_rate=float(os.getenv("HEDGE_MAX_RATE", "0.1")),
+    )
@@ -0,0 +1,146 @@
+"""Projection of Tavily search results into compact records at parse time.
+
+Tavily returns a dict per result with a long `content` body (and optionally
+`raw_content`). The planner only needs the title, URL, a short snippet and a
+few derived fields, so each result is projected once as it is parsed: price
+tier, venue flags, location relevance and ranking token ids are derived from
+the full text, the text is then truncated to a snippet, and the upstream dict
+is dropped. Repeated strings (hosts, price tiers, dietary keys) are interned.
+With `keep_content` the full text rides along on the record only until the
+enrichment stage (enrichment.py) has read it.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import json
+import os
+import sys
+from urllib.parse import urlsplit
+
+from ranking import NUMPY_AVAILABLE, text_token_ids, token_words, venue_attributes
+
+SNIPPET_CHARS = int(os.getenv("TAVILY_SNIPPET_CHARS", "400"))
+
+# One shared tuple per distinct dietary combination
+_DIETARY: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def price_tier(text: Optional[str]) -> Optional[str]:
+    text = (text or '').lower()
+    if '$$$$' in text or 'expensive' in text or 'fine dining' in text:
+        return '$$$$'
+    if '$$$' in text:
+        return '$$$'
+    if '$$' in text or 'moderate' in text:
+        return '$$'
+    if '$' in text or 'cheap' in text or 'budget' in text:
+        return '$'
+    return None
+
+
+class SearchResult:
+    __slots__ = ("title", "url", "host", "snippet", "price_tier", "wheelchair", "stroller", "kid", "dietary",
+                 "relevant", "token_ids", "source", "content", "address", "hours", "geo", "geo_precision",
+                 "canonical_title")
+
+    def __init__(self, title: str, url: Optional[str], snippet: str, price: Optional[str], venue: Dict[str, Any],
+                 relevant: bool, token_ids: Any = None, source: str = "tavily"):
+        self.title = title
+        self.url = url
+        self.host = sys.intern(urlsplit(url).hostname or "") if url else ""
+        self.snippet = snippet
+        self.price_tier = price
+        self.wheelchair = venue["wheelchair"]
+        self.stroller = venue["stroller"]
+        self.kid = venue["kid"]
+        diet = tuple(venue["dietary"])
+        self.dietary = _DIETARY.setdefault(diet, diet)
+        self.relevant = relevant
+        self.token_ids = token_ids
+        self.source = source
+        self.content: Optional[str] = None  # full text, held until enrichment
+        self.address: Optional[str] = None
+        self.hours: Optional[str] = None
+        self.geo: Optional[Tuple[float, float]] = None
+        self.geo_precision: Optional[str] = None  # "exact" | "place" | "city" (enrichment.geocode)
+        self.canonical_title: Optional[str] = None  # first-seen title of the venue in its city (dedup.py)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.title, "url": self.url, "snippet": self.snippet, "price_tier": self.price_tier,
+            "wheelchair": self.wheelchair, "stroller": self.stroller, "kid": self.kid, "dietary": list(self.dietary),
+            "address": self.address, "hours": self.hours, "geo": list(self.geo) if self.geo else None,
+            "geo_precision": self.geo_precision, "canonical_title": self.canonical_title,
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-safe copy of the record for another process (the precompute store); see `from_state`.
+        Token ids are process-local, so they travel as their tokens."""
+        state = {k: getattr(self, k) for k in self.__slots__ if k not in ("token_ids", "content", "host")}
+        state["dietary"] = list(self.dietary)
+        state["geo"] = list(self.geo) if self.geo else None
+        state["tokens"] = token_words(self.token_ids.tolist()) if self.token_ids is not None else None
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SearchResult":
+        venue = {k: state.get(k) for k in ("wheelchair", "stroller", "kid")}
+        venue["dietary"] = state.get("dietary") or []
+        tokens = state.get("tokens")
+        rec = cls(state.get("title") or "", state.get("url"), state.get("snippet") or "", state.get("price_tier"),
+                  venue, bool(state.get("relevant")),
+                  token_ids=text_token_ids(" ".join(tokens)) if tokens is not None and NUMPY_AVAILABLE else None,
+                  source=state.get("source") or "tavily")
+        rec.address = state.get("address")
+        rec.hours = state.get("hours")
+        rec.geo = tuple(state["geo"]) if state.get("geo") else None
+        rec.geo_precision = state.get("geo_precision")
+        rec.canonical_title = state.get("canonical_title")
+        return rec
+
+
+def project(item: Dict[str, Any], aliases: Sequence[str] = (), snippet_chars: int = SNIPPET_CHARS,
+            keep_content: bool = False) -> SearchResult:
+    """Derive everything the planner needs from one upstream result, keeping only a snippet of its text."""
+    title = str(item.get("title") or item.get("name") or "")
+    url = item.get("url")
+    text = str(item.get("content") or item.get("snippet") or "")
+    lowered = f"{title} {text}".lower()
+    # Location relevance: any city alias in title/content/url (see app._city_aliases)
+    hay = f"{lowered} {(url or '').lower()}"
+    relevant = any(a in hay for a in aliases) if aliases else True
+    rec = SearchResult(
+        title=title,
+        url=url,
+        snippet=text.strip()[:snippet_chars],
+        price=price_tier(text),
+        venue=venue_attributes(lowered),
+        relevant=relevant,
+        token_ids=text_token_ids(lowered) if NUMPY_AVAILABLE else None,
+    )
+    if keep_content:
+        rec.content = text
+    return rec
+
+
+def ingest(items: Iterable[Any], aliases: Sequence[str] = (), keep_content: bool = False) -> List[SearchResult]:
+    """Project already-parsed results (official client, context overrides); records pass through."""
+    return [it if isinstance(it, SearchResult) else project(it, aliases, keep_content=keep_content) for it in items
+            if isinstance(it, (dict, SearchResult))]
+
+
+def parse_response(body: Union[bytes, str], aliases: Sequence[str] = (), keep_content: bool = False) -> List[SearchResult]:
+    """Parse a Tavily /search response body, projecting each result as soon as the parser builds it.
+
+    The hook runs bottom-up, so each result's full `content` string is released while the rest of the
+    body is still being parsed instead of the whole raw result list living until projection."""
+    def hook(obj: Dict[str, Any]) -> Any:
+        if "url" in obj and ("content" in obj or "title" in obj):
+            return project(obj, aliases, keep_content=keep_content)
+        return obj
+    data = json.loads(body, object_hook=hook)
+    results = data.get("results") if isinstance(data, dict) else None
+    return [r for r in results or [] if isinstance(r, SearchResult)]
+
+
+def relevant_or_all(results: List[SearchResult]) -> List[SearchResult]:
+    """Results that match the requested location; all of them if none do."""
+    return [r for r in results if r.relevant] or results
@@ -0,0 +1,424 @@
+"""Travel-time-aware itinerary scheduling.
+
+Activities are grouped into one geographic cluster per trip day, ordered to
+keep travel short and packed into the morning/afternoon/evening windows:
+
+1. Activities the traveler cannot do are dropped: not wheelchair friendly for
+   wheelchair users, not stroller friendly with a stroller.
+2. Only the best-ranked activities that fit the trip are kept, spread over
+   enough days to leave each about half full. Activities are ordered along a Hilbert
+   curve over their local km coordinates, so nearby ones are adjacent. The
+   curve is then cut into one run per day under a per-day time capacity.
+   Days are ordered so the best-ranked activities come first. An activity is
+   used at most once per trip.
+3. Each day is routed from several starting stops. A time-aware nearest
+   neighbour always takes the stop that can start soonest, counting travel,
+   waiting for opening and preferred blocks. Then 2-opt shortens the travel.
+   Each order is packed into the block windows, respecting durations,
+   opening hours and travel time, and the best packing is kept. Travel walks
+   up to `max_walk_km` per leg and takes transit beyond that. A leg to or from
+   an activity with no coordinates of its own (none, or only its city's
+   centroid) is "unknown" and gets a flat allowance. An activity that does not
+   fit moves to the next day.
+
+Routing search draws on a work budget counted in leg evaluations, never on
+the wall clock, so the same inputs always produce the same schedule however
+loaded the host is. Once it is spent the schedule is still complete, just
+less optimized.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import math
+import os
+import re
+import time
+from datetime import date, timedelta
+
+KM_PER_DEG = 111.195
+
+# (name, opens, closes) in minutes after midnight
+BLOCK_WINDOWS = (("morning", 9 * 60, 12 * 60), ("afternoon", 13 * 60, 17 * 60 + 30), ("evening", 18 * 60 + 30, 21 * 60 + 30))
+DAY_CAPACITY = sum(end - start for _, start, end in BLOCK_WINDOWS)
+DAY_FILL = float(os.getenv("ITINERARY_DAY_FILL", "0.8"))  # share of DAY_CAPACITY planned for activities + travel
+MAX_STOPS_PER_DAY = DAY_CAPACITY // 45
+EST_LEG_MINUTES = 15  # travel allowance per stop when sizing days
+WALK_KMH = float(os.getenv("ITINERARY_WALK_KMH", "4.5"))
+ASSISTED_WALK_KMH = float(os.getenv("ITINERARY_ASSISTED_WALK_KMH", "3.2"))  # wheelchair / stroller
+TRANSIT_KMH = float(os.getenv("ITINERARY_TRANSIT_KMH", "18"))
+TRANSIT_OVERHEAD_MINUTES = float(os.getenv("ITINERARY_TRANSIT_OVERHEAD_MINUTES", "10"))
+DEFAULT_MAX_WALK_KM = float(os.getenv("ITINERARY_MAX_WALK_KM", "1.5"))
+UNKNOWN_LEG_MINUTES = 20.0  # either end has no coordinates
+MIN_LEG_MINUTES = 5.0  # between distinct venues, even when their coordinates coincide (place-level geocodes)
+DETOUR = 1.3  # street distance over straight line
+WORK_BUDGET = int(os.getenv("ITINERARY_WORK_BUDGET", "120000"))
+
+_DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_HOURS_RE = re.compile(r"^(?P<days>.*?)\s*(?P<open>\d{2}):(?P<om>\d{2})-(?P<close>\d{2}):(?P<cm>\d{2})$")
+_DAY_RANGE_RE = re.compile(r"(mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?(?:\s*(?:-|–|to)\s*(mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?)?")
+
+
+def parse_hours(text: Optional[str]) -> Optional[Tuple[Optional[frozenset], int, int]]:
+    """'mon-fri 10:00-18:00' -> ({0..4}, 600, 1080); days None means every day. None if unparsable."""
+    m = _HOURS_RE.match((text or "").strip().lower())
+    if not m:
+        return None
+    opens, closes = int(m["open"]) * 60 + int(m["om"]), int(m["close"]) * 60 + int(m["cm"])
+    if closes <= opens:
+        closes += 24 * 60  # past midnight
+    days = set()
+    for a, b in _DAY_RANGE_RE.findall(m["days"]):
+        i = _DAYS.index(a)
+        j = _DAYS.index(b) if b else i
+        k = i
+        while True:
+            days.add(k)
+            if k == j:
+                break
+            k = (k + 1) % 7
+    return (frozenset(days) if days else None), opens, closes
+
+
+class Mobility:
+    __slots__ = ("wheelchair", "stroller", "max_walk_km", "walk_kmh")
+
+    def __init__(self, wheelchair: bool = False, stroller: bool = False, max_walk_km: Optional[float] = None):
+        self.wheelchair = bool(wheelchair)
+        self.stroller = bool(stroller)
+        self.max_walk_km = max_walk_km if max_walk_km is not None else DEFAULT_MAX_WALK_KM
+        self.walk_kmh = ASSISTED_WALK_KMH if (self.wheelchair or self.stroller) else WALK_KMH
+
+
+class Stop:
+    __slots__ = ("id", "title", "x", "y", "duration", "hours", "best_time", "rank")
+
+    def __init__(self, act: Dict[str, Any], rank: int, lat0: float):
+        self.id = act["id"]
+        self.title = act.get("title") or act["id"]
+        geo = act.get("geo") or {}
+        lat, lng = geo.get("lat"), geo.get("lng")
+        if not _located(geo):
+            self.x = self.y = None
+        else:
+            self.x, self.y = lng * KM_PER_DEG * math.cos(math.radians(lat0)), lat * KM_PER_DEG
+        self.duration = int(act.get("duration_minutes") or 90)
+        self.hours = parse_hours(act.get("hours"))
+        self.best_time = act.get("best_time")
+        self.rank = rank
+
+
+def _located(geo: Optional[Dict[str, Any]]) -> bool:
+    """True for coordinates of the venue itself; 0,0 and city centroids (precision "city") are unknown."""
+    if not geo or geo.get("lat") is None or geo.get("lng") is None:
+        return False
+    return (geo["lat"], geo["lng"]) != (0.0, 0.0) and geo.get("precision") != "city"
+
+
+class _Budget:
+    def __init__(self, work: int):
+        self.work_left = work
+        self.exhausted = False
+
+    def spend(self, n: int) -> bool:
+        """Charge `n` units; False once the work budget is spent."""
+        if self.exhausted:
+            return False
+        self.work_left -= n
+        if self.work_left < 0:
+            self.exhausted = True
+        return not self.exhausted
+
+
+def _km(a: Stop, b: Stop) -> Optional[float]:
+    if a.x is None or b.x is None:
+        return None
+    return math.hypot(a.x - b.x, a.y - b.y) * DETOUR
+
+
+def _leg(a: Stop, b: Stop, mob: Mobility) -> Tuple[float, str]:
+    """Travel minutes and mode from `a` to `b`."""
+    km = _km(a, b)
+    if km is None:
+        return UNKNOWN_LEG_MINUTES, "unknown"
+    if km <= mob.max_walk_km:
+        return max(MIN_LEG_MINUTES, km / mob.walk_kmh * 60.0), "walk"
+    return TRANSIT_OVERHEAD_MINUTES + km / TRANSIT_KMH * 60.0, "transit"
+
+
+# -- clustering ------------------------------------------------------------
+def _hilbert(x: int, y: int, order: int = 16) -> int:
+    """Position of cell (x, y) along a Hilbert curve over a 2**order grid."""
+    d = 0
+    s = 1 << (order - 1)
+    while s:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = s - 1 - x, s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def _assign_days(stops: List[Stop], n_days: int) -> List[List[Stop]]:
+    """Split stops into at most `n_days` groups that are geographically tight and fit a day's capacity.
+
+    Stops are ordered along a Hilbert curve over their bounding box (nearby stops end up adjacent) and the
+    curve is cut into runs of one day's capacity. Stops without coordinates fill the lightest days."""
+    cap = DAY_CAPACITY * DAY_FILL
+    located = [s for s in stops if s.x is not None]
+    groups: List[List[Stop]] = []
+    if located:
+        x0, y0 = min(s.x for s in located), min(s.y for s in located)
+        span = max(max(s.x for s in located) - x0, max(s.y for s in located) - y0) or 1.0
+        scale = ((1 << 16) - 1) / span
+        located.sort(key=lambda s: (_hilbert(int((s.x - x0) * scale), int((s.y - y0) * scale)), s.rank))
+        # Cut at even shares of the total load (not greedy fills), so the last day is not a leftover scrap
+        n_runs = max(1, min(n_days, len(located)))
+        total = sum(s.duration + EST_LEG_MINUTES for s in located)
+        run, load, done = [], 0.0, 0.0
+        for s in located:
+            cost = s.duration + EST_LEG_MINUTES
+            boundary = total * (len(groups) + 1) / n_runs
+            if run and len(groups) < n_runs - 1 and (done + cost / 2 > boundary or load + cost > cap):
+                groups.append(run)
+                run, load = [], 0.0
+            run.append(s)
+            load += cost
+            done += cost
+        groups.append(run)
+    while len(groups) < n_days:
+        groups.append([])
+    load = [sum(s.duration + EST_LEG_MINUTES for s in g) for g in groups]
+    for s in sorted((s for s in stops if s.x is None), key=lambda s: s.rank):
+        j = min(range(len(groups)), key=load.__getitem__)
+        groups[j].append(s)
+        load[j] += s.duration + UNKNOWN_LEG_MINUTES
+    groups = [g for g in groups if g]
+    # Best-ranked activities early in the trip
+    groups.sort(key=lambda g: min(s.rank for s in g))
+    return groups
+
+
+# -- routing and packing ---------------------------------------------------
+# A day is small (at most MAX_STOPS_PER_DAY stops), so its travel matrix is computed once and routing works on indices
+Matrix = List[List[Tuple[float, str]]]
+
+
+def _two_opt(path: List[int], mat: Matrix, budget: _Budget) -> List[int]:
+    n = len(path)
+    improved = True
+    while improved and budget.spend(n * n):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                # Reverse path[i:j+1]; an open path has no edge back to the start
+                a, b, c = path[i - 1], path[i], path[j]
+                d = path[j + 1] if j + 1 < n else None
+                before = mat[a][b][0] + (mat[c][d][0] if d is not None else 0.0)
+                after = mat[a][c][0] + (mat[b][d][0] if d is not None else 0.0)
+                if after + 1e-9 < before:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+    return path
+
+
+def _open_window(s: Stop, weekday: int) -> Optional[Tuple[int, int]]:
+    if s.hours is None:
+        return 0, 48 * 60
+    days, opens, closes = s.hours
+    if days is not None and weekday not in days:
+        return None
+    return opens, closes
+
+
+def _fit(s: Stop, window: Optional[Tuple[int, int]], travel: float, bi: int, t: float
+         ) -> Optional[Tuple[int, float, float]]:
+    """Earliest (block, start, end) for `s` at or after block `bi` / minute `t`, or None if it cannot fit today."""
+    if window is None:
+        return None
+    cur = t
+    for b in range(bi, len(BLOCK_WINDOWS)):
+        _, b_start, b_end = BLOCK_WINDOWS[b]
+        start = max(cur + travel, b_start, window[0])
+        end = start + s.duration
+        if end <= b_end and end <= window[1]:
+            return b, start, end
+        if b + 1 < len(BLOCK_WINDOWS):
+            cur = BLOCK_WINDOWS[b + 1][1]
+    return None
+
+
+def _pack(path: List[int], stops: List[Stop], mat: Matrix, windows: List[Optional[Tuple[int, int]]]
+          ) -> Tuple[float, List[List[Dict[str, Any]]], List[Stop]]:
+    """Place `path` in order into the block windows; returns (penalty, slots per block, stops that did not fit)."""
+    blocks: List[List[Dict[str, Any]]] = [[] for _ in BLOCK_WINDOWS]
+    left: List[Stop] = []
+    bi, t = 0, BLOCK_WINDOWS[0][1]
+    prev: Optional[int] = None
+    penalty = 0.0
+    for k in path:
+        s = stops[k]
+        travel, mode = mat[prev][k] if prev is not None else (0.0, "start")
+        fit = _fit(s, windows[k], travel, bi, t)
+        if fit is None:
+            left.append(s)
+            penalty += 1000.0
+            continue
+        b, start, end = fit
+        blocks[b].append({"activity": s.id, "title": s.title, "start": start, "end": end,
+                          "travel_minutes": round(travel), "mode": mode})
+        penalty += travel + (30.0 if s.best_time and s.best_time != BLOCK_WINDOWS[b][0] else 0.0)
+        bi, t, prev = b, end, k
+    return penalty, blocks, left
+
+
+def _timed_neighbour(first: int, stops: List[Stop], mat: Matrix, windows: List[Optional[Tuple[int, int]]]) -> List[int]:
+    """Order stops by always taking the one that can start soonest (travel + waiting), honouring opening hours
+    and preferred blocks; stops that no longer fit go last (and end up carried to another day)."""
+    order, rest = [], set(range(len(stops)))
+    prev, bi, t = None, 0, float(BLOCK_WINDOWS[0][1])
+    nxt: Optional[int] = first
+    while rest:
+        if nxt is None:
+            best = None
+            for k in rest:
+                fit = _fit(stops[k], windows[k], mat[prev][k][0] if prev is not None else 0.0, bi, t)
+                if fit is None:
+                    continue
+                pref = stops[k].best_time
+                score = (fit[1] - t) + (30.0 if pref and pref != BLOCK_WINDOWS[fit[0]][0] else 0.0)
+                if best is None or (score, stops[k].rank) < best[0]:
+                    best = ((score, stops[k].rank), k, fit)
+            if best is None:
+                order.extend(sorted(rest, key=lambda k: stops[k].rank))
+                break
+            nxt = best[1]
+        fit = _fit(stops[nxt], windows[nxt], mat[prev][nxt][0] if prev is not None else 0.0, bi, t)
+        order.append(nxt)
+        rest.discard(nxt)
+        if fit is not None:
+            bi, t, prev = fit[0], fit[2], nxt
+        nxt = None
+    return order
+
+
+def _plan_day(stops: List[Stop], weekday: int, mob: Mobility, budget: _Budget) -> Tuple[List[List[Dict[str, Any]]], List[Stop]]:
+    if not stops:
+        return [[] for _ in BLOCK_WINDOWS], []
+    n = len(stops)
+    mat = [[_leg(a, b, mob) for b in stops] for a in stops]
+    windows = [_open_window(s, weekday) for s in stops]
+    budget.spend(n * n)
+    # Morning-preferring and best-ranked stops make the best starting points; more are tried while budget allows
+    starts = sorted(range(n), key=lambda k: (stops[k].best_time != "morning", stops[k].rank))
+    if budget.exhausted:
+        # Out of budget: one pass in preferred-block order, no search
+        block_of = {name: i for i, (name, _, _) in enumerate(BLOCK_WINDOWS)}
+        order = sorted(range(n), key=lambda k: (block_of.get(stops[k].best_time, 1), stops[k].rank))
+        _, blocks, left = _pack(order, stops, mat, windows)
+        return blocks, left
+    best = None
+    for tried, first in enumerate(starts):
+        if tried and not budget.spend(n * n):
+            break
+        order = _timed_neighbour(first, stops, mat, windows)
+        candidates = [order]
+        if n > 3 and not budget.exhausted:
+            candidates.append(_two_opt(list(order), mat, budget))
+        for path in candidates:
+            packed = _pack(path, stops, mat, windows)
+            if best is None or packed[0] < best[0]:
+                best = packed
+        if best[0] < 1000.0 and budget.exhausted:
+            break
+    return best[1], best[2]
+
+
+def _clock(minutes: float) -> str:
+    m = int(round(minutes))
+    return f"{m // 60 % 24:02d}:{m % 60:02d}"
+
+
+def _block(name: str, slots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if not slots:
+        return {"time_block": name, "summary": "Free time", "activities": [], "slots": []}
+    parts = []
+    for s in slots:
+        parts.append(s["title"] if not parts else f"{s['title']} ({s['travel_minutes']} min {s['mode']})")
+    return {
+        "time_block": name,
+        "summary": " → ".join(parts),
+        "activities": [s["activity"] for s in slots],
+        "slots": [{"activity": s["activity"], "start": _clock(s["start"]), "end": _clock(s["end"]),
+                   "travel_minutes": s["travel_minutes"], "mode": s["mode"]} for s in slots],
+    }
+
+
+class TripSchedule:
+    """Scheduled blocks for the first `len(days)` trip days; later days are free."""
+
+    def __init__(self, days: List[List[Dict[str, Any]]], stats: Dict[str, Any]):
+        self.days = days
+        self.stats = stats
+
+    def iter_days(self, start: date, days: int, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        for i in range(offset, days):
+            blocks = self.days[i] if i < len(self.days) else [_block(name, []) for name, _, _ in BLOCK_WINDOWS]
+            yield {"date": (start + timedelta(days=i)).isoformat(), "blocks": blocks}
+
+
+def schedule_trip(activities: Sequence[Dict[str, Any]], start: date, days: int, mobility: Optional[Mobility] = None,
+                  work_budget: int = WORK_BUDGET) -> TripSchedule:
+    """Schedule ranked `activities` (dicts with id, title, geo, duration_minutes, hours, best_time and
+    wheelchair_/stroller_friendly) over `days` days starting at `start`."""
+    t0 = time.perf_counter()
+    mob = mobility or Mobility()
+    budget = _Budget(work_budget)
+    excluded = [a["id"] for a in activities
+                if (mob.wheelchair and a.get("wheelchair_friendly") is False)
+                or (mob.stroller and a.get("stroller_friendly") is False)]
+    skip = set(excluded)
+    usable = [a for a in activities if a["id"] not in skip]
+    lats = [a["geo"]["lat"] for a in usable if _located(a.get("geo"))]
+    lat0 = sum(lats) / len(lats) if lats else 0.0
+    stops, seen = [], set()
+    for rank, a in enumerate(usable):
+        if a["id"] not in seen:
+            seen.add(a["id"])
+            stops.append(Stop(a, rank, lat0))
+
+    planned: List[List[Dict[str, Any]]] = []
+    unscheduled: List[str] = []
+    if stops and days > 0:
+        # Only the best-ranked activities that fit the trip are scheduled
+        per_day = DAY_CAPACITY * DAY_FILL
+        chosen, need = [], 0.0
+        for s in stops:
+            if need + s.duration + EST_LEG_MINUTES > per_day * days:
+                unscheduled.append(s.id)
+                continue
+            chosen.append(s)
+            need += s.duration + EST_LEG_MINUTES
+        # Aim for half-full days when the trip has room, rather than cramming the first few
+        n_days = max(1, min(days, len(chosen), math.ceil(2 * need / per_day)))
+        groups = _assign_days(chosen, n_days) if chosen else []
+        carry: List[Stop] = []
+        for i in range(days):
+            todays = sorted((groups[i] if i < len(groups) else []) + carry, key=lambda s: s.rank)
+            if not todays:
+                break
+            carry = todays[MAX_STOPS_PER_DAY:]
+            weekday = (start + timedelta(days=i)).weekday()
+            blocks, left = _plan_day(todays[:MAX_STOPS_PER_DAY], weekday, mob, budget)
+            carry = sorted(carry + left, key=lambda s: s.rank)
+            planned.append([_block(name, slots) for (name, _, _), slots in zip(BLOCK_WINDOWS, blocks)])
+        unscheduled.extend(s.id for s in carry)
+    return TripSchedule(planned, {
+        "candidates": len(activities),
+        "scheduled_days": len(planned),
+        "excluded_for_mobility": excluded,
+        "unscheduled": unscheduled,
+        "budget_exhausted": budget.exhausted,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1e3, 2),
+    })
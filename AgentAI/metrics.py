@@ -0,0 +1,222 @@
+"""Tiny in-process metrics registry with Prometheus text exposition.
+
+Kept dependency-free on purpose; counters, gauges, windowed gauges and
+histograms are label-aware and thread-safe, and `render_prometheus()` backs
+`GET /metrics`.
+"""
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+import collections
+import threading
+import time
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self._values: Dict[LabelKey, float] = {}
+        super().__init__(name, help_text)
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(_key(labels), 0.0)
+
+    def items(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            return [(dict(k), v) for k, v in self._values.items()]
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_fmt_labels(k)} {v}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+        super().__init__(name, help_text)
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = _key(labels)
+        with self._lock:
+            counts = self._counts.get(k)
+            if counts is None:
+                counts = self._counts[k] = [0] * (len(self.buckets) + 1)
+                self._sums[k] = 0.0
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            self._sums[k] += value
+
+    def snapshot(self, **labels: str) -> Dict[str, float]:
+        k = _key(labels)
+        counts = self._counts.get(k) or [0] * (len(self.buckets) + 1)
+        return {"count": sum(counts), "sum": self._sums.get(k, 0.0)}
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        for k, counts in sorted(self._counts.items()):
+            acc = 0
+            for b, c in zip(self.buckets, counts):
+                acc += c
+                lines.append(f"{self.name}_bucket{_fmt_labels(k, ('le', repr(b)))} {acc}")
+            acc += counts[-1]
+            lines.append(f"{self.name}_bucket{_fmt_labels(k, ('le', '+Inf'))} {acc}")
+            lines.append(f"{self.name}_sum{_fmt_labels(k)} {self._sums[k]}")
+            lines.append(f"{self.name}_count{_fmt_labels(k)} {acc}")
+        return lines
+
+
+class Windowed(_Metric):
+    """Gauge of the mean or max of the observations in the last `window` seconds (0 when there were none).
+
+    For signals a scraper or autoscaler reads as a level, such as recent wait times, where a histogram would need
+    rate() arithmetic downstream. Observations are folded into one-second buckets, so memory is bounded by
+    `window` per label set."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, window: float = 30.0, agg: str = "mean"):
+        if agg not in ("mean", "max"):
+            raise ValueError(f"agg must be 'mean' or 'max', not {agg!r}")
+        self.window = float(window)
+        self.agg = agg
+        self._buckets: Dict[LabelKey, Deque[List[float]]] = {}  # [second, sum, count, max]
+        super().__init__(name, help_text)
+
+    def _prune(self, buckets: Deque[List[float]], now: float) -> None:
+        while buckets and buckets[0][0] <= now - self.window:
+            buckets.popleft()
+
+    def observe(self, value: float, **labels: str) -> None:
+        k = _key(labels)
+        value = float(value)
+        second = float(int(time.monotonic()))
+        with self._lock:
+            buckets = self._buckets.setdefault(k, collections.deque())
+            if buckets and buckets[-1][0] == second:
+                b = buckets[-1]
+                b[1] += value
+                b[2] += 1
+                b[3] = max(b[3], value)
+            else:
+                buckets.append([second, value, 1, value])
+            self._prune(buckets, second)
+
+    def _value(self, buckets: Deque[List[float]]) -> float:
+        self._prune(buckets, time.monotonic())
+        if not buckets:
+            return 0.0
+        if self.agg == "max":
+            return max(b[3] for b in buckets)
+        return sum(b[1] for b in buckets) / sum(b[2] for b in buckets)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            buckets = self._buckets.get(_key(labels))
+            return self._value(buckets) if buckets is not None else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_fmt_labels(k)} {self._value(b)}" for k, b in sorted(self._buckets.items())]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def add_collector(self, fn: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before each scrape."""
+        self._collectors.append(fn)
+
+    def render_prometheus(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                pass
+        out: List[str] = []
+        for name in sorted(self._metrics):
+            m = self._metrics[name]
+            out.append(f"# HELP {name} {m.help}")
+            out.append(f"# TYPE {name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str) -> Counter:
+    existing = REGISTRY.get(name)
+    return existing if isinstance(existing, Counter) and not isinstance(existing, Gauge) else Counter(name, help_text)
+
+
+def gauge(name: str, help_text: str) -> Gauge:
+    existing = REGISTRY.get(name)
+    return existing if isinstance(existing, Gauge) else Gauge(name, help_text)
+
+
+def windowed(name: str, help_text: str, window: float = 30.0, agg: str = "mean") -> Windowed:
+    existing = REGISTRY.get(name)
+    return existing if isinstance(existing, Windowed) else Windowed(name, help_text, window, agg)
+
+
+def histogram(name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    existing = REGISTRY.get(name)
+    return existing if isinstance(existing, Histogram) else Histogram(name, help_text, buckets)
@@ -0,0 +1,227 @@
+"""Near-duplicate plan cache for the concierge endpoint.
+
+Requests are embedded with a hashed character n-gram vectorizer (no model
+download) and looked up with a vectorized cosine top-k over a bounded matrix.
+Rows are bucketed by a hard fingerprint of every structured request field
+(location, dates, party, budget, interests, dietary, mobility and context
+flags) and a hit is only reused when the free-text prompt's similarity clears
+the threshold inside that bucket. Terms the prompt negates ("no museums") are
+part of the fingerprint too, since adding one barely moves the n-grams.
+Paraphrased prompts share a plan; any other prompt edit that keeps most of its
+wording can still clear the threshold, which is what the threshold trades.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import re
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^a-z0-9$ ]+")
+
+# Cheap canonicalization so common abbreviations land on the same n-grams
+_SYNONYMS = {
+    "sf": "san francisco",
+    "nyc": "new york",
+    "la": "los angeles",
+    "kids": "family",
+    "children": "family",
+    "child": "family",
+    "days": "day",
+    "nights": "night",
+}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    t = _PUNCT_RE.sub(" ", (text or "").lower())
+    words = [_SYNONYMS.get(w, w) for w in _WS_RE.split(t) if w]
+    return " ".join(words)
+
+
+class HashedNgramVectorizer:
+    """Character n-gram vectorizer using the hashing trick (CRC32, stable across processes)."""
+
+    def __init__(self, dim: int = 256, ngram_range: Tuple[int, int] = (3, 4)):
+        self.dim = int(dim)
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> Dict[int, float]:
+        padded = f" {text} "
+        feats: Dict[int, float] = {}
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(padded) - n + 1):
+                h = zlib.crc32(padded[i:i + n].encode("utf-8"))
+                idx = h % self.dim
+                # Signed hashing keeps collisions from only ever adding up
+                sign = 1.0 if (h >> 31) & 1 == 0 else -1.0
+                feats[idx] = feats.get(idx, 0.0) + sign
+        return feats
+
+    def transform_one(self, text: str) -> "np.ndarray":
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for idx, val in self._features(normalize_text(text)).items():
+            vec[idx] = val
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec
+
+
+class SemanticPlanCache:
+    """Bounded, evictable similarity cache of plan responses.
+
+    Vectors live in a preallocated float32 matrix. `get` scores only the rows
+    sharing the request fingerprint; `search` is a full-matrix top-k via
+    argpartition. When full, the least recently used row is overwritten.
+    Entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, capacity: int = 10000, dim: int = 256, threshold: float = 0.85, ttl_seconds: float = 900.0):
+        self.capacity = int(capacity)
+        self.threshold = float(threshold)
+        self.ttl_seconds = float(ttl_seconds)
+        self.vectorizer = HashedNgramVectorizer(dim=dim)
+        self._matrix = np.zeros((self.capacity, self.vectorizer.dim), dtype=np.float32)
+        self._last_used = np.zeros(self.capacity, dtype=np.float64)
+        self._fingerprints: List[Optional[str]] = [None] * self.capacity
+        self._values: List[Any] = [None] * self.capacity
+        self._meta: List[Dict[str, Any]] = [{} for _ in range(self.capacity)]
+        self._expires = np.zeros(self.capacity, dtype=np.float64)
+        self._buckets: Dict[str, List[int]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "inserts": 0}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _slot_for_insert(self) -> int:
+        if self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+            return slot
+        slot = int(np.argmin(self._last_used[:self._size]))
+        self.stats["evictions"] += 1
+        return slot
+
+    def put(self, text: str, fingerprint: str, value: Any, meta: Optional[Dict[str, Any]] = None) -> int:
+        vec = self.vectorizer.transform_one(text)
+        now = time.time()
+        with self._lock:
+            slot = self._slot_for_insert()
+            old_fp = self._fingerprints[slot]
+            if old_fp is not None:
+                bucket = self._buckets.get(old_fp)
+                if bucket is not None:
+                    bucket.remove(slot)
+                    if not bucket:
+                        del self._buckets[old_fp]
+            self._buckets.setdefault(fingerprint, []).append(slot)
+            self._matrix[slot] = vec
+            self._last_used[slot] = now
+            self._expires[slot] = now + self.ttl_seconds
+            self._fingerprints[slot] = fingerprint
+            self._values[slot] = value
+            self._meta[slot] = dict(meta or {}, stored_at=now)
+            self.stats["inserts"] += 1
+            return slot
+
+    def search(self, text: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Return up to k (slot, cosine) pairs, best first, ignoring expiry."""
+        if self._size == 0:
+            return []
+        q = self.vectorizer.transform_one(text)
+        with self._lock:
+            scores = self._matrix[:self._size] @ q
+        k = min(k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def get(self, text: str, fingerprint: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """Best non-expired entry in the fingerprint bucket above the threshold."""
+        q = self.vectorizer.transform_one(text)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(fingerprint)
+            if bucket:
+                rows = np.fromiter(bucket, dtype=np.intp, count=len(bucket))
+                scores = self._matrix[rows] @ q
+                scores[self._expires[rows] < now] = -1.0
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    slot = int(rows[best])
+                    self._last_used[slot] = now
+                    self.stats["hits"] += 1
+                    return self._values[slot], dict(self._meta[slot], similarity=round(float(scores[best]), 4))
+            self.stats["misses"] += 1
+        return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._buckets = {}
+            self._fingerprints = [None] * self.capacity
+            self._values = [None] * self.capacity
+            self._meta = [{} for _ in range(self.capacity)]
+
+
+# "no museums", "without stairs", "avoid crowds": a constraint flips the plan but barely moves the n-grams
+_NEGATION_RE = re.compile(r"\b(?:no|not|non|without|avoid|avoiding|skip|except|dont|don t|never)\s+(?:any\s+|the\s+|too\s+)?(\w+)")
+
+
+def _negations(text: Optional[str]) -> str:
+    return ",".join(sorted(set(_NEGATION_RE.findall(normalize_text(text)))))
+
+
+def _flag_keys(obj: Any, keys: List[str]) -> List[str]:
+    return sorted(k for k in keys if obj is not None and getattr(obj, k, None))
+
+
+def plan_cache_key(nlu_query: Optional[str], booking: Any, prefs: Any, context: Any = None) -> Tuple[str, str]:
+    """Build (embedding_text, fingerprint) from the normalized request.
+
+    Every structured field that shapes the plan goes into the fingerprint and
+    must match exactly, as do the terms the prompt negates ("no museums"); only
+    the free-text `nlu_query` is compared by similarity. Requests without a prompt share a constant text, so they hit
+    only on an identical fingerprint.
+    """
+    dietary = getattr(prefs, "dietary", None)
+    mobility = getattr(prefs, "mobility_needs", None)
+    fingerprint = "|".join([
+        normalize_text(getattr(booking, "location", "") or ""),
+        str(getattr(booking, "start_date", "") or ""),
+        str(getattr(booking, "end_date", "") or ""),
+        str(getattr(booking, "party_type", "") or "").lower(),
+        str(getattr(booking, "party_size", "") or ""),
+        ",".join(str(a) for a in sorted(getattr(booking, "children_ages", None) or [])),
+        str(getattr(prefs, "budget", "") or "").lower(),
+        ",".join(sorted({str(i).strip().lower() for i in (getattr(prefs, "interests", None) or [])})),
+        ",".join(_flag_keys(dietary, ["vegan", "vegetarian", "gluten_free", "halal", "kosher"])),
+        ",".join(sorted({str(o).strip().lower() for o in (getattr(dietary, "other", None) or [])})),
+        ",".join(_flag_keys(mobility, ["wheelchair", "stroller"])),
+        str(getattr(mobility, "max_walk_km", "") or ""),
+        ",".join(f"{k}={getattr(context, k, None) or 'auto'}" for k in ("weather", "events", "pois")),
+        _negations(nlu_query),
+    ])
+    return (nlu_query or "").strip() or "(no prompt)", fingerprint
+
+
+def plan_cache_from_env() -> Optional[SemanticPlanCache]:
+    if not NUMPY_AVAILABLE or os.getenv("PLAN_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return SemanticPlanCache(
+        capacity=int(os.getenv("PLAN_CACHE_CAPACITY", "10000")),
+        dim=int(os.getenv("PLAN_CACHE_DIM", "256")),
+        threshold=float(os.getenv("PLAN_CACHE_THRESHOLD", "0.85")),
+        ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", "900")),
+    )
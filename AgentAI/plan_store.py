@@ -0,0 +1,125 @@
+"""Shared store for precomputed trip context.
+
+The precompute consumer runs as its own process. For each booking it fetches
+the plan's upstream context (weather, events, POIs, restaurants) and writes
+the stage outputs here (MySQL in deployments, in-memory for local runs),
+keyed by the booking (`booking:<id>`, and `property:<id>:<check-in>:<check-out>`
+when the property is known). The web process reads them back when a request
+names that booking. It then plans from them with the request's own
+preferences and prompt and makes no upstream searches for the stages it reuses.
+A read that finds a row counts as a hit; stats count bookings, not keys.
+"""
+from typing import Any, Dict, Optional
+import json
+import os
+import threading
+import time
+
+
+class InMemoryPlanStore:
+    def __init__(self, ttl_seconds: float = 86400.0):
+        self.ttl_seconds = ttl_seconds
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, key: str, context: Dict[str, Any], booking_ref: Optional[str] = None) -> None:
+        # Round-tripped through JSON like the MySQL store, so both hand back the same shapes
+        with self._lock:
+            self._rows[key] = {
+                "context": json.dumps(context, default=str), "booking_ref": booking_ref,
+                "expires_at": time.time() + self.ttl_seconds, "hits": 0,
+            }
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._rows.get(key)
+            if not row or row["expires_at"] < time.time():
+                return None
+            row["hits"] += 1
+            return json.loads(row["context"])
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = [(r["booking_ref"] or k, r["hits"]) for k, r in self._rows.items()]
+        return {"stored": len({b for b, _ in rows}), "hit": len({b for b, hits in rows if hits > 0})}
+
+
+class MySQLPlanStore:
+    """Context rows in the shared MySQL database (table is created on first use)."""
+
+    DDL = (
+        "CREATE TABLE IF NOT EXISTS agentai_precomputed_contexts ("
+        " context_key VARCHAR(255) PRIMARY KEY,"
+        " booking_ref VARCHAR(64) NULL,"
+        " context_json MEDIUMTEXT NOT NULL,"
+        " hits INT NOT NULL DEFAULT 0,"
+        " created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+        " expires_at TIMESTAMP NOT NULL"
+        ")"
+    )
+
+    def __init__(self, connect, ttl_seconds: float = 86400.0):
+        self._connect = connect
+        self.ttl_seconds = ttl_seconds
+        self._ready = False
+
+    def _ensure(self, cur) -> None:
+        if not self._ready:
+            cur.execute(self.DDL)
+            self._ready = True
+
+    def put(self, key: str, context: Dict[str, Any], booking_ref: Optional[str] = None) -> None:
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                self._ensure(cur)
+                cur.execute(
+                    "REPLACE INTO agentai_precomputed_contexts (context_key, booking_ref, context_json, hits, expires_at) "
+                    "VALUES (%s, %s, %s, 0, NOW() + INTERVAL %s SECOND)",
+                    (key[:255], booking_ref, json.dumps(context, default=str), int(self.ttl_seconds)),
+                )
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                self._ensure(cur)
+                cur.execute(
+                    "SELECT context_json FROM agentai_precomputed_contexts WHERE context_key = %s AND expires_at > NOW()",
+                    (key[:255],),
+                )
+                row = cur.fetchone()
+                if not row:
+                    return None
+                cur.execute("UPDATE agentai_precomputed_contexts SET hits = hits + 1 WHERE context_key = %s", (key[:255],))
+                return json.loads(row["context_json"])
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                self._ensure(cur)
+                cur.execute(
+                    "SELECT COUNT(DISTINCT COALESCE(booking_ref, context_key)) AS stored, "
+                    "COUNT(DISTINCT CASE WHEN hits > 0 THEN COALESCE(booking_ref, context_key) END) AS hit "
+                    "FROM agentai_precomputed_contexts WHERE expires_at > NOW()"
+                )
+                row = cur.fetchone() or {}
+                return {"stored": int(row.get("stored") or 0), "hit": int(row.get("hit") or 0)}
+        finally:
+            conn.close()
+
+
+def plan_store_from_env(connect=None):
+    """PRECOMPUTE_STORE=mysql|memory|off (default off)."""
+    kind = os.getenv("PRECOMPUTE_STORE", "off").lower()
+    ttl = float(os.getenv("PRECOMPUTE_TTL_SECONDS", "86400"))
+    if kind == "memory":
+        return InMemoryPlanStore(ttl_seconds=ttl)
+    if kind == "mysql" and connect is not None:
+        return MySQLPlanStore(connect, ttl_seconds=ttl)
+    return None
@@ -0,0 +1,167 @@
+"""In-process sampling profiler backing `GET /debug/profile`.
+
+A daemon thread wakes every `interval` seconds, walks `sys._current_frames()`
+and counts each thread's stack (event-loop thread and executor workers alike).
+Nothing is traced between samples, so cost is proportional to the sample rate
+and thread count, not to the code being profiled. The sampler times its own
+work and backs its interval off whenever that exceeds `max_overhead` of wall
+time; the measured overhead is reported with every profile.
+
+Output is collapsed stacks (`thread;module:func;... count`, the input format of
+flamegraph.pl / speedscope / inferno) or a speedscope JSON document.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sys
+import threading
+import time
+
+# Leaf frames in these stdlib files mean the thread is parked, not working
+# (thread.py is concurrent.futures: an executor worker blocked on its work queue)
+_IDLE_FILES = ("selectors.py", "threading.py", "queue.py", "thread.py")
+
+Stack = Tuple[str, ...]
+
+
+def _frame_label(code) -> str:
+    name = os.path.basename(code.co_filename)
+    if name.endswith(".py"):
+        name = name[:-3]
+    return f"{name}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 64, max_overhead: float = 0.02,
+                 include_idle: bool = False):
+        self.interval = float(interval)
+        self.max_depth = int(max_depth)
+        self.max_overhead = float(max_overhead)
+        self.include_idle = include_idle
+        self.counts: Dict[Stack, int] = {}
+        self.samples = 0
+        self.sample_seconds = 0.0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _sample(self, own_ident: int, names: Dict[int, str]) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if not self.include_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                continue
+            stack: List[str] = []
+            f = frame
+            while f is not None and len(stack) < self.max_depth:
+                stack.append(self._label(f.f_code))
+                f = f.f_back
+            stack.append(names.get(ident) or f"thread-{ident}")
+            key = tuple(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        interval = self.interval
+        while not self._stop.wait(interval):
+            # CPU time, not wall: waiting for the GIL is not work the sampler adds
+            t0 = time.thread_time()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            self._sample(own, names)
+            cost = time.thread_time() - t0
+            self.samples += 1
+            self.sample_seconds += cost
+            # Keep cost/(cost+interval) under the budget
+            interval = max(self.interval, cost / self.max_overhead - cost)
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="agentai-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+        return self
+
+    # -- reporting -------------------------------------------------------
+    @property
+    def wall_seconds(self) -> float:
+        return max((self.stopped_at or time.perf_counter()) - self.started_at, 1e-9)
+
+    def overhead(self) -> float:
+        """Fraction of wall time the sampler thread spent on CPU collecting stacks."""
+        return self.sample_seconds / self.wall_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "samples": self.samples,
+            "stacks": len(self.counts),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "sampler_seconds": round(self.sample_seconds, 4),
+            "overhead": round(self.overhead(), 5),
+            "interval_ms": self.interval * 1000.0,
+        }
+
+    def collapsed(self) -> str:
+        rows = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        return "".join(";".join(stack) + f" {n}\n" for stack, n in rows)
+
+    def speedscope(self, name: str = "agentai") -> Dict[str, Any]:
+        """Speedscope file format: one sampled profile per thread, shared frame table."""
+        frame_ids: Dict[str, int] = {}
+        frames: List[Dict[str, str]] = []
+        per_thread: Dict[str, Tuple[List[List[int]], List[int]]] = {}
+        for stack, n in self.counts.items():
+            ids = []
+            for label in stack[1:]:
+                i = frame_ids.get(label)
+                if i is None:
+                    i = frame_ids[label] = len(frames)
+                    mod, _, func = label.partition(":")
+                    frames.append({"name": func or label, "file": mod})
+                ids.append(i)
+            samples, weights = per_thread.setdefault(stack[0], ([], []))
+            samples.append(ids)
+            weights.append(n)
+        profiles = []
+        for thread, (samples, weights) in sorted(per_thread.items()):
+            profiles.append({
+                "type": "sampled",
+                "name": thread,
+                "unit": "none",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "agentai-profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+# Only one profile at a time per process: concurrent samplers would double the overhead
+_ACTIVE = threading.Lock()
+
+
+def try_acquire() -> bool:
+    return _ACTIVE.acquire(blocking=False)
+
+
+def release() -> None:
+    _ACTIVE.release()
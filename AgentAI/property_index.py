@@ -0,0 +1,243 @@
+"""In-process replica of active properties for location lookups.
+
+Loaded once at startup and kept fresh by incremental polling on an
+(`updated_at`, `id`) watermark, with a periodic full resync to pick up hard
+deletes and main-image changes (which do not bump `properties.updated_at`).
+`updated_at` has one-second resolution, so a row written later in the
+watermark's second can sort before it; each poll re-reads from one second
+before the watermark and applies rows idempotently, counting only real changes.
+Properties are indexed under their normalized city, state and country so
+`_fetch_properties_by_location` is a dict lookup plus a slice, and by their
+coordinates in a grid spatial index (spatial.py) for nearest-listing queries.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+
+from spatial import SpatialIndex
+
+_EPOCH = datetime(1970, 1, 1)
+# Resolution of properties.updated_at (MySQL TIMESTAMP); incremental polls re-read this much before the watermark
+_OVERLAP = timedelta(seconds=1)
+
+SYNC_SQL = (
+    "SELECT p.id, p.name, p.city, p.state, p.country, p.price_per_night, p.is_active, "
+    "p.latitude, p.longitude, p.created_at, p.updated_at, "
+    "(SELECT pi.image_url FROM property_images pi WHERE pi.property_id = p.id AND pi.image_type = 'main' ORDER BY pi.display_order ASC LIMIT 1) AS main_image "
+    "FROM properties p "
+    "WHERE (p.updated_at > %s OR (p.updated_at = %s AND p.id > %s)) "
+    "ORDER BY p.updated_at ASC, p.id ASC LIMIT %s"
+)
+
+
+def normalize_location(s: Optional[str]) -> str:
+    return " ".join((s or "").strip().lower().split())
+
+
+def _ts(v: Any) -> float:
+    if isinstance(v, datetime):
+        return (v - _EPOCH).total_seconds()
+    return 0.0
+
+
+class PropertyRecord:
+    __slots__ = ("id", "name", "city", "state", "country", "price_per_night", "main_image", "latitude", "longitude", "entry")
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row.get("id")
+        self.name = row.get("name")
+        self.city = row.get("city")
+        self.state = row.get("state")
+        self.country = row.get("country")
+        self.price_per_night = float(row.get("price_per_night") or 0)
+        self.main_image = row.get("main_image")
+        self.latitude = float(row["latitude"]) if row.get("latitude") is not None else None
+        self.longitude = float(row["longitude"]) if row.get("longitude") is not None else None
+        # (-created, -id, id): newest first, matching ORDER BY created_at DESC; one tuple shared by all buckets
+        self.entry = (-_ts(row.get("created_at")), -int(self.id or 0), self.id)
+
+    def same(self, other: "PropertyRecord") -> bool:
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def keys(self) -> List[str]:
+        return list({k for k in (normalize_location(self.city), normalize_location(self.state), normalize_location(self.country)) if k})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "city": self.city,
+            "state": self.state,
+            "country": self.country,
+            "price_per_night": self.price_per_night,
+            "main_image": self.main_image,
+        }
+
+
+class PropertyIndex:
+    def __init__(self, connect: Callable[[], Any], page_size: int = 5000, full_resync_seconds: float = 3600.0,
+                 cell_km: float = 2.0, band_km: float = 0.5):
+        self._connect = connect
+        self.page_size = page_size
+        self.full_resync_seconds = full_resync_seconds
+        self._by_id: Dict[Any, PropertyRecord] = {}
+        self._by_key: Dict[str, List[Tuple[float, int, Any]]] = {}
+        self.cell_km, self.band_km = cell_km, band_km
+        self._spatial = SpatialIndex(cell_km, band_km)
+        self._lock = threading.RLock()
+        self._watermark: Tuple[datetime, int] = (_EPOCH, 0)
+        self.ready = False
+        self.last_sync_at = 0.0
+        self.last_full_sync_at = 0.0
+        self.max_updated_at: Optional[datetime] = None
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    # -- mutation --------------------------------------------------------
+    def _remove(self, pid: Any) -> None:
+        old = self._by_id.pop(pid, None)
+        if old is None:
+            return
+        self._spatial.remove(pid)
+        entry = old.entry
+        for k in old.keys():
+            bucket = self._by_key.get(k)
+            if bucket:
+                i = bisect.bisect_left(bucket, entry)
+                if i < len(bucket) and bucket[i] == entry:
+                    bucket.pop(i)
+                if not bucket:
+                    del self._by_key[k]
+
+    def apply(self, row: Dict[str, Any]) -> bool:
+        """Upsert (or drop, if inactive) one row; False when the index already held it as is."""
+        pid = row.get("id")
+        with self._lock:
+            old = self._by_id.get(pid)
+            if row.get("is_active") in (None, 0, False):
+                self._remove(pid)
+                return old is not None
+            rec = PropertyRecord(row)
+            if old is not None and old.same(rec):
+                return False
+            self._remove(pid)
+            self._by_id[pid] = rec
+            for k in rec.keys():
+                bisect.insort(self._by_key.setdefault(k, []), rec.entry)
+            if rec.latitude is not None and rec.longitude is not None:
+                self._spatial.add(pid, rec.latitude, rec.longitude, rec.price_per_night)
+            return True
+
+    # -- sync ------------------------------------------------------------
+    def _pull(self, since: Tuple[datetime, int]) -> Tuple[List[Dict[str, Any]], Tuple[datetime, int]]:
+        rows: List[Dict[str, Any]] = []
+        wm = since
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                while True:
+                    cur.execute(SYNC_SQL, (wm[0], wm[0], wm[1], self.page_size))
+                    page = cur.fetchall() or []
+                    rows.extend(page)
+                    if page:
+                        last = page[-1]
+                        wm = (last.get("updated_at") or wm[0], int(last.get("id") or 0))
+                    if len(page) < self.page_size:
+                        break
+        finally:
+            conn.close()
+        return rows, wm
+
+    def full_sync(self) -> int:
+        rows, wm = self._pull((_EPOCH, 0))
+        # Build off to the side and swap, so lookups are not blocked by a reload
+        by_id: Dict[Any, PropertyRecord] = {}
+        by_key: Dict[str, List[Tuple[float, int, Any]]] = {}
+        spatial = SpatialIndex(self.cell_km, self.band_km)
+        for r in rows:
+            if r.get("is_active") in (None, 0, False):
+                continue
+            rec = PropertyRecord(r)
+            by_id[rec.id] = rec
+            for k in rec.keys():
+                by_key.setdefault(k, []).append(rec.entry)
+            if rec.latitude is not None and rec.longitude is not None:
+                spatial.add(rec.id, rec.latitude, rec.longitude, rec.price_per_night)
+        for bucket in by_key.values():
+            bucket.sort()
+        with self._lock:
+            self._by_id, self._by_key, self._spatial = by_id, by_key, spatial
+            self._watermark = wm
+            self._finish_sync(rows, changed=len(rows))
+            self.last_full_sync_at = self.last_sync_at
+            self.ready = True
+        return len(rows)
+
+    def incremental_sync(self) -> int:
+        if not self.ready or time.time() - self.last_full_sync_at >= self.full_resync_seconds:
+            return self.full_sync()
+        # (t - 1s, 0): every row with updated_at >= watermark - 1s, including ones committed after the last poll
+        # read that second; rows already applied come back unchanged and are not counted
+        rows, wm = self._pull((self._watermark[0] - _OVERLAP, 0))
+        with self._lock:
+            changed = sum(self.apply(r) for r in rows)
+            self._watermark = max(self._watermark, wm)
+            self._finish_sync(rows, changed)
+        return changed
+
+    def _finish_sync(self, rows: List[Dict[str, Any]], changed: int) -> None:
+        self.last_sync_at = time.time()
+        if changed:
+            self.version += 1
+            newest = rows[-1].get("updated_at")
+            if isinstance(newest, datetime):
+                self.max_updated_at = newest
+
+    # -- queries ---------------------------------------------------------
+    def staleness_seconds(self) -> Optional[float]:
+        return (time.time() - self.last_sync_at) if self.ready else None
+
+    def lookup(self, location: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Active properties whose city/state/country matches `location`, newest first.
+
+        Tries the full normalized string, then the part before the first comma
+        ("San Francisco, CA"), then city keys containing it (the SQL `LIKE`).
+        """
+        loc = normalize_location(location)
+        if not loc:
+            return []
+        with self._lock:
+            for key in (loc, loc.split(",")[0].strip()):
+                bucket = self._by_key.get(key)
+                if bucket:
+                    return [self._by_id[e[2]].to_dict() for e in bucket[:limit]]
+            merged = set()
+            for key, bucket in self._by_key.items():
+                if loc in key:
+                    merged.update(bucket[:limit])
+            return [self._by_id[e[2]].to_dict() for e in sorted(merged)[:limit]]
+
+    def _with_distance(self, hits: List[Tuple[float, Any]]) -> List[Dict[str, Any]]:
+        return [{**self._by_id[p[3]].to_dict(), "distance_km": round(d, 3)} for d, p in hits]
+
+    def nearest(self, points: Sequence[Tuple[float, float]], k: int = 10,
+                max_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The `k` listings closest on average to `points` (e.g. one day's activities), nearest then cheapest."""
+        with self._lock:
+            return self._with_distance(self._spatial.nearest_to(points, k, max_km))
+
+    def within(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Listings within `radius_km` of a point, nearest then cheapest."""
+        with self._lock:
+            return self._with_distance(self._spatial.within(lat, lng, radius_km, limit))
+
+    def geo_count(self) -> int:
+        return len(self._spatial)
+
+    def records(self) -> List[PropertyRecord]:
+        with self._lock:
+            return list(self._by_id.values())
@@ -0,0 +1,271 @@
+"""Upstream query planning: the fewest Tavily searches a plan needs.
+
+A plan needs up to four kinds of context ("intents"): weather, events, POIs
+and restaurants. The planner is given the intents the request still needs, after the
+context flags, caller-provided context and a session's reused stages have
+removed theirs. Intents found in the search cache are served from it. The
+rest become upstream queries:
+
+- Events and POIs are compatible (both become activities), so they share one
+  combined query; results are split back by `classify`.
+- If the queries are not expected to fit the remaining latency budget (from
+  observed upstream latency, which decays back to its seed while a depth goes
+  unused), or the outbound scheduler is already queueing,
+  the planner drops to `basic` depth and folds restaurants into the activities
+  query.
+- If even that does not fit, weather is skipped and intents the local
+  catalog covers for the city are served from it.
+
+All queries of a plan run concurrently. `max_results` is what each intent
+uses, not a fixed number per search.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import os
+import re
+import threading
+import time
+
+INTENTS = ("weather", "events", "pois", "restaurants")
+# Results each intent uses downstream (weather: one snippet)
+INTENT_RESULTS = {"weather": 1, "events": 5, "pois": 8, "restaurants": 6}
+# The previous fixed searches, for QUERY_PLANNER_ENABLED=false
+LEGACY_RESULTS = {"weather": 3, "events": 5, "pois": 8, "restaurants": 6}
+MAX_RESULTS = 20  # Tavily's per-search cap
+LOCAL_CATALOG = {"pois": "activities", "restaurants": "restaurants"}
+
+_RESTAURANT_RE = re.compile(
+    r"\b(restaurants?|caf[eé]s?|diners?|bistros?|eatery|eateries|brasserie|trattoria|pizzeria|bakery|brunch|"
+    r"taqueria|steakhouse|sushi|ramen|tapas|gastropub|food hall|dining|cuisine|menu|chef)\b")
+_EVENT_RE = re.compile(
+    r"\b(festival|concerts?|tickets?|live music|performances?|shows?|parade|tonight|this (?:week|weekend)|"
+    r"exhibition opening|screening|matinee|game day|fair|"
+    r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.? \d{1,2}\b)")
+
+
+def classify(title: str, snippet: str) -> str:
+    """"restaurants", "events" or "pois" for one search result, from its title first, then its snippet."""
+    title = (title or "").lower()
+    for text in (title, f"{title} {(snippet or '').lower()}"):
+        if _RESTAURANT_RE.search(text):
+            return "restaurants"
+        if _EVENT_RE.search(text):
+            return "events"
+    return "pois"
+
+
+def intent_query(intent: str, location: str, diet: Optional[str] = None) -> str:
+    if intent == "weather":
+        return f"current weather and typical conditions this week in {location}"
+    if intent == "events":
+        return f"events this week for families in {location}"
+    if intent == "pois":
+        return f"top attractions and kid-friendly points of interest in {location} with hours and prices"
+    if diet:
+        return f"best {diet} restaurants in {location} with price info"
+    return f"best family friendly restaurants in {location} with price info"
+
+
+def _combined_query(intents: Sequence[str], location: str, diet: Optional[str]) -> str:
+    parts = []
+    if "pois" in intents:
+        parts.append("top attractions and kid-friendly points of interest with hours and prices")
+    if "events" in intents:
+        parts.append("family events this week")
+    if "restaurants" in intents:
+        parts.append(f"best {diet or 'family friendly'} restaurants with price info")
+    if len(parts) == 1:
+        return f"{parts[0]} in {location}"
+    return f"{', '.join(parts[:-1])} and {parts[-1]} in {location}"
+
+
+class Query:
+    __slots__ = ("intents", "text", "depth", "max_results")
+
+    def __init__(self, intents: Sequence[str], text: str, depth: str, max_results: int):
+        self.intents = tuple(intents)
+        self.text = text
+        self.depth = depth
+        self.max_results = max_results
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"intents": list(self.intents), "query": self.text, "depth": self.depth, "max_results": self.max_results}
+
+
+class QueryPlan:
+    def __init__(self, level: str, queries: List[Query], cached: Sequence[str] = (), local: Sequence[str] = (),
+                 skipped: Sequence[str] = (), estimate_s: float = 0.0, budget_s: Optional[float] = None,
+                 sequential: bool = False):
+        self.level = level
+        self.queries = queries
+        self.cached = list(cached)
+        self.local = list(local)
+        self.skipped = list(skipped)
+        self.estimate_s = estimate_s
+        self.budget_s = budget_s
+        self.sequential = sequential
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"level": self.level, "upstream_calls": len(self.queries),
+                "queries": [q.as_dict() for q in self.queries],
+                "cached": self.cached, "local": self.local, "skipped": self.skipped,
+                "estimate_ms": round(self.estimate_s * 1e3, 1),
+                "budget_ms": round(self.budget_s * 1e3, 1) if self.budget_s is not None else None}
+
+
+class SearchCache:
+    """Classified results per (intent, location, variant); least recently used evicted first,
+    entries expire after `ttl_seconds`."""
+
+    def __init__(self, capacity: int = 2048, ttl_seconds: float = 900.0):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def key(intent: str, location: str, variant: Optional[str]) -> Tuple[str, str, str]:
+        return intent, " ".join((location or "").lower().split()), variant or ""
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._items[key]
+                self.stats["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[1]
+
+    def peek(self, key: Tuple[str, str, str]) -> bool:
+        item = self._items.get(key)
+        return item is not None and item[0] >= time.time()
+
+    def put(self, key: Tuple[str, str, str], value: Any) -> None:
+        with self._lock:
+            self._items[key] = (time.time() + self.ttl_seconds, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+
+class QueryPlanner:
+    def __init__(self, budget_s: float = 3.0, advanced_s: float = 1.5, basic_s: float = 0.8, alpha: float = 0.2,
+                 half_life_s: float = 60.0, cache: Optional[SearchCache] = None, enabled: bool = True):
+        self.budget_s = budget_s
+        self.alpha = alpha
+        self.half_life_s = half_life_s
+        # EWMA of observed upstream latency per depth, seeded with typical Tavily latencies
+        self._seed = {"advanced": advanced_s, "basic": basic_s}
+        self._latency = dict(self._seed)
+        self._observed_at = {d: time.monotonic() for d in self._seed}
+        self.cache = cache
+        self.enabled = enabled
+
+    def observe(self, depth: str, seconds: float) -> None:
+        """Fold one upstream search time (the search call only) into `depth`'s estimate."""
+        self._latency[depth] = (1 - self.alpha) * self.estimate(depth) + self.alpha * seconds
+        self._observed_at[depth] = time.monotonic()
+
+    def estimate(self, depth: str) -> float:
+        # Only the depth that runs is observed, so a slow spell would otherwise keep a depth unused for good:
+        # its estimate halves its distance to the seed every `half_life_s` without observations
+        if self.half_life_s <= 0:
+            return self._latency[depth]
+        weight = 0.5 ** ((time.monotonic() - self._observed_at[depth]) / self.half_life_s)
+        return self._seed[depth] + (self._latency[depth] - self._seed[depth]) * weight
+
+    def snapshot(self) -> Dict[str, Any]:
+        cache = None
+        if self.cache is not None:
+            cache = {"size": len(self.cache), "capacity": self.cache.capacity, **self.cache.stats}
+        return {"enabled": self.enabled, "budget_ms": round(self.budget_s * 1e3),
+                "latency_ms": {d: round(self.estimate(d) * 1e3, 1) for d in self._latency}, "search_cache": cache}
+
+    def plan(self, intents: Sequence[str], location: str, diet: Optional[str] = None, elapsed_s: float = 0.0,
+             queued: bool = False, local_covers: Set[str] = frozenset(), use_cache: bool = True) -> QueryPlan:
+        """Queries for `intents` (a subset of INTENTS) given `elapsed_s` of the plan's budget already spent,
+        whether the outbound scheduler is queueing, and the intents the local catalog covers for `location`.
+        `use_cache=False` searches for every intent even when the search cache holds it."""
+        intents = [i for i in INTENTS if i in intents]
+        if not self.enabled:
+            return QueryPlan("legacy", [Query([i], intent_query(i, location, diet), "advanced", LEGACY_RESULTS[i])
+                                        for i in intents], sequential=True)
+        cache = self.cache if use_cache else None
+        cached = [i for i in intents if cache is not None and cache.peek(cache.key(i, location, self.variant(i, diet)))]
+        todo = [i for i in intents if i not in cached]
+        remaining = self.budget_s - elapsed_s
+        if not todo:
+            return QueryPlan("cached" if cached else "none", [], cached=cached, budget_s=remaining)
+
+        full = self._queries(todo, location, diet, "advanced", fold_restaurants=False)
+        if not queued and self.estimate("advanced") <= remaining:
+            return QueryPlan("full", full, cached=cached, estimate_s=self.estimate("advanced"), budget_s=remaining)
+        reduced = self._queries(todo, location, diet, "basic", fold_restaurants=True)
+        if self.estimate("basic") <= remaining:
+            return QueryPlan("reduced", reduced, cached=cached, estimate_s=self.estimate("basic"), budget_s=remaining)
+        # Out of budget: no weather, and the local catalog instead of upstream where it covers the city
+        local = [i for i in todo if i in local_covers]
+        upstream = [i for i in todo if i not in local and i != "weather"]
+        skipped = ["weather"] if "weather" in todo else []
+        queries = self._queries(upstream, location, diet, "basic", fold_restaurants=True) if upstream else []
+        return QueryPlan("minimal", queries, cached=cached, local=local, skipped=skipped,
+                         estimate_s=self.estimate("basic") if queries else 0.0, budget_s=remaining)
+
+    @staticmethod
+    def variant(intent: str, diet: Optional[str]) -> Optional[str]:
+        return diet if intent == "restaurants" else None
+
+    @staticmethod
+    def _queries(intents: Sequence[str], location: str, diet: Optional[str], depth: str,
+                 fold_restaurants: bool) -> List[Query]:
+        out = []
+        if "weather" in intents:
+            out.append(Query(["weather"], intent_query("weather", location), depth, INTENT_RESULTS["weather"]))
+        merged = [i for i in ("pois", "events") if i in intents]
+        if fold_restaurants and "restaurants" in intents and merged:
+            merged.append("restaurants")
+        elif "restaurants" in intents:
+            out.append(Query(["restaurants"], intent_query("restaurants", location, diet), depth,
+                             INTENT_RESULTS["restaurants"]))
+        if len(merged) == 1:
+            out.append(Query(merged, intent_query(merged[0], location, diet), depth, INTENT_RESULTS[merged[0]]))
+        elif merged:
+            n = min(MAX_RESULTS, sum(INTENT_RESULTS[i] for i in merged))
+            out.append(Query(merged, _combined_query(merged, location, diet), depth, n))
+        return out
+
+    def split(self, query: Query, results: List[Any]) -> Dict[str, List[Any]]:
+        """Results of `query` per intent; a single-intent query keeps everything it got."""
+        if len(query.intents) == 1:
+            return {query.intents[0]: results}
+        out: Dict[str, List[Any]] = {i: [] for i in query.intents}
+        for r in results:
+            kind = classify(r.title, r.snippet)
+            if kind not in out:
+                # e.g. a restaurant from an activities-only query: closest activity intent
+                kind = "pois" if "pois" in out else query.intents[0]
+            out[kind].append(r)
+        return out
+
+
+def query_planner_from_env() -> QueryPlanner:
+    cache = None
+    if os.getenv("SEARCH_CACHE_ENABLED", "true").lower() not in ("0", "false", "no"):
+        cache = SearchCache(capacity=int(os.getenv("SEARCH_CACHE_SIZE", "2048")),
+                            ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900")))
+    return QueryPlanner(
+        budget_s=float(os.getenv("QUERY_PLAN_BUDGET_MS", "3000")) / 1000.0,
+        advanced_s=float(os.getenv("QUERY_PLAN_ADVANCED_MS", "1500")) / 1000.0,
+        basic_s=float(os.getenv("QUERY_PLAN_BASIC_MS", "800")) / 1000.0,
+        half_life_s=float(os.getenv("QUERY_PLAN_LATENCY_HALF_LIFE_SECONDS", "60")),
+        cache=cache,
+        enabled=os.getenv("QUERY_PLANNER_ENABLED", "true").lower() not in ("0", "false", "no"),
+    )
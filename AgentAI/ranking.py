@@ -0,0 +1,233 @@
+"""Preference-aware ranking of activity and restaurant candidates.
+
+Candidates and the traveler's preferences are encoded as NumPy feature arrays
+(price tier, interest hits, venue mobility/kid flags, dietary matches) and
+scored in one batch; `rank_candidates` returns the indices of the top-k.
+Venue attributes are derived from the candidate's own text, not copied from
+the traveler's preferences. Candidate text is tokenized once into interned
+token ids cached on the record, so repeat rankings of the same pool only pay
+for the array work.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import re
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+PRICE_ORDINAL = {"$": 1, "$$": 2, "$$$": 3, "$$$$": 4}
+BUDGET_TARGET = {"low": 1, "budget": 1, "medium": 2, "moderate": 2, "high": 3, "luxury": 4}
+DIET_KEYS = ["vegan", "vegetarian", "gluten_free", "halal", "kosher"]
+
+# Interest -> words that signal it in a venue's tags/title/content
+INTEREST_WORDS = {
+    "museum": ["museum", "gallery", "exhibit", "art"],
+    "outdoors": ["park", "trail", "hike", "garden", "beach", "outdoor"],
+    "food": ["food", "restaurant", "cafe", "market", "tasting"],
+    "shopping": ["shop", "market", "mall", "boutique"],
+    "history": ["history", "historic", "heritage", "landmark"],
+    "nightlife": ["bar", "club", "nightlife", "music"],
+    "kids": ["kids", "children", "family", "zoo", "aquarium", "playground"],
+    "sightseeing": ["tour", "view", "landmark", "sightseeing"],
+}
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+# Interned token vocabulary shared by all candidates; id 0 is "unknown" once the cap is reached
+_VOCAB: Dict[str, int] = {"": 0}
+_WORDS: List[str] = [""]  # id -> token, for records that leave the process (ids are only valid in this one)
+_VOCAB_CAP = 1 << 20
+
+
+def _token_id(tok: str) -> int:
+    tid = _VOCAB.get(tok)
+    if tid is None:
+        if len(_VOCAB) >= _VOCAB_CAP:
+            return 0
+        tid = _VOCAB[tok] = len(_VOCAB)
+        _WORDS.append(tok)
+    return tid
+
+
+def token_words(ids: Sequence[int]) -> List[str]:
+    """Tokens behind interned ids (the "unknown" id 0 is dropped)."""
+    return [_WORDS[i] for i in ids if i]
+
+
+def text_token_ids(text: str) -> "np.ndarray":
+    """Unique interned token ids of lower-cased text."""
+    return np.fromiter(map(_token_id, set(_TOKEN_RE.findall(text))), dtype=np.int32)
+
+
+def candidate_token_ids(c: Dict[str, Any]) -> "np.ndarray":
+    """Token ids of a candidate's title/tags/text, computed once and cached on the record.
+
+    `text_token_ids` may carry ids precomputed at ingestion in place of `text`."""
+    ids = c.get("_token_ids")
+    if ids is None:
+        pre = c.get("text_token_ids")
+        hay = f"{c.get('title') or ''} {' '.join(c.get('tags') or [])}"
+        if pre is None:
+            hay = f"{hay} {c.get('text') or ''}"
+        ids = text_token_ids(hay.lower())
+        if pre is not None:
+            ids = np.union1d(ids, pre)
+        c["_token_ids"] = ids
+    return ids
+
+_POSITIVE = {
+    "wheelchair": re.compile(r"wheelchair[- ]accessible|ada[- ]accessible|step[- ]free|accessible entrance|elevator access"),
+    "stroller": re.compile(r"stroller[- ]friendly|stroller access|pram|buggy[- ]friendly|paved path"),
+    "kid": re.compile(r"kid[- ]friendly|family[- ]friendly|for kids|children|playground|all ages|kids menu"),
+}
+_NEGATIVE = {
+    "wheelchair": re.compile(r"not wheelchair|no wheelchair|stairs only|not accessible|steep"),
+    "stroller": re.compile(r"no strollers|strollers not allowed|stairs only"),
+    "kid": re.compile(r"adults only|21\+|18\+|no children"),
+}
+_DIET_PATTERNS = {
+    "vegan": re.compile(r"\bvegan\b|plant[- ]based"),
+    "vegetarian": re.compile(r"vegetarian|veggie"),
+    "gluten_free": re.compile(r"gluten[- ]free|celiac"),
+    "halal": re.compile(r"\bhalal\b"),
+    "kosher": re.compile(r"\bkosher\b"),
+}
+
+
+def venue_attributes(text: Optional[str]) -> Dict[str, Any]:
+    """Derive venue flags from free text: True/False when stated, None when unknown."""
+    t = (text or "").lower()
+    out: Dict[str, Any] = {}
+    for key in ("wheelchair", "stroller", "kid"):
+        if _NEGATIVE[key].search(t):
+            out[key] = False
+        elif _POSITIVE[key].search(t):
+            out[key] = True
+        else:
+            out[key] = None
+    out["dietary"] = [k for k in DIET_KEYS if _DIET_PATTERNS[k].search(t)]
+    return out
+
+
+class PreferenceVector:
+    """Traveler preferences in the shape the scorer needs."""
+
+    def __init__(self, budget: Optional[str] = None, interests: Optional[Sequence[str]] = None,
+                 wheelchair: bool = False, stroller: bool = False, kids: bool = False,
+                 dietary: Optional[Sequence[str]] = None):
+        self.budget_target = BUDGET_TARGET.get((budget or "").strip().lower(), 0)
+        # Deduplicated, first mention first; a repeated interest would otherwise count twice
+        self.interests = list(dict.fromkeys(str(i).strip().lower() for i in (interests or []) if str(i).strip()))
+        self.wheelchair = bool(wheelchair)
+        self.stroller = bool(stroller)
+        self.kids = bool(kids)
+        self.dietary = [d for d in (dietary or []) if d in DIET_KEYS]
+
+    @classmethod
+    def from_request(cls, prefs: Any, booking: Any, extra_interests: Optional[Sequence[str]] = None) -> "PreferenceVector":
+        mobility = getattr(prefs, "mobility_needs", None)
+        dietary = getattr(prefs, "dietary", None)
+        return cls(
+            budget=getattr(prefs, "budget", None),
+            interests=list(getattr(prefs, "interests", None) or []) + list(extra_interests or []),
+            wheelchair=bool(getattr(mobility, "wheelchair", False)) if mobility else False,
+            stroller=bool(getattr(mobility, "stroller", False)) if mobility else False,
+            kids=getattr(booking, "party_type", None) == "family" or bool(getattr(booking, "children_ages", None)),
+            dietary=[k for k in DIET_KEYS if dietary is not None and getattr(dietary, k, None)],
+        )
+
+
+DEFAULT_WEIGHTS = {"budget": 1.0, "interest": 2.0, "mobility": 1.5, "dietary": 2.0, "kid": 1.0}
+
+
+def encode_candidates(candidates: Sequence[Dict[str, Any]], pv: PreferenceVector) -> Dict[str, "np.ndarray"]:
+    """Encode candidate dicts (title, tags, price_tier, text or text_token_ids, wheelchair, stroller, kid, dietary) as arrays."""
+    n = len(candidates)
+    price = np.fromiter((PRICE_ORDINAL.get(c.get("price_tier") or "", 0) for c in candidates), dtype=np.int8, count=n)
+    tri = {None: 0, True: 1, False: -1}
+    flags = np.fromiter(
+        (tri.get(c.get(key)) or 0 for c in candidates for key in ("wheelchair", "stroller", "kid")),
+        dtype=np.int8, count=3 * n,
+    ).reshape(n, 3)  # wheelchair, stroller, kid in {-1, 0, 1}
+    interest_hits = np.zeros((n, max(1, len(pv.interests))), dtype=bool)
+    if pv.interests:
+        token_ids = [candidate_token_ids(c) for c in candidates]
+        # token id -> bitmask of the interests it signals (plural forms included), 64 interests per word; only the
+        # interests' own tokens are kept, so the table is sized by the preferences, not the shared vocabulary
+        words = (len(pv.interests) + 63) // 64
+        bits: Dict[int, "np.ndarray"] = {}
+        for j, interest in enumerate(pv.interests):
+            for w in [interest] + INTEREST_WORDS.get(interest, []):
+                for form in (w, w + "s"):
+                    tid = _token_id(form)
+                    if tid:
+                        bits.setdefault(tid, np.zeros(words, dtype=np.uint64))[j // 64] |= np.uint64(1 << (j % 64))
+        keys = np.fromiter(sorted(bits), dtype=np.int64, count=len(bits))
+        lut = np.stack([bits[k] for k in keys.tolist()]) if bits else np.zeros((0, words), dtype=np.uint64)
+        lengths = np.fromiter((len(t) for t in token_ids), dtype=np.int64, count=n)
+        flat = np.concatenate(token_ids) if n else np.zeros(0, dtype=np.int32)
+        masks = np.zeros((n, words), dtype=np.uint64)
+        nonempty = lengths > 0
+        if flat.size and keys.size:
+            # Each candidate token's row in `lut`, or the appended all-zero row when it signals no interest
+            pos = np.minimum(np.searchsorted(keys, flat), keys.size - 1)
+            rows = np.where(keys[pos] == flat, pos, keys.size)
+            lut = np.vstack([lut, np.zeros((1, words), dtype=np.uint64)])
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            for w in range(words):  # one pass per 64 interests
+                masks[nonempty, w] = np.bitwise_or.reduceat(lut[rows, w], starts[nonempty])
+        j = np.arange(len(pv.interests))
+        interest_hits = ((masks[:, j // 64] >> (j % 64).astype(np.uint64)) & np.uint64(1)).astype(bool)
+    diet_hits = np.zeros((n, max(1, len(pv.dietary))), dtype=bool)
+    if pv.dietary:
+        for i, c in enumerate(candidates):
+            diets = c.get("dietary")
+            if diets:
+                for j, d in enumerate(pv.dietary):
+                    diet_hits[i, j] = d in diets
+    return {"price": price, "flags": flags, "interest": interest_hits, "dietary": diet_hits}
+
+
+def score_candidates(features: Dict[str, "np.ndarray"], pv: PreferenceVector,
+                     weights: Optional[Dict[str, float]] = None) -> "np.ndarray":
+    w = dict(DEFAULT_WEIGHTS, **(weights or {}))
+    price = features["price"].astype(np.float32)
+    flags = features["flags"].astype(np.float32)
+    n = price.shape[0]
+    score = np.zeros(n, dtype=np.float32)
+    if pv.budget_target:
+        fit = 1.0 - np.abs(price - pv.budget_target) / 3.0
+        score += w["budget"] * np.where(price == 0, 0.5, fit)
+    if pv.interests:
+        score += w["interest"] * features["interest"].mean(axis=1)
+    if pv.wheelchair:
+        score += w["mobility"] * flags[:, 0]
+    if pv.stroller:
+        score += w["mobility"] * flags[:, 1]
+    if pv.kids:
+        score += w["kid"] * flags[:, 2]
+    if pv.dietary:
+        score += w["dietary"] * features["dietary"].mean(axis=1)
+    return score
+
+
+def rank_candidates(candidates: Sequence[Dict[str, Any]], pv: PreferenceVector, k: Optional[int] = None,
+                    weights: Optional[Dict[str, float]] = None) -> List[int]:
+    """Indices of the top-k candidates, best first; ties keep the upstream order."""
+    n = len(candidates)
+    if n == 0:
+        return []
+    k = n if k is None else max(0, min(k, n))
+    if k == 0:
+        return []
+    if not NUMPY_AVAILABLE:
+        return list(range(k))
+    scores = score_candidates(encode_candidates(candidates, pv), pv, weights)
+    if k < n:
+        top = np.argpartition(-scores, k - 1)[:k]
+        top.sort()
+    else:
+        top = np.arange(n)
+    order = top[np.argsort(-scores[top], kind="stable")]
+    return [int(i) for i in order]
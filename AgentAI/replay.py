@@ -0,0 +1,309 @@
+"""Replay captured traffic (capture.py) against a local AgentAI.
+
+Separate entry point from the web app:
+
+    curl -s -H "X-Debug-Token: $CAPTURE_TOKEN" http://agentai:8000/debug/capture > capture.jsonl
+    python replay.py capture.jsonl --speed 4 --save before.jsonl          # this build, in-process
+    python replay.py capture.jsonl --speed 4 --baseline before.jsonl      # after a change: flag diffs
+    python replay.py capture.jsonl --target http://localhost:8000         # a running build (see below)
+
+Requests are sent at their captured spacing divided by `--speed` (open loop:
+a slow build does not slow the arrivals). `--speed 0` sends them one at a time
+in capture order, which is what build-to-build diffs want. Tavily is replaced
+by a stand-in that serves the recorded responses, matched by (query, depth,
+max_results), then by query alone, after the recorded latency
+(`--upstream-latency none` answers at once). The query planner shapes its
+searches by load, so a replay can ask for a search the capture never made
+(say, restaurants on their own where the capture folded them into the
+activities query); those are answered with the recorded results for the same
+city and intents, split by `query_planner.classify`, else with no results.
+In-process, the app is pointed at the stand-in through TAVILY_API_URL and its
+plan and search caches are off, so every request plans and searches as the
+captured one did (`--keep-caches` to leave them on). With `--target`, start
+that AgentAI with
+`TAVILY_API_URL=http://127.0.0.1:<--upstream-port>/search`, any TAVILY_API_KEY
+and, for diffs, PLAN_CACHE_ENABLED=false SEARCH_CACHE_ENABLED=false.
+
+Reports the request mix, throughput, latency next to the captured latency,
+status changes and upstream matches. `--save` writes each response;
+`--baseline` compares against a saved run and lists the fields that differ.
+Responses are requested without `debug`, whose timings always differ.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import collections
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+_INDEX_RE = re.compile(r"\[\d+\]")
+# query_planner.intent_query / _combined_query: "... in <location>[ with hours and prices| with price info]"
+_LOCATION_RE = re.compile(r" in (.+?)(?: with (?:hours and prices|price info))?$")
+_INTENT_WORDS = {"weather": "weather", "events": "events", "attractions": "pois", "restaurants": "restaurants"}
+
+
+def _query_intents(query: str) -> Tuple[Optional[str], List[str]]:
+    m = _LOCATION_RE.search(query)
+    return (m.group(1).lower() if m else None), [i for w, i in _INTENT_WORDS.items() if w in query]
+
+
+def load(path: str) -> List[Dict[str, Any]]:
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with stream:
+        records = [json.loads(line) for line in stream if line.strip()]
+    return sorted(records, key=lambda r: r["ts"])
+
+
+def load_results(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class RecordedUpstream:
+    """Stand-in Tavily serving the upstream responses recorded with the captured requests."""
+
+    def __init__(self, records: List[Dict[str, Any]], latency: bool = True):
+        self.latency = latency
+        self.exact: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        self.by_query: Dict[str, Dict[str, Any]] = {}
+        self.by_intent: Dict[Tuple[str, str], List[Dict[str, Any]]] = collections.defaultdict(list)
+        for rec in records:
+            for up in rec.get("upstream", ()):
+                self.exact.setdefault((up["query"], up["depth"], int(up["max_results"])), up)
+                self.by_query.setdefault(up["query"], up)
+                self._index(up)
+        self.stats = collections.Counter()
+
+    def _index(self, up: Dict[str, Any]) -> None:
+        from query_planner import classify
+        location, intents = _query_intents(up["query"])
+        if location is None or not intents:
+            return
+        for r in (up.get("body") or {}).get("results") or ():
+            intent = intents[0] if len(intents) == 1 else classify(r.get("title", ""), r.get("content", ""))
+            bucket = self.by_intent[(location, intent)]
+            if intent in intents and all(r.get("url") != seen.get("url") for seen in bucket):
+                bucket.append(r)
+
+    def lookup(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        query = body.get("query", "")
+        up = self.exact.get((query, body.get("search_depth", "advanced"), int(body.get("max_results", 5))))
+        if up is not None:
+            self.stats["exact"] += 1
+            return up
+        up = self.by_query.get(query)
+        if up is not None:
+            self.stats["by query"] += 1
+            return up
+        location, intents = _query_intents(query)
+        results = [r for i in intents for r in self.by_intent.get((location, i), ())]
+        if not results:
+            self.stats["missing"] += 1
+            return None
+        self.stats["by intent"] += 1
+        return {"status": 200, "latency_ms": 0.0, "body": {"results": results[:int(body.get("max_results", 5))]}}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(re.search(rb"(?i)content-length: *(\d+)", head).group(1))
+            up = self.lookup(json.loads(await reader.readexactly(length)))
+            if up is not None and self.latency:
+                await asyncio.sleep(up["latency_ms"] / 1e3)
+            status = up["status"] if up is not None else 200
+            payload = json.dumps(up["body"] if up is not None else {"results": []}).encode()
+            writer.write(f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                         f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+            await writer.drain()
+        except Exception:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, port: int = 0) -> Tuple[asyncio.AbstractServer, int]:
+        server = await asyncio.start_server(self.handle, "127.0.0.1", port, backlog=1024)
+        return server, server.sockets[0].getsockname()[1]
+
+
+def _city(rec: Dict[str, Any]) -> str:
+    req = rec["request"]
+    if rec["kind"] == "legacy":
+        bc = req.get("booking_context") or {}
+        city = bc.get("location") or bc.get("city") or bc.get("destination")
+    else:
+        city = (req.get("booking") or {}).get("location")
+    return str(city).strip().title() if city else "(none)"
+
+
+def _free_text(rec: Dict[str, Any]) -> bool:
+    return bool(rec["request"].get("nlu_prompt" if rec["kind"] == "legacy" else "nlu_query"))
+
+
+def diff(a: Any, b: Any, path: str = "") -> Iterator[Tuple[str, Any, Any]]:
+    """(path, a value, b value) for every leaf where `a` and `b` differ."""
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in sorted(set(a) | set(b), key=str):
+            yield from diff(a.get(k), b.get(k), f"{path}.{k}" if path else str(k))
+    elif isinstance(a, list) and isinstance(b, list):
+        for i in range(max(len(a), len(b))):
+            yield from diff(a[i] if i < len(a) else None, b[i] if i < len(b) else None, f"{path}[{i}]")
+    elif a != b:
+        yield path, a, b
+
+
+def _pct(xs: List[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))] if xs else float("nan")
+
+
+async def _send(client: Any, rec: Dict[str, Any]) -> Dict[str, Any]:
+    params = {"schema": (rec.get("params") or {}).get("schema", "both")}
+    t0 = time.perf_counter()
+    try:
+        r = await client.post(rec["endpoint"], json=rec["request"], params=params,
+                              headers={"Accept": "application/json"})
+        status = r.status_code
+        body = r.json() if r.headers.get("content-type", "").startswith("application/json") else None
+    except Exception as e:
+        status, body = 0, {"error": type(e).__name__}
+    return {"id": rec["id"], "status": status, "latency_ms": round((time.perf_counter() - t0) * 1e3, 2), "body": body}
+
+
+async def replay(records: List[Dict[str, Any]], client: Any, speed: float) -> Tuple[List[Dict[str, Any]], float, List[float]]:
+    """Send `records`; returns (results in capture order, wall seconds, dispatch slip per request in seconds)."""
+    t0 = time.perf_counter()
+    if speed <= 0:
+        results = [await _send(client, rec) for rec in records]
+        return results, time.perf_counter() - t0, []
+    ts0, slips = records[0]["ts"], []
+
+    async def at(rec: Dict[str, Any]) -> Dict[str, Any]:
+        due = (rec["ts"] - ts0) / speed
+        await asyncio.sleep(max(0.0, due - (time.perf_counter() - t0)))
+        slips.append(max(0.0, time.perf_counter() - t0 - due))
+        return await _send(client, rec)
+
+    results = await asyncio.gather(*(at(rec) for rec in records))
+    return list(results), time.perf_counter() - t0, slips
+
+
+def report(records: List[Dict[str, Any]], results: List[Dict[str, Any]], wall: float, slips: List[float],
+           upstream: RecordedUpstream, baseline: Optional[Dict[str, Dict[str, Any]]], ignore: List[str],
+           show: int) -> int:
+    """Print the replay summary; returns the number of responses that differ from `baseline`."""
+    n = len(records)
+    kinds = collections.Counter(r["kind"] for r in records)
+    cities = collections.Counter(_city(r) for r in records)
+    span = records[-1]["ts"] - records[0]["ts"]
+    print(f"{n} requests captured over {span:.0f} s: "
+          + ", ".join(f"{k} {c / n:.0%}" for k, c in kinds.most_common())
+          + f", free text {sum(map(_free_text, records)) / n:.0%}")
+    print("cities: " + ", ".join(f"{c} {k / n:.0%}" for c, k in cities.most_common(6)))
+    today = datetime.utcnow().date().isoformat()
+    stale = sum(1 for r in records if r.get("captured_on") != today)
+    if stale:
+        print(f"note: {stale} requests were captured before today; requests without dates now plan from today")
+
+    ok = [r["latency_ms"] for r in results if r["status"] == 200]
+    captured = [r["latency_ms"] for r in records if r.get("status") == 200]
+    print(f"throughput {len(results) / wall:.2f} req/s over {wall:.1f} s"
+          + (f", dispatch slip p95 {_pct(slips, 95) * 1e3:.0f} ms" if slips else ""))
+    print(f"{'latency ms':<12} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for label, xs in (("replay", ok), ("captured", captured)):
+        if xs:
+            print(f"{label:<12} " + " ".join(f"{_pct(xs, p):>8.0f}" for p in (50, 95, 99, 100)))
+    statuses = collections.Counter(r["status"] for r in results)
+    changed = sum(1 for rec, res in zip(records, results) if rec.get("status") != res["status"])
+    print("status: " + ", ".join(f"{s} x{c}" for s, c in sorted(statuses.items()))
+          + f" ({changed} differ from capture)")
+    print("upstream: " + ", ".join(f"{k} {upstream.stats[k]}" for k in ("exact", "by query", "by intent", "missing")))
+
+    if baseline is None:
+        return 0
+    ignored = [re.compile(p) for p in ignore]
+    paths: collections.Counter = collections.Counter()
+    examples = []
+    differing = compared = 0
+    for res in results:
+        base = baseline.get(res["id"])
+        if base is None:
+            continue
+        compared += 1
+        found = [(p, a, b) for p, a, b in diff({"status": base["status"], "body": base["body"]},
+                                                {"status": res["status"], "body": res["body"]})
+                 if not any(rx.search(p) for rx in ignored)]
+        if not found:
+            continue
+        differing += 1
+        paths.update({_INDEX_RE.sub("[]", p) for p, _, _ in found})
+        if len(examples) < show:
+            examples.append((res["id"], found))
+    print(f"diffs vs baseline: {differing} of {compared} responses differ")
+    for p, c in paths.most_common(10):
+        print(f"  {c:>5}  {p}")
+    for rid, found in examples:
+        print(f"  {rid}: " + "; ".join(f"{p}: {json.dumps(a)[:60]} -> {json.dumps(b)[:60]}" for p, a, b in found[:3])
+              + (f" (+{len(found) - 3} more)" if len(found) > 3 else ""))
+    return differing
+
+
+async def _run(args: argparse.Namespace, records: List[Dict[str, Any]]) -> int:
+    import httpx
+    upstream = RecordedUpstream(records, latency=args.upstream_latency == "recorded")
+    server, port = await upstream.serve(args.upstream_port if args.target else 0)
+    agent_app = None
+    if args.target:
+        print(f"recorded Tavily on http://127.0.0.1:{port}/search, replaying to {args.target}")
+        client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout)
+    else:
+        os.environ.update({"TAVILY_API_URL": f"http://127.0.0.1:{port}/search", "CAPTURE_ENABLED": "false"})
+        os.environ.setdefault("TAVILY_API_KEY", "replay")
+        if not args.keep_caches:
+            os.environ.update({"PLAN_CACHE_ENABLED": "false", "SEARCH_CACHE_ENABLED": "false"})
+        import app as agent_app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=agent_app.app), base_url="http://agentai",
+                                   timeout=args.timeout)
+    try:
+        async with client:
+            results, wall, slips = await replay(records, client, args.speed)
+    finally:
+        server.close()
+        if agent_app is not None and agent_app.enricher is not None:
+            agent_app.enricher.close()
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            for res in results:
+                f.write(json.dumps(res, ensure_ascii=False, separators=(",", ":")) + "\n")
+    baseline = {r["id"]: r for r in load_results(args.baseline)} if args.baseline else None
+    differing = report(records, results, wall, slips, upstream, baseline, args.ignore, args.show)
+    return 1 if differing else 0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Replay captured AgentAI traffic with recorded upstream responses")
+    ap.add_argument("capture", help="JSON lines from /debug/capture ('-' for stdin)")
+    ap.add_argument("--target", help="base URL of a running AgentAI (default: this build, in-process)")
+    ap.add_argument("--speed", type=float, default=1.0, help="multiple of the captured rate; 0 = one at a time")
+    ap.add_argument("--upstream-port", type=int, default=8765, help="stand-in Tavily port with --target")
+    ap.add_argument("--upstream-latency", choices=["recorded", "none"], default="recorded")
+    ap.add_argument("--keep-caches", action="store_true", help="leave the plan and search caches on (in-process)")
+    ap.add_argument("--limit", type=int, help="replay only the first N requests")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--save", help="write each response here (JSON lines) for a later --baseline")
+    ap.add_argument("--baseline", help="responses saved by an earlier run; exit 1 when any differ")
+    ap.add_argument("--ignore", action="append", default=["^body\\.plan_version$"],
+                    help="regex of response paths to leave out of diffs (repeatable)")
+    ap.add_argument("--show", type=int, default=5, help="differing responses to print")
+    args = ap.parse_args()
+    records = load(args.capture)[:args.limit]
+    if not records:
+        sys.exit("no captured requests")
+    sys.exit(asyncio.run(_run(args, records)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Saturation signals for autoscaling.
+
+AgentAI spends most of a request waiting on Tavily and MySQL, so CPU stays
+low while requests pile up. These gauges measure the waiting directly. They
+are read per pod by the custom-metric HPA (deploy/k8s/12-agentai-hpa.yaml):
+
+- `agentai_inflight_requests`: HTTP requests being served (the app's middleware).
+- `agentai_upstream_inflight{resource}`: outbound calls holding or waiting for a
+  scheduler slot, per resource (tavily, db, llm), refreshed at scrape time.
+- `agentai_pool_wait_seconds{pool}`: mean wait over the last
+  `SATURATION_WINDOW_SECONDS` for a worker thread (`run_blocking`, pool="threads")
+  or an outbound slot (the scheduler, pool=<resource>).
+- `agentai_event_loop_lag_seconds`: worst event-loop lag over the same window,
+  measured by `LoopLagMonitor` as how late a periodic wake-up fires.
+"""
+from typing import Any, Callable, Optional
+import asyncio
+import os
+import time
+
+import metrics
+from scheduler import POOL_WAIT, SCHEDULERS, WINDOW_SECONDS
+
+INFLIGHT_REQUESTS = metrics.gauge("agentai_inflight_requests", "HTTP requests being served")
+UPSTREAM_INFLIGHT = metrics.gauge("agentai_upstream_inflight",
+                                  "Outbound calls holding or waiting for a scheduler slot, per resource")
+LOOP_LAG = metrics.windowed("agentai_event_loop_lag_seconds", "Worst event-loop lag over the recent window",
+                            window=WINDOW_SECONDS, agg="max")
+LOOP_LAG_PROBES = metrics.histogram("agentai_event_loop_lag_probe_seconds", "Event-loop lag per probe",
+                                    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+
+def _collect_upstream() -> None:
+    for name, sch in SCHEDULERS.items():
+        snap = sch.snapshot()
+        UPSTREAM_INFLIGHT.set(sum(c["running"] + c["queued"] for c in snap.values()), resource=name)
+
+
+metrics.REGISTRY.add_collector(_collect_upstream)
+
+
+async def run_blocking(fn: Callable[..., Any], *args: Any) -> Any:
+    """`fn(*args)` on the event loop's default thread pool, recording how long it waited for a worker."""
+    submitted = time.perf_counter()
+
+    def timed() -> Any:
+        POOL_WAIT.observe(time.perf_counter() - submitted, pool="threads")
+        return fn(*args)
+
+    return await asyncio.get_event_loop().run_in_executor(None, timed)
+
+
+class LoopLagMonitor:
+    """Wakes every `interval` seconds on the event loop and records how late each wake-up is."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = float(interval)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_PROBES.observe(lag)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def loop_lag_monitor_from_env() -> Optional[LoopLagMonitor]:
+    if os.getenv("LOOP_LAG_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return LoopLagMonitor(interval=float(os.getenv("LOOP_LAG_INTERVAL_MS", "250")) / 1000.0)
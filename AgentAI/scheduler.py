@@ -0,0 +1,213 @@
+"""Priority scheduler for outbound work (Tavily, MySQL, LLM).
+
+Every outbound call takes a slot from its resource's scheduler:
+
+    async with SCHEDULERS["tavily"].slot():
+        ...
+
+The caller's class comes from the `PRIORITY` context variable ("interactive"
+by default; the precompute consumer and background loops set "background").
+Each resource has a total concurrency limit, per-class concurrency caps and
+bounded per-class queues. Free slots go to waiting classes by weighted fair
+queuing (smallest virtual time first, advanced by 1/weight per grant). When the
+resource's total queue is full, background waiters are shed first to make room
+for interactive work. A caller may pass a deadline: a call that would have to
+queue past it is rejected instead of running too late to be used. Queue wait
+per class is exported as a histogram.
+"""
+from typing import Deque, Dict, Optional, Tuple
+import asyncio
+import collections
+import contextlib
+import contextvars
+import os
+import time
+
+import metrics
+
+PRIORITY: contextvars.ContextVar = contextvars.ContextVar("agentai_priority", default="interactive")
+
+QUEUE_WAIT = metrics.histogram("agentai_scheduler_queue_wait_seconds", "Time spent waiting for an outbound slot",
+                               buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+IN_FLIGHT = metrics.gauge("agentai_scheduler_in_flight", "Outbound calls holding a slot")
+QUEUED = metrics.gauge("agentai_scheduler_queued", "Outbound calls waiting for a slot")
+SHED = metrics.counter("agentai_scheduler_shed_total", "Outbound calls rejected or shed because the queue was full")
+# Recent mean wait as a level for autoscaling (saturation.py); threads record here too
+WINDOW_SECONDS = float(os.getenv("SATURATION_WINDOW_SECONDS", "30"))
+POOL_WAIT = metrics.windowed("agentai_pool_wait_seconds", "Mean wait for a worker thread or outbound slot over the "
+                             "recent window", window=WINDOW_SECONDS)
+
+
+class SchedulerRejected(RuntimeError):
+    """Raised when a call is shed instead of being queued."""
+
+
+class ClassConfig:
+    def __init__(self, weight: float, max_concurrency: int, max_queue: int):
+        self.weight = float(weight)
+        self.max_concurrency = int(max_concurrency)
+        self.max_queue = int(max_queue)
+
+
+class _ClassState:
+    def __init__(self, cfg: ClassConfig):
+        self.cfg = cfg
+        self.waiters: Deque[asyncio.Future] = collections.deque()
+        self.running = 0
+        self.vtime = 0.0
+
+
+class PriorityScheduler:
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, classes: Dict[str, ClassConfig],
+                 default_class: str = "interactive"):
+        self.name = name
+        self.max_concurrency = int(max_concurrency)
+        self.max_queue = int(max_queue)
+        self.default_class = default_class
+        self._classes = {k: _ClassState(v) for k, v in classes.items()}
+        # Lowest weight is shed first
+        self._shed_order = sorted(self._classes, key=lambda k: self._classes[k].cfg.weight)
+        self._running = 0
+        self._queued = 0
+        self._vclock = 0.0
+
+    def _state(self, priority: Optional[str]) -> Tuple[str, _ClassState]:
+        p = priority or PRIORITY.get()
+        if p not in self._classes:
+            p = self.default_class
+        return p, self._classes[p]
+
+    def _can_run(self, st: _ClassState) -> bool:
+        return self._running < self.max_concurrency and st.running < st.cfg.max_concurrency
+
+    def _grant(self, st: _ClassState) -> None:
+        self._running += 1
+        st.running += 1
+        start = max(st.vtime, self._vclock)
+        self._vclock = start
+        st.vtime = start + 1.0 / st.cfg.weight
+
+    def _dispatch(self) -> None:
+        while self._running < self.max_concurrency:
+            ready = [s for s in self._classes.values() if s.waiters and s.running < s.cfg.max_concurrency]
+            if not ready:
+                return
+            st = min(ready, key=lambda s: max(s.vtime, self._vclock))
+            fut = st.waiters.popleft()
+            self._queued -= 1
+            if fut.done():
+                continue
+            self._grant(st)
+            fut.set_result(True)
+
+    def _admit(self, cls: str, st: _ClassState) -> bool:
+        """Decide whether a new waiter may queue, shedding lower-priority waiters if needed."""
+        if len(st.waiters) >= st.cfg.max_queue:
+            return False
+        if self._queued < self.max_queue:
+            return True
+        for other in self._shed_order:
+            ost = self._classes[other]
+            if ost.cfg.weight >= st.cfg.weight:
+                break
+            if ost.waiters:
+                victim = ost.waiters.pop()
+                self._queued -= 1
+                if not victim.done():
+                    victim.set_exception(SchedulerRejected(f"{self.name}: shed {other} work"))
+                SHED.inc(resource=self.name, **{"class": other})
+                return True
+        return False
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Optional[str] = None, deadline: Optional[float] = None):
+        """Hold a slot for the block. `deadline` (a `time.monotonic()` value) bounds the queue wait: past it,
+        the call is rejected rather than queued, and a queued call is shed."""
+        cls, st = self._state(priority)
+        t0 = time.perf_counter()
+        if not st.waiters and self._can_run(st):
+            self._grant(st)
+        else:
+            timeout = deadline - time.monotonic() if deadline is not None else None
+            if timeout is not None and timeout <= 0:
+                SHED.inc(resource=self.name, **{"class": cls})
+                raise SchedulerRejected(f"{self.name}: {cls} deadline passed")
+            if not self._admit(cls, st):
+                SHED.inc(resource=self.name, **{"class": cls})
+                raise SchedulerRejected(f"{self.name}: {cls} queue full")
+            fut = asyncio.get_event_loop().create_future()
+            st.waiters.append(fut)
+            self._queued += 1
+            QUEUED.inc(resource=self.name, **{"class": cls})
+            try:
+                await asyncio.wait({fut}, timeout=timeout)
+                if not fut.done():
+                    st.waiters.remove(fut)
+                    self._queued -= 1
+                    fut.cancel()
+                    SHED.inc(resource=self.name, **{"class": cls})
+                    raise SchedulerRejected(f"{self.name}: {cls} deadline passed while queued")
+                fut.result()
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled() and fut.exception() is None:
+                    # Granted just as we were cancelled: hand the slot back
+                    self._release(st)
+                elif fut in st.waiters:
+                    st.waiters.remove(fut)
+                    self._queued -= 1
+                raise
+            finally:
+                QUEUED.dec(resource=self.name, **{"class": cls})
+        waited = time.perf_counter() - t0
+        QUEUE_WAIT.observe(waited, resource=self.name, **{"class": cls})
+        POOL_WAIT.observe(waited, pool=self.name)
+        IN_FLIGHT.inc(resource=self.name, **{"class": cls})
+        try:
+            yield
+        finally:
+            IN_FLIGHT.dec(resource=self.name, **{"class": cls})
+            self._release(st)
+
+    def _release(self, st: _ClassState) -> None:
+        self._running -= 1
+        st.running -= 1
+        self._dispatch()
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        return {k: {"running": s.running, "queued": len(s.waiters)} for k, s in self._classes.items()}
+
+
+def _from_env(resource: str, default_concurrency: int) -> PriorityScheduler:
+    prefix = f"SCHED_{resource.upper()}_"
+    total = int(os.getenv(prefix + "CONCURRENCY", str(default_concurrency)))
+    queue = int(os.getenv(prefix + "QUEUE", str(total * 8)))
+    classes = {
+        "interactive": ClassConfig(
+            weight=float(os.getenv("SCHED_INTERACTIVE_WEIGHT", "8")),
+            max_concurrency=total,
+            max_queue=queue,
+        ),
+        "background": ClassConfig(
+            weight=float(os.getenv("SCHED_BACKGROUND_WEIGHT", "1")),
+            max_concurrency=int(os.getenv(prefix + "BACKGROUND_CONCURRENCY", str(max(1, total // 4)))),
+            max_queue=int(os.getenv(prefix + "BACKGROUND_QUEUE", str(max(1, queue // 4)))),
+        ),
+    }
+    return PriorityScheduler(resource, total, queue, classes)
+
+
+SCHEDULERS: Dict[str, PriorityScheduler] = {
+    "tavily": _from_env("tavily", 8),
+    "db": _from_env("db", 10),
+    "llm": _from_env("llm", 2),
+}
+
+
+@contextlib.contextmanager
+def background():
+    """Mark work started inside this block (and tasks it spawns) as background priority."""
+    token = PRIORITY.set("background")
+    try:
+        yield
+    finally:
+        PRIORITY.reset(token)
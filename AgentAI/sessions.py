@@ -0,0 +1,151 @@
+"""Plan sessions: keep a plan's fetched context and re-run only what an edit affects.
+
+A session remembers the normalized request its plan was built from and the
+output of each expensive pipeline stage (searches, ranked activities,
+schedule, properties). An edit is a partial request (a delta) merged into the
+stored one. The fields that changed are diffed, and `STAGE_INPUTS` says which
+stages read them. Those stages, and every stage downstream of them, are
+invalidated; the rest are reused as they are. Cheap steps (restaurant ranking,
+packing, notes, the legacy shapes) always run.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+import asyncio
+import os
+import secrets
+import threading
+import time
+
+# Stage -> request fields (dotted paths) or upstream stages it reads, in pipeline order
+STAGE_INPUTS: Dict[str, Sequence[str]] = {
+    "weather": ("booking.location", "context.weather", "context_overrides"),
+    "events": ("booking.location", "context.events", "context_overrides"),
+    "pois": ("booking.location", "context.pois", "context_overrides"),
+    "restaurants": ("booking.location", "preferences.dietary"),
+    # Restaurants too: venue dedup (dedup.py) runs over events, POIs and restaurants together and keeps one record
+    # per venue, in the list of its best-sourced copy. A venue found by both searches (a food hall, a market) can
+    # move between the activity and restaurant lists when the restaurant results change
+    "activities": ("events", "pois", "restaurants", "booking.location", "booking.party_type", "booking.children_ages",
+                   "preferences.budget", "preferences.interests", "preferences.mobility_needs", "nlu_query"),
+    # The cursor only picks a page of the stored schedule, so paging does not reschedule
+    "itinerary": ("activities", "booking.start_date", "booking.end_date", "preferences.mobility_needs"),
+    "properties": ("activities", "booking.location"),
+}
+
+
+def _flatten(value: Any, prefix: str = "") -> Dict[str, Any]:
+    """Leaf values by dotted path; lists are leaves."""
+    if isinstance(value, dict) and value:
+        out: Dict[str, Any] = {}
+        for k, v in value.items():
+            out.update(_flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+        return out
+    return {prefix: value}
+
+
+def changed_fields(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    a, b = _flatten(old), _flatten(new)
+    return sorted(k for k in a.keys() | b.keys() if a.get(k) != b.get(k))
+
+
+def _reads(field: str, changed: str) -> bool:
+    return changed == field or changed.startswith(field + ".") or field.startswith(changed + ".")
+
+
+def affected_stages(changed: Sequence[str]) -> List[str]:
+    """Stages that read any changed field, directly or through an upstream stage, in pipeline order."""
+    dirty: List[str] = []
+    for stage, inputs in STAGE_INPUTS.items():
+        if any(i in dirty for i in inputs) or any(_reads(i, c) for i in inputs if i not in STAGE_INPUTS for c in changed):
+            dirty.append(stage)
+    return dirty
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Deep-merge `delta` into a copy of `base`; nested objects merge, anything else (null included) replaces."""
+    out = dict(base)
+    for k, v in delta.items():
+        out[k] = apply_delta(out[k], v) if isinstance(v, dict) and isinstance(out.get(k), dict) else v
+    return out
+
+
+class PlanSession:
+    __slots__ = ("id", "inputs", "stages", "response", "full_ms", "edits", "last", "lock", "expires_at")
+
+    def __init__(self, session_id: str, ttl_seconds: float):
+        self.id = session_id
+        self.inputs: Optional[Dict[str, Any]] = None  # normalized request of the current plan
+        self.stages: Dict[str, Any] = {}  # stage name -> output
+        self.response: Optional[Dict[str, Any]] = None
+        self.full_ms: Optional[float] = None
+        self.edits = 0
+        self.last: Dict[str, Any] = {}
+        self.lock = asyncio.Lock()  # one plan at a time per session
+        self.expires_at = time.time() + ttl_seconds
+
+    def begin(self, inputs: Dict[str, Any]) -> None:
+        """Diff `inputs` against the current plan's and drop the stage outputs they invalidate."""
+        if self.inputs is None:
+            changed, dirty = [], list(STAGE_INPUTS)
+        else:
+            changed = changed_fields(self.inputs, inputs)
+            dirty = affected_stages(changed)
+        for stage in dirty:
+            self.stages.pop(stage, None)
+        self.inputs = inputs
+        self.last = {"changed": changed, "recomputed": [s for s in STAGE_INPUTS if s not in self.stages],
+                     "reused": [s for s in STAGE_INPUTS if s in self.stages]}
+
+
+class SessionStore:
+    """Bounded in-process sessions, least recently used evicted first, idle ones expire after `ttl_seconds`."""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, PlanSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "expired": 0, "evicted": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self) -> PlanSession:
+        session = PlanSession(secrets.token_urlsafe(16), self.ttl_seconds)
+        with self._lock:
+            self._sessions[session.id] = session
+            self.stats["created"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[PlanSession]:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if session.expires_at < now:
+                del self._sessions[session_id]
+                self.stats["expired"] += 1
+                return None
+            session.expires_at = now + self.ttl_seconds
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def drop(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"size": len(self._sessions), "max": self.max_sessions, "ttl_seconds": self.ttl_seconds, **self.stats}
+
+
+def session_store_from_env() -> Optional[SessionStore]:
+    if os.getenv("PLAN_SESSIONS_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return SessionStore(
+        max_sessions=int(os.getenv("PLAN_SESSION_MAX", "1000")),
+        ttl_seconds=float(os.getenv("PLAN_SESSION_TTL_SECONDS", "1800")),
+    )
@@ -0,0 +1,168 @@
+"""Grid spatial index for nearest-listing and within-radius queries.
+
+Points are bucketed into fixed cells of `cell_km` on a side (a geohash-style
+grid keyed by integer cell coordinates, so no string encoding is needed and a
+point moves between cells with one dict update). Longitude cells are the same
+width in degrees everywhere, so the scan widens by 1/cos(latitude) to cover
+the same distance.
+
+- `within` scans the cells overlapping the search circle.
+- `nearest` scans rings of cells outward from the query point. It stops once
+  the ring covers the distance band of the k-th result found so far, so the
+  answer is exact.
+- `nearest_to` ranks by mean distance to several points (one day's
+  activities). The distance to their centroid is a lower bound on that mean,
+  so the same ring search around the centroid is exact.
+
+Results are ranked by distance and then price: listings in the same
+`band_km` distance band are ordered cheapest first.
+"""
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+import math
+
+EARTH_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_KM / 180.0
+
+# (lat, lng, price, key)
+Point = Tuple[float, float, float, Hashable]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def centroid(points: Sequence[Tuple[float, float]]) -> Tuple[float, float]:
+    """Mean of 3-D unit vectors, so points either side of the antimeridian average correctly."""
+    x = y = z = 0.0
+    for lat, lng in points:
+        p, l = math.radians(lat), math.radians(lng)
+        x += math.cos(p) * math.cos(l)
+        y += math.cos(p) * math.sin(l)
+        z += math.sin(p)
+    return math.degrees(math.atan2(z, math.hypot(x, y))), math.degrees(math.atan2(y, x))
+
+
+class SpatialIndex:
+    def __init__(self, cell_km: float = 2.0, band_km: float = 0.5):
+        self.cell_deg = cell_km / KM_PER_DEG
+        self.cell_km = cell_km
+        self.band_km = band_km
+        self._cells: Dict[Tuple[int, int], Dict[Hashable, Point]] = {}
+        self._where: Dict[Hashable, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    # -- mutation --------------------------------------------------------
+    def add(self, key: Hashable, lat: float, lng: float, price: float = 0.0) -> None:
+        self.remove(key)
+        cell = self._cell(lat, lng)
+        self._cells.setdefault(cell, {})[key] = (lat, lng, price, key)
+        self._where[key] = cell
+
+    def remove(self, key: Hashable) -> None:
+        cell = self._where.pop(key, None)
+        if cell is None:
+            return
+        bucket = self._cells[cell]
+        bucket.pop(key, None)
+        if not bucket:
+            del self._cells[cell]
+
+    # -- queries ---------------------------------------------------------
+    def _lng_cells(self, lat: float, rings: int) -> int:
+        # Widen the longitude span by 1/cos(lat); near the poles the whole row is scanned
+        c = math.cos(math.radians(min(89.0, abs(lat) + (rings + 1) * self.cell_deg)))
+        return min(int(math.ceil(rings / max(c, 1e-6))), int(360 / self.cell_deg) + 1)
+
+    def _ring(self, ci: int, cj: int, r: int, lat: float) -> Iterator[Dict[Hashable, Point]]:
+        """Buckets whose cell is exactly `r` cells (in latitude, scaled in longitude) from (ci, cj)."""
+        w, w_in = self._lng_cells(lat, r), (self._lng_cells(lat, r - 1) if r else -1)
+        cells = self._cells
+        for i in range(ci - r, ci + r + 1):
+            inner_row = abs(i - ci) < r
+            for j in range(cj - w, cj + w + 1):
+                if inner_row and abs(j - cj) <= w_in:
+                    continue
+                bucket = cells.get((i, j))
+                if bucket:
+                    yield bucket
+
+    def _band(self, dist: float) -> int:
+        return int(dist / self.band_km) if self.band_km > 0 else 0
+
+    def _rank(self, scored: List[Tuple[float, Point]], limit: Optional[int]) -> List[Tuple[float, Point]]:
+        scored.sort(key=lambda s: (self._band(s[0]), s[1][2], s[0]))
+        return scored if limit is None else scored[:limit]
+
+    def _too_wide(self, lat: float, r: int) -> bool:
+        """True when ring `r` spans more cells than are occupied; a plain scan is cheaper from there on."""
+        return (2 * r + 1) * (2 * self._lng_cells(lat, r) + 1) > 4 * len(self._cells)
+
+    def _scan(self, points: Sequence[Tuple[float, float]], max_km: Optional[float]) -> List[Tuple[float, Point]]:
+        scored = []
+        for bucket in self._cells.values():
+            for p in bucket.values():
+                d = sum(haversine_km(a, b, p[0], p[1]) for a, b in points) / len(points)
+                if max_km is None or d <= max_km:
+                    scored.append((d, p))
+        return scored
+
+    def within(self, lat: float, lng: float, radius_km: float, limit: Optional[int] = None) -> List[Tuple[float, Point]]:
+        """[(distance_km, point)] within `radius_km` of (lat, lng), by distance band then price."""
+        ci, cj = self._cell(lat, lng)
+        rings = int(math.ceil(radius_km / self.cell_km))
+        if self._too_wide(lat, rings):
+            return self._rank(self._scan([(lat, lng)], radius_km), limit)
+        scored = []
+        for r in range(rings + 1):
+            for bucket in self._ring(ci, cj, r, lat):
+                for p in bucket.values():
+                    d = haversine_km(lat, lng, p[0], p[1])
+                    if d <= radius_km:
+                        scored.append((d, p))
+        return self._rank(scored, limit)
+
+    def nearest(self, lat: float, lng: float, k: int, max_km: Optional[float] = None) -> List[Tuple[float, Point]]:
+        """The `k` nearest points (optionally within `max_km`), by distance band then price."""
+        return self.nearest_to([(lat, lng)], k, max_km)
+
+    def nearest_to(self, points: Sequence[Tuple[float, float]], k: int,
+                   max_km: Optional[float] = None) -> List[Tuple[float, Point]]:
+        """The `k` points with the smallest mean distance to `points`, by distance band then price."""
+        if not points or k <= 0 or not self._where:
+            return []
+        clat, clng = centroid(points) if len(points) > 1 else points[0]
+        ci, cj = self._cell(clat, clng)
+        max_rings = int(math.ceil(max_km / self.cell_km)) if max_km is not None else int(180 / self.cell_deg) + 1
+        scored: List[Tuple[float, Point]] = []
+        seen = 0
+        for r in range(max_rings + 1):
+            if self._too_wide(clat, r):
+                # Sparse neighbourhood: rings are mostly empty cells, so score every point instead
+                return self._rank(self._scan(points, max_km), k)
+            for bucket in self._ring(ci, cj, r, clat):
+                for p in bucket.values():
+                    d = sum(haversine_km(a, b, p[0], p[1]) for a, b in points) / len(points)
+                    if max_km is None or d <= max_km:
+                        scored.append((d, p))
+                    seen += 1
+            if len(scored) >= k:
+                # Everything unscanned is at least r cells from the centroid; stop once that clears the band of
+                # the k-th best, so nothing outside could still rank ahead of it
+                kth = sorted(s[0] for s in scored)[k - 1]
+                if r * self.cell_km >= (self._band(kth) + 1) * self.band_km:
+                    break
+            if seen >= len(self._where):
+                break
+        return self._rank(scored, k)
+
+    def snapshot(self) -> Dict[str, Any]:
+        sizes = [len(b) for b in self._cells.values()]
+        return {"points": len(self._where), "cells": len(sizes), "cell_km": self.cell_km,
+                "max_cell": max(sizes) if sizes else 0}
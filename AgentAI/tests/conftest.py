@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# Tests run offline from the AgentAI folder: no live search, plans come from the fallback catalogs
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.pop("TAVILY_API_KEY", None)
+
+
+VENUES = [
+    {"title": "Exploratorium science museum", "url": "https://example.com/exploratorium",
+     "content": "Hands-on science museum in San Francisco. Open daily 10am-5pm. Tickets $40."},
+    {"title": "Golden Gate Park", "url": "https://example.com/ggp",
+     "content": "San Francisco's largest park, stroller friendly paths and gardens."},
+    {"title": "Ferry Building farmers market festival", "url": "https://example.com/festival",
+     "content": "Weekend festival and market at the Ferry Building, San Francisco."},
+    {"title": "Greens vegan restaurant", "url": "https://example.com/greens",
+     "content": "Vegan and vegetarian restaurant in San Francisco. Mains $25."},
+]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Tavily stand-in returning the VENUES each query asks about; records the queries made."""
+    import app as agent_app
+    from ingest import ingest
+    from query_planner import classify
+
+    queries = []
+
+    async def search(query, max_results=5, location=None, local=None, depth="advanced", deadline=None):
+        queries.append(query)
+        if "weather" in query:
+            items = [{"title": "San Francisco weather", "url": "https://example.com/weather", "content": "Mild, 18C."}]
+        else:
+            wanted = {"restaurants": "restaurants" in query, "events": "events" in query, "pois": "attractions" in query}
+            items = [v for v in VENUES if wanted[classify(v["title"], v["content"])]]
+        return ingest(items, agent_app._city_aliases(location))
+
+    monkeypatch.setenv("TAVILY_API_KEY", "test")
+    monkeypatch.setattr(agent_app, "_tavily_search", search)
+    # Every search must reach the stand-in, not the process-wide search cache
+    monkeypatch.setattr(agent_app.query_planner, "cache", None)
+    return queries
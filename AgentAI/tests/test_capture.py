@@ -0,0 +1,17 @@
+"""Capture scrubbing of parsed requests."""
+from capture import REDACTED, scrub_request
+
+
+def test_legacy_request_keeps_planner_keys_and_redacts_the_rest():
+    request = {
+        "booking_context": {"location": "Seattle", "guest_name": "Ada Lovelace", "dates": "2026-05-01 2026-05-04"},
+        "preferences": {"budget": "low", "loyalty_id": "X1"},
+        "local_context": {"user": {"email": "ada@example.com", "name": "Ada"}, "cart": [1, 2]},
+        "nlu_prompt": "call me on +1 415 555 0100 or ada@example.com",
+    }
+    out = scrub_request("legacy", request)
+    assert out["booking_context"] == {"location": "Seattle", "guest_name": REDACTED, "dates": "2026-05-01 2026-05-04"}
+    assert out["preferences"] == {"budget": "low", "loyalty_id": REDACTED}
+    assert out["local_context"] == REDACTED
+    assert out["nlu_prompt"] == "call me on <phone> or <email>"
+    assert request["local_context"]["user"]["name"] == "Ada"  # the parsed request is not modified
@@ -0,0 +1,176 @@
+"""Precompute consumer against the in-memory broker stand-in."""
+import asyncio
+
+import pytest
+
+import app as agent_app
+from consumer import CREATED_TOPIC, STATUS_TOPIC, InMemoryBroker, PrecomputeConsumer, build_agent_input
+from plan_store import InMemoryPlanStore
+
+BOOKING = {"booking_id": 7, "property_id": 3, "location": "San Francisco", "check_in_date": "2026-05-01",
+           "check_out_date": "2026-05-03", "number_of_guests": 2, "status": "pending"}
+
+
+class FakePlanner:
+    """Records precompute calls; each takes `delay` seconds so events can overlap."""
+
+    def __init__(self, delay=0.05, fail=0):
+        self.calls = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, payload, origin="interactive", booking_ref=None):
+        self.calls.append((payload, origin, booking_ref))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("upstream down")
+        return {}
+
+
+def _consumer(broker, plan_fn, **kw):
+    return PrecomputeConsumer(broker.consumer([CREATED_TOPIC, STATUS_TOPIC], "test"), plan_fn, **kw)
+
+
+async def _drain(pc):
+    while await pc.run_once(max_records=50, timeout_ms=0):
+        pass
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # A fresh web replica: no in-process plan cache, so reuse can only come from the shared store
+    store = InMemoryPlanStore()
+    monkeypatch.setattr(agent_app, "plan_store", store)
+    monkeypatch.setattr(agent_app, "plan_cache", None)
+    return store
+
+
+def test_created_and_confirmed_in_flight_together_compute_once():
+    broker = InMemoryBroker()
+    broker.produce(CREATED_TOPIC, BOOKING)
+    broker.produce(STATUS_TOPIC, {**BOOKING, "status": "confirmed"})
+    planner = FakePlanner()
+    asyncio.run(_drain(_consumer(broker, planner, concurrency=4)))
+    assert len(planner.calls) == 1
+    payload, origin, booking_ref = planner.calls[0]
+    assert (payload.booking.location, origin, booking_ref) == ("San Francisco", "precompute", "7")
+
+
+def test_failed_precompute_lets_the_next_event_retry():
+    broker = InMemoryBroker()
+    broker.produce(CREATED_TOPIC, BOOKING)
+    planner = FakePlanner(fail=1)
+    pc = _consumer(broker, planner)
+    asyncio.run(_drain(pc))
+    broker.produce(STATUS_TOPIC, {**BOOKING, "status": "accepted"})
+    asyncio.run(_drain(pc))
+    assert len(planner.calls) == 2
+
+
+def test_unconfirmed_status_events_are_ignored():
+    broker = InMemoryBroker()
+    broker.produce(STATUS_TOPIC, {**BOOKING, "status": "cancelled"})
+    planner = FakePlanner()
+    asyncio.run(_drain(_consumer(broker, planner)))
+    assert planner.calls == []
+
+
+def test_lookup_fills_fields_missing_from_the_event():
+    looked_up = []
+
+    def lookup(booking_id=None, property_id=None):
+        looked_up.append(booking_id)
+        return {"city": "Seattle", "check_in_date": "2026-06-10", "check_out_date": "2026-06-12", "number_of_guests": 3}
+
+    payload, booking_id = build_agent_input({"booking_id": 11, "status": "pending"}, lookup)
+    assert looked_up == [11] and booking_id == 11
+    assert (payload.booking.location, payload.booking.start_date, payload.booking.end_date,
+            payload.booking.party_size) == ("Seattle", "2026-06-10", "2026-06-12", 3)
+    assert build_agent_input({"booking_id": 12}, lambda **kw: None)[0] is None
+
+
+def _precompute(store, *bookings):
+    broker = InMemoryBroker()
+    for b in bookings:
+        broker.produce(CREATED_TOPIC, b)
+    asyncio.run(_drain(_consumer(broker, agent_app._plan, store=store)))
+
+
+def _frontend(booking_context, prompt="2-day family trip ideas; stroller and wheelchair accessible"):
+    # Shape of the body Frontend/src/components/AgentAIModal.jsx sends
+    return agent_app.AgentLegacyInput(booking_context=booking_context, preferences={}, local_context={},
+                                      nlu_prompt=prompt)
+
+
+def test_frontend_request_for_a_booking_plans_from_its_precomputed_context(store, upstream):
+    _precompute(store, BOOKING)
+    assert upstream
+    upstream.clear()
+
+    resp = asyncio.run(agent_app._plan(_frontend({"booking_id": 7})))
+    assert upstream == []
+    assert resp["debug"]["precompute"] == {"key": "booking:7", "stages": ["weather", "events", "pois", "restaurants"]}
+    # Dates and city come from the booking, not today's date
+    assert resp["debug"]["date_range"]["start"] == "2026-05-01" and resp["debug"]["date_range"]["end"] == "2026-05-03"
+    assert resp["debug"]["location_filter"]["location"] == "San Francisco"
+    assert {a["title"] for a in resp["activities"]} >= {"Exploratorium science museum", "Golden Gate Park"}
+    assert [r["name"] for r in resp["restaurants"]] == ["Greens vegan restaurant"]
+    assert store.stats() == {"stored": 1, "hit": 1}
+
+
+def test_property_and_stay_dates_find_the_context_too(store, upstream):
+    _precompute(store, BOOKING)
+    upstream.clear()
+    resp = asyncio.run(agent_app._plan(_frontend({"property_id": 3, "check_in": "2026-05-01", "check_out": "2026-05-03"})))
+    assert resp["debug"]["precompute"]["key"] == "property:3:2026-05-01:2026-05-03"
+    assert upstream == []
+
+
+def test_preferences_rerank_the_precomputed_context(store, upstream):
+    _precompute(store, BOOKING)
+    upstream.clear()
+    body = agent_app.AgentLegacyInput(booking_context={"booking_id": 7}, local_context={}, nlu_prompt="museums",
+                                      preferences={"interests": ["museum"], "dietary": {"vegan": True}})
+    resp = asyncio.run(agent_app._plan(body))
+    # The restaurant search was made without a diet filter, so only that stage is searched again
+    assert resp["debug"]["precompute"]["stages"] == ["weather", "events", "pois"]
+    assert len(upstream) == 1 and "vegan" in upstream[0]
+    assert resp["activities"][0]["title"] == "Exploratorium science museum"
+
+
+def test_unknown_booking_plans_from_scratch(store, upstream):
+    _precompute(store, BOOKING)
+    upstream.clear()
+    resp = asyncio.run(agent_app._plan(_frontend({"booking_id": 99, "location": "San Francisco"})))
+    assert "precompute" not in resp["debug"]
+    assert upstream
+
+
+def test_bookings_sharing_city_and_dates_are_precomputed_separately():
+    broker = InMemoryBroker()
+    broker.produce(CREATED_TOPIC, BOOKING)
+    broker.produce(CREATED_TOPIC, {**BOOKING, "booking_id": 8})
+    planner = FakePlanner()
+    asyncio.run(_drain(_consumer(broker, planner)))
+    assert sorted(c[2] for c in planner.calls) == ["7", "8"]
+
+
+def test_report_tracks_lag_and_hit_rate(store):
+    broker = InMemoryBroker()
+    for i in range(3):
+        broker.produce(CREATED_TOPIC, {**BOOKING, "booking_id": i, "check_in_date": f"2026-05-0{i + 1}"})
+    broker.produce(STATUS_TOPIC, {**BOOKING, "booking_id": 0, "check_in_date": "2026-05-01", "status": "confirmed"})
+    pc = _consumer(broker, agent_app._plan, store=store)
+
+    before = asyncio.run(pc.report())
+    assert before["lag"] == {f"{CREATED_TOPIC}[0]": 3, f"{STATUS_TOPIC}[0]": 1}
+    assert (before["stored"], before["hit_rate"]) == (0, 0.0)
+
+    asyncio.run(_drain(pc))
+    after = asyncio.run(pc.report())
+    assert after["lag"] == {f"{CREATED_TOPIC}[0]": 0, f"{STATUS_TOPIC}[0]": 0}
+    assert (after["stored"], after["hit_rate"]) == (3, 0.0)
+
+    asyncio.run(agent_app._plan(_frontend({"booking_id": 1})))
+    assert asyncio.run(pc.report())["hit_rate"] == round(1 / 3, 4)
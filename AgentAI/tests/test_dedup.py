@@ -0,0 +1,39 @@
+"""Dedup annotates and fills copies: cached search results and the city index are shared across plans."""
+from dedup import VenueDeduper
+from ingest import SearchResult
+
+VENUE = {"wheelchair": None, "stroller": None, "kid": None, "dietary": []}
+
+
+def _record(title, url, address=None):
+    r = SearchResult(title, url, "A hands-on science museum.", None, VENUE, True)
+    r.address = address
+    return r
+
+
+def test_dedupe_leaves_input_records_and_index_entries_untouched():
+    dedup = VenueDeduper()
+    site = _record("Exploratorium", "https://www.exploratorium.edu/")
+    listing = _record("Exploratorium | Tripadvisor", "https://tripadvisor.com/x", address="Pier 15")
+    [[kept]], _ = dedup.dedupe([[site, listing]], "San Francisco")
+
+    assert kept.address == "Pier 15" and kept.canonical_title == "Exploratorium"
+    assert kept is not site and site.address is None and site.canonical_title is None
+    assert listing.canonical_title is None
+
+    # A later plan's better-sourced record is filled from a copy of the index entry
+    again = _record("The Exploratorium", "https://www.exploratorium.edu/visit", address=None)
+    [[later]], info = dedup.dedupe([[again]], "San Francisco")
+    assert info["matched"] == 1
+    assert later.address == "Pier 15" and later.canonical_title == "Exploratorium"
+    assert again.address is None and again.canonical_title is None
+    later.address = "changed by a later stage"
+    [[third]], _ = dedup.dedupe([[_record("Exploratorium", "https://www.exploratorium.edu/")]], "San Francisco")
+    assert third.address == "Pier 15"
+
+
+def test_canonical_title_is_part_of_the_versioned_payload():
+    r = _record("Exploratorium | Official Site", "https://www.exploratorium.edu/")
+    before = r.as_dict()
+    r.canonical_title = "Exploratorium"
+    assert r.as_dict() != before
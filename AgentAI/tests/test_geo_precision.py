@@ -0,0 +1,29 @@
+"""City-centroid geocodes are carried with their precision and never used as a venue location."""
+from datetime import date
+
+import app as agent_app
+from enrichment import extract
+from itinerary import schedule_trip
+
+
+def test_centroid_fallback_is_marked_city_precision():
+    fields = extract("Some Cafe", "A cosy spot with great coffee.", "san francisco")
+    assert fields["geo"] is not None and fields["geo_precision"] == "city"
+
+
+def _act(i, lat, lng, precision):
+    return {"id": f"a{i}", "title": f"A{i}", "duration_minutes": 60,
+            "geo": {"lat": lat, "lng": lng, "precision": precision}}
+
+
+def test_city_precision_legs_are_unknown():
+    acts = [_act(0, 37.7749, -122.4194, "city"), _act(1, 37.7749, -122.4194, "city")]
+    sched = schedule_trip(acts, date(2026, 5, 1), 1)
+    modes = [slot["mode"] for day in sched.days for block in day for slot in block["slots"] if slot["mode"] != "start"]
+    assert modes == ["unknown"]
+
+
+def test_city_precision_is_not_a_proximity_anchor():
+    geos = [agent_app.Geo(lat=37.77, lng=-122.41, precision="city"), agent_app.Geo(lat=0.0, lng=0.0),
+            agent_app.Geo(lat=37.80, lng=-122.40, precision="place")]
+    assert [agent_app._located(g) for g in geos] == [False, False, True]
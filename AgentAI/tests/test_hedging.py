@@ -0,0 +1,74 @@
+"""Hedge delays come from the latency window of the call's own key."""
+import asyncio
+
+from hedging import Hedger
+
+
+def test_delay_is_tracked_per_key():
+    h = Hedger("test", quantile=0.5, min_delay=0.0, min_samples=3)
+
+    async def call(seconds):
+        await asyncio.sleep(seconds)
+        return ["ok"]
+
+    async def main():
+        for _ in range(3):
+            await h.run(lambda: call(0.001), lambda: call(0), key=("basic", "<=5"))
+            await h.run(lambda: call(0.05), lambda: call(0), key=("advanced", "<=10"))
+
+    asyncio.run(main())
+    assert h.delay(("basic", "<=5")) < 0.02 < h.delay(("advanced", "<=10"))
+    assert h.delay(("advanced", ">10")) is None
+    assert set(h.snapshot()["keys"]) == {"basic/<=5", "advanced/<=10", "advanced/>10"}
+
+
+def test_slow_key_does_not_trigger_hedges_on_fast_key():
+    h = Hedger("test", quantile=0.95, min_delay=0.0, min_samples=3, max_rate=1.0)
+    backups = []
+
+    async def primary(seconds):
+        await asyncio.sleep(seconds)
+        return ["primary"]
+
+    async def backup():
+        backups.append(1)
+        return ["backup"]
+
+    async def main():
+        for _ in range(3):
+            await h.run(lambda: primary(0.03), backup, key="slow")
+        # A 30 ms call is normal for "slow"; with one shared window it would not be hedged on "fast" either
+        for _ in range(3):
+            await h.run(lambda: primary(0.001), backup, key="fast")
+        return await h.run(lambda: primary(0.03), backup, key="fast")
+
+    assert asyncio.run(main()) == (["backup"], "backup")
+    assert len(backups) == 1
+
+
+def test_shed_and_failed_primaries_are_not_recorded():
+    h = Hedger("test", quantile=0.5, min_delay=0.0, min_samples=1)
+
+    async def shed():
+        return []
+
+    async def failed():
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        await asyncio.sleep(0.01)
+        return ["ok"]
+
+    async def main():
+        for _ in range(5):
+            await h.run(shed, shed, key="k")
+            try:
+                await h.run(failed, shed, key="k")
+            except RuntimeError:
+                pass
+        await h.run(ok, shed, key="k")
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert len(h.latency("k")) == 1
+    assert h.delay("k") >= 0.01
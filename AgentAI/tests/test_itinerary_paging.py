@@ -0,0 +1,45 @@
+"""Itinerary pages are slices of the one schedule stored with the plan."""
+import asyncio
+
+import pytest
+
+import app as agent_app
+from plan_cache import plan_cache_from_env
+
+
+def _payload(cursor=None):
+    booking = agent_app.Booking(start_date="2026-05-01", end_date="2026-05-31", location="San Francisco", party_size=2)
+    return agent_app.AgentV2Input(booking=booking, preferences=agent_app.Preferences(), itinerary_cursor=cursor)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = plan_cache_from_env()
+    monkeypatch.setattr(agent_app, "plan_cache", cache)
+    monkeypatch.setattr(agent_app, "plan_store", None)
+    return cache
+
+
+def test_cached_plan_pages_slice_the_stored_schedule(cache, monkeypatch):
+    first = asyncio.run(agent_app._plan(_payload()))
+    days = first["_itinerary_days"]
+    assert first["itinerary_page"]["next_cursor"]
+
+    def no_reschedule(*a, **kw):
+        raise AssertionError("paging a cached plan must not reschedule")
+
+    monkeypatch.setattr(agent_app, "schedule_trip", no_reschedule)
+    pages, cursor = [first["itinerary"]], first["itinerary_page"]["next_cursor"]
+    while cursor:
+        resp = asyncio.run(agent_app._plan(_payload(cursor)))
+        assert resp["debug"]["plan_cache"]["hit"]
+        pages.append(resp["itinerary"])
+        cursor = resp["itinerary_page"]["next_cursor"]
+    served = [day["blocks"] for page in pages for day in page]
+    assert served[:len(days)] == days
+    assert len(served) == first["itinerary_page"]["days"]
+
+
+def test_stored_schedule_is_not_sent_to_clients():
+    body = agent_app._plan_body({"plan_version": "v", "itinerary": [], "_itinerary_days": [[]]}, True, "both")
+    assert "_itinerary_days" not in body
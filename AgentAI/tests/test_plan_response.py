@@ -0,0 +1,83 @@
+"""Plan responses: ETag and 304, Content-Encoding by Accept-Encoding, msgpack by Accept."""
+import pytest
+from fastapi.testclient import TestClient
+
+import app as agent_app
+
+URL = "/api/v1/concierge-agent?schema=new"
+BODY = {"booking": {"start_date": "2026-05-01", "end_date": "2026-05-03", "location": "San Francisco"},
+        "preferences": {}, "nlu_query": "museums with kids"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(agent_app, "plan_cache", None)
+    monkeypatch.setattr(agent_app, "plan_store", None)
+    return TestClient(agent_app.app)
+
+
+def _post(client, body=BODY, **headers):
+    return client.post(URL, json=body, headers={"Accept-Encoding": "identity", **headers})
+
+
+def test_matching_etag_gets_304(client):
+    first = _post(client)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.content
+
+    again = _post(client, **{"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["ETag"] == etag
+    assert _post(client, **{"If-None-Match": f"W/{etag}, \"other\""}).status_code == 304
+    assert _post(client, **{"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_encoded_etag_matches_the_same_plan(client):
+    gz = _post(client, **{"Accept-Encoding": "gzip"})
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gz.headers["ETag"].endswith('-gzip"')
+    # The encoded tag revalidates any encoding of the plan, and the plain tag an encoded request
+    assert _post(client, **{"If-None-Match": gz.headers["ETag"]}).status_code == 304
+    plain = _post(client).headers["ETag"]
+    assert _post(client, **{"Accept-Encoding": "gzip", "If-None-Match": plain}).status_code == 304
+
+
+def test_content_encoding_follows_accept_encoding(client):
+    assert "Content-Encoding" not in _post(client).headers
+    assert _post(client, **{"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+    if agent_app.BROTLI_AVAILABLE:
+        assert _post(client, **{"Accept-Encoding": "gzip, br"}).headers["Content-Encoding"] == "br"
+    assert "Accept-Encoding" in _post(client).headers["Vary"]
+    # Bodies are the same plan whatever the encoding
+    assert _post(client, **{"Accept-Encoding": "gzip"}).json() == _post(client).json()
+
+
+def test_etag_changes_with_plan_inputs(client):
+    etag = _post(client).headers["ETag"]
+    assert _post(client).headers["ETag"] == etag
+    other_dates = {**BODY, "booking": {**BODY["booking"], "end_date": "2026-05-04"}}
+    other_city = {**BODY, "booking": {**BODY["booking"], "location": "Austin"}}
+    other_prefs = {**BODY, "preferences": {"dietary": {"vegan": True}}}
+    tags = {etag} | {_post(client, body).headers["ETag"] for body in (other_dates, other_city, other_prefs)}
+    assert len(tags) == 4
+    assert _post(client, other_city, **{"If-None-Match": etag}).status_code == 200
+    # Debug output is per request, so it is never validated
+    assert "ETag" not in client.post(URL + "&debug=true", json=BODY).headers
+
+
+def test_msgpack_body_is_the_json_payload_with_its_own_etag(client):
+    msgpack = pytest.importorskip("msgpack")
+    js = _post(client)
+    mp = _post(client, Accept="application/msgpack")
+    assert mp.headers["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(mp.content, raw=False) == js.json()
+
+    # A distinct representation of the same plan: its own tag, revalidated like the JSON one
+    assert mp.headers["ETag"] == js.headers["ETag"][:-1] + '.mp"'
+    assert _post(client, Accept="application/msgpack", **{"If-None-Match": mp.headers["ETag"]}).status_code == 304
+    assert _post(client, Accept="application/msgpack", **{"If-None-Match": js.headers["ETag"]}).status_code == 200
+    gz = _post(client, Accept="application/msgpack", **{"Accept-Encoding": "gzip"})
+    assert gz.headers["ETag"] == mp.headers["ETag"][:-1] + '-gzip"'
+    assert msgpack.unpackb(gz.content, raw=False) == js.json()
+    assert _post(client, Accept="application/msgpack", **{"If-None-Match": gz.headers["ETag"]}).status_code == 304
+    # JSON still wins a tie
+    assert _post(client, Accept="application/json, application/msgpack").headers["ETag"] == js.headers["ETag"]
@@ -0,0 +1,50 @@
+"""Incremental property index sync against the fake cursor from the benchmark."""
+from datetime import datetime
+
+from benchmarks.bench_property_index import FakeDB
+from property_index import PropertyIndex
+
+T = datetime(2026, 5, 1, 12, 0, 0)
+
+
+def _row(pid, city="Seattle", price=100, updated_at=T, active=1):
+    return {"id": pid, "name": f"Listing {pid}", "city": city, "state": "WA", "country": "USA",
+            "price_per_night": price, "is_active": active, "latitude": None, "longitude": None,
+            "created_at": T, "updated_at": updated_at, "main_image": None}
+
+
+def _set(db, *rows):
+    by_id = {r["id"]: r for r in db.rows}
+    by_id.update({r["id"]: r for r in rows})
+    db.rows = sorted(by_id.values(), key=lambda r: (r["updated_at"], r["id"]))
+
+
+def test_row_written_later_in_the_watermark_second_is_picked_up():
+    db = FakeDB([_row(5)])
+    idx = PropertyIndex(db)
+    idx.full_sync()
+    # Committed after the load, in the same second, with a lower id than the watermark row
+    _set(db, _row(3, city="Portland"))
+    assert idx.incremental_sync() == 1
+    assert [p["id"] for p in idx.lookup("portland")] == [3]
+
+
+def test_update_within_the_same_second_is_applied():
+    db = FakeDB([_row(5)])
+    idx = PropertyIndex(db)
+    idx.full_sync()
+    _set(db, _row(5, price=150))
+    assert idx.incremental_sync() == 1
+    assert idx.lookup("seattle")[0]["price_per_night"] == 150
+
+
+def test_rereading_the_overlap_counts_no_changes():
+    db = FakeDB([_row(1), _row(2)])
+    idx = PropertyIndex(db)
+    idx.full_sync()
+    version = idx.version
+    assert idx.incremental_sync() == 0
+    assert idx.version == version and len(idx) == 2
+    _set(db, _row(2, active=0))
+    assert idx.incremental_sync() == 1
+    assert len(idx) == 1
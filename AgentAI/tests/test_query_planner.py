@@ -0,0 +1,44 @@
+"""Latency estimates of a depth the planner stopped using decay back to their seed."""
+import query_planner
+from query_planner import QueryPlanner
+
+INTENTS = ["weather", "events", "pois", "restaurants"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_slow_spell_does_not_pin_the_planner_to_reduced(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_planner.time, "monotonic", clock)
+    planner = QueryPlanner(budget_s=3.0, advanced_s=1.5, basic_s=0.8, alpha=1.0, half_life_s=60.0)
+    planner.observe("advanced", 9.0)
+    assert planner.plan(INTENTS, "Austin").level == "reduced"
+
+    # Only basic searches run now; advanced is never observed again but drifts back to its seed
+    clock.now += 60
+    planner.observe("basic", 0.8)
+    assert planner.estimate("advanced") == 1.5 + (9.0 - 1.5) / 2
+    clock.now += 240
+    assert planner.plan(INTENTS, "Austin").level == "full"
+
+
+def test_observation_folds_into_the_decayed_estimate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_planner.time, "monotonic", clock)
+    planner = QueryPlanner(basic_s=0.8, alpha=0.5, half_life_s=10.0)
+    planner.observe("basic", 4.8)
+    assert planner.estimate("basic") == 2.8
+    clock.now += 10
+    planner.observe("basic", 0.8)
+    assert planner.estimate("basic") == (0.8 + (2.8 - 0.8) / 2 + 0.8) / 2
+
+    pinned = QueryPlanner(basic_s=0.8, alpha=1.0, half_life_s=0)
+    pinned.observe("basic", 4.8)
+    clock.now += 1e6
+    assert pinned.estimate("basic") == 4.8
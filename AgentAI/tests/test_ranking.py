@@ -0,0 +1,28 @@
+"""Interest encoding in ranking.encode_candidates."""
+import ranking
+from ranking import PreferenceVector, _token_id, encode_candidates
+
+
+def test_interest_hits_beyond_64_interests():
+    # Token regex is [a-z]+, so spell the interests out: "topicaa", "topicab", ...
+    interests = [f"topic{chr(97 + i // 26)}{chr(97 + i % 26)}" for i in range(70)]
+    cands = [{"title": f"{interests[3]} {interests[69]}"}, {"title": f"{interests[64]}s"}, {"title": "nothing here"}]
+    hits = encode_candidates(cands, PreferenceVector(interests=interests))["interest"]
+    assert [list(map(int, row.nonzero()[0])) for row in hits] == [[3, 69], [64], []]
+
+
+def test_interest_table_does_not_grow_with_the_vocabulary(monkeypatch):
+    for i in range(50_000):
+        _token_id(f"filler{i}")
+    allocated = []
+    real_zeros = ranking.np.zeros
+
+    def zeros(shape, *a, **kw):
+        allocated.append(shape)
+        return real_zeros(shape, *a, **kw)
+
+    monkeypatch.setattr(ranking.np, "zeros", zeros)
+    hits = encode_candidates([{"title": "city museum"}], PreferenceVector(interests=["museum"]))["interest"]
+    assert hits.tolist() == [[True]]
+    sizes = [s if isinstance(s, int) else s[0] for s in allocated]
+    assert max(sizes) < 1000
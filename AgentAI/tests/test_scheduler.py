@@ -0,0 +1,121 @@
+"""Weighted fair dequeue order, shedding (full queue, passed deadline) and slot release on cancellation."""
+import asyncio
+import time
+
+import pytest
+
+from scheduler import ClassConfig, PriorityScheduler, SchedulerRejected
+
+
+def _scheduler(concurrency=1, queue=32, interactive_weight=3.0, background_queue=32):
+    return PriorityScheduler("test", concurrency, queue, {
+        "interactive": ClassConfig(weight=interactive_weight, max_concurrency=concurrency, max_queue=queue),
+        "background": ClassConfig(weight=1.0, max_concurrency=concurrency, max_queue=background_queue),
+    })
+
+
+async def _hold(sched, priority, release, order=None, **kwargs):
+    async with sched.slot(priority, **kwargs):
+        if order is not None:
+            order.append(priority)
+        await release.wait()
+
+
+def test_waiters_are_granted_in_proportion_to_class_weight():
+    sched = _scheduler(interactive_weight=3.0)
+    order = []
+
+    async def one(priority):
+        async with sched.slot(priority):
+            order.append(priority)
+            await asyncio.sleep(0)
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(sched, "interactive", release))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(one(p)) for p in ["background"] * 12 + ["interactive"] * 12]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+
+    asyncio.run(main())
+    # Background queued first, yet interactive gets three grants for each background one
+    assert order[:8].count("interactive") == 6 and order[:8].count("background") == 2
+    assert sorted(order) == ["background"] * 12 + ["interactive"] * 12
+
+
+def test_full_queue_rejects_and_sheds_background_first():
+    sched = _scheduler(queue=2)
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(sched, "interactive", release))
+        await asyncio.sleep(0)
+        bg = asyncio.ensure_future(_hold(sched, "background", release))
+        fg = asyncio.ensure_future(_hold(sched, "interactive", release))
+        await asyncio.sleep(0)
+        # Queue full: the background waiter makes room for interactive work...
+        late = asyncio.ensure_future(_hold(sched, "interactive", release))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerRejected):
+            await bg
+        # ...but nothing is left to shed for another background call
+        with pytest.raises(SchedulerRejected):
+            async with sched.slot("background"):
+                pass
+        release.set()
+        await asyncio.gather(holder, fg, late)
+        assert sched.snapshot() == {"interactive": {"running": 0, "queued": 0},
+                                    "background": {"running": 0, "queued": 0}}
+
+    asyncio.run(main())
+
+
+def test_deadline_rejects_before_queueing_and_sheds_queued_calls():
+    sched = _scheduler()
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(_hold(sched, "interactive", release))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerRejected, match="deadline passed"):
+            async with sched.slot("interactive", deadline=time.monotonic() - 1):
+                pass
+        t0 = time.monotonic()
+        with pytest.raises(SchedulerRejected, match="while queued"):
+            async with sched.slot("interactive", deadline=t0 + 0.02):
+                pass
+        assert time.monotonic() - t0 >= 0.02
+        assert sched.snapshot()["interactive"] == {"running": 1, "queued": 0}
+        release.set()
+        await holder
+        # With a free slot, a passed deadline does not stop the call
+        async with sched.slot("interactive", deadline=time.monotonic() - 1):
+            assert sched.snapshot()["interactive"]["running"] == 1
+
+    asyncio.run(main())
+
+
+def test_cancellation_releases_held_and_queued_slots():
+    sched = _scheduler()
+
+    async def main():
+        release = asyncio.Event()
+        order = []
+        holder = asyncio.ensure_future(_hold(sched, "interactive", release, order))
+        queued = asyncio.ensure_future(_hold(sched, "interactive", release, order))
+        await asyncio.sleep(0)
+        assert sched.snapshot()["interactive"] == {"running": 1, "queued": 1}
+        queued.cancel()
+        await asyncio.sleep(0)
+        assert sched.snapshot()["interactive"] == {"running": 1, "queued": 0}
+        holder.cancel()
+        await asyncio.sleep(0)
+        assert sched.snapshot()["interactive"] == {"running": 0, "queued": 0}
+        # The slot is free again
+        release.set()
+        await asyncio.wait_for(_hold(sched, "interactive", release, order), timeout=1)
+        assert order == ["interactive", "interactive"]
+
+    asyncio.run(main())
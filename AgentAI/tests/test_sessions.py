@@ -0,0 +1,40 @@
+"""Plan-session edits re-run only the stages a delta affects."""
+import pytest
+from fastapi.testclient import TestClient
+
+import app as agent_app
+from sessions import SessionStore, affected_stages
+
+BODY = {"booking": {"start_date": "2026-05-01", "end_date": "2026-05-03", "location": "San Francisco"},
+        "preferences": {}, "nlu_query": "museums with kids"}
+
+
+@pytest.fixture
+def client(monkeypatch, upstream):
+    monkeypatch.setattr(agent_app, "plan_sessions", SessionStore())
+    monkeypatch.setattr(agent_app, "plan_cache", None)
+    monkeypatch.setattr(agent_app, "plan_store", None)
+    return TestClient(agent_app.app)
+
+
+def test_diet_delta_recomputes_restaurants_and_dependents_only(client, upstream):
+    created = client.post("/api/v1/plan-sessions?debug=true", json=BODY)
+    assert created.status_code == 201
+    session_id = created.headers["X-Plan-Session"]
+    upstream.clear()
+
+    edited = client.patch(f"/api/v1/plan-sessions/{session_id}?debug=true",
+                          json={"preferences": {"dietary": {"vegan": True}}})
+    info = edited.json()["debug"]["session"]
+    assert info["kind"] == "edit" and info["changed"] == ["preferences.dietary.vegan"]
+    assert info["recomputed"] == ["restaurants", "activities", "itinerary", "properties"]
+    assert info["reused"] == ["weather", "events", "pois"]
+    # Only the restaurant search ran again, for the new diet
+    assert len(upstream) == 1 and "vegan" in upstream[0] and "restaurants" in upstream[0]
+    assert [r["name"] for r in edited.json()["restaurants"]][:1] == ["Greens vegan restaurant"]
+
+
+def test_stage_graph_follows_dependencies():
+    assert affected_stages(["preferences.dietary.vegan"]) == ["restaurants", "activities", "itinerary", "properties"]
+    assert affected_stages(["booking.end_date"]) == ["itinerary"]
+    assert affected_stages(["nlu_query"]) == ["activities", "itinerary", "properties"]
@@ -2,7 +2,7 @@ import React, { useState } from 'react'
 import { Link } from 'react-router-dom'
 import { agentApi } from '../services/api'
 
-export default function AgentAIModal({ show, onClose }) {
+export default function AgentAIModal({ show, onClose, booking }) {
   const [prompt, setPrompt] = useState('')
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
@@ -17,7 +17,14 @@ export default function AgentAIModal({ show, onClose }) {
     setResult(null)
     try {
       const payload = {
-        booking_context: {},
+        // A trip's booking lets the agent plan from the context precomputed for it
+        booking_context: booking ? {
+          booking_id: booking.id,
+          property_id: booking.property_id || booking.property?.id,
+          check_in: booking.check_in_date || booking.startDate,
+          check_out: booking.check_out_date || booking.endDate,
+          guests: booking.number_of_guests || booking.guests
+        } : {},
         preferences: {},
         local_context: {},
         nlu_prompt: prompt.trim()
@@ -4,6 +4,7 @@ import { bookingApi, propertyApi } from '../../services/api'
 import { useDispatch, useSelector } from 'react-redux'
 import { fetchTravelerBookings } from '../../store/travelerBookingSlice'
 import { getBackendOrigin } from '../../config'
+import AgentAIModal from '../../components/AgentAIModal'
 
 function StatusBadge({ status }) {
   const s = (status || '').toString().toLowerCase()
@@ -29,6 +30,7 @@ export default function Trips() {
   const [status, setStatus] = useState('')
   const [list, setList] = useState([])
   const [imgCache, setImgCache] = useState({})
+  const [conciergeFor, setConciergeFor] = useState(null)
   const dispatch = useDispatch()
   const travelerBookings = useSelector(state => state.travelerBookings?.items || [])
 
@@ -94,6 +96,11 @@ export default function Trips() {
                     <div className="text-end">
                       {total !== undefined && <div className="fw-semibold">{money(total)}</div>}
                       <StatusBadge status={b.status} />
+                      {(b.status || '').toString().toLowerCase() !== 'cancelled' && (
+                        <div className="mt-2">
+                          <button type="button" className="btn btn-sm btn-outline-secondary" onClick={() => setConciergeFor(b)}>Plan with AI</button>
+                        </div>
+                      )}
                     </div>
                   </div>
                 </div>
@@ -103,6 +110,7 @@ export default function Trips() {
         })}
       </div>
       {list.length === 0 && <p>No trips to show.</p>}
+      <AgentAIModal show={!!conciergeFor} booking={conciergeFor} onClose={() => setConciergeFor(null)} />
     </div>
   )
 }
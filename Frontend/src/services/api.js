@@ -519,6 +519,32 @@ export const favoriteApi = {
 // Agent AI (FastAPI) microservice
 const agentClient = axios.create({ baseURL: AGENT_API_BASE, headers: { 'Content-Type': 'application/json' }})
 
+// Last plan per request body: re-opening the panel revalidates with If-None-Match and reuses it on 304.
+// Small LRU (Map keeps insertion order; a hit is re-inserted as newest), so long sessions don't hold every plan.
+const AGENT_PLAN_CACHE_MAX = 20
+const agentPlanCache = new Map()
+
+const rememberPlan = (key, entry) => {
+  agentPlanCache.delete(key)
+  agentPlanCache.set(key, entry)
+  if (agentPlanCache.size > AGENT_PLAN_CACHE_MAX) agentPlanCache.delete(agentPlanCache.keys().next().value)
+}
+
 export const agentApi = {
-  conciergeAgent: (payload) => agentClient.post('/concierge-agent', payload)
+  conciergeAgent: async (payload) => {
+    const key = JSON.stringify(payload)
+    const cached = agentPlanCache.get(key)
+    const res = await agentClient.post('/concierge-agent', payload, {
+      headers: cached ? { 'If-None-Match': cached.etag } : {},
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+    })
+    if (res.status === 304 && cached) {
+      rememberPlan(key, cached)
+      return { ...res, data: cached.data }
+    }
+    const etag = res.headers?.etag
+    if (etag) rememberPlan(key, { etag, data: res.data })
+    else agentPlanCache.delete(key)
+    return res
+  }
 }
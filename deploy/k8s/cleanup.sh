@@ -17,6 +17,7 @@ if [[ $REPLY =~ ^[Yy]$ ]]; then
     
     kubectl delete -f deploy/k8s/10-ingress.yaml --ignore-not-found=true
     kubectl delete -f deploy/k8s/09-frontend.yaml --ignore-not-found=true
+    kubectl delete -f deploy/k8s/12-agentai-hpa.yaml --ignore-not-found=true
     kubectl delete -f deploy/k8s/08-agentai.yaml --ignore-not-found=true
     kubectl delete -f deploy/k8s/07-backend.yaml --ignore-not-found=true
     kubectl delete -f deploy/k8s/06-mysql.yaml --ignore-not-found=true
@@ -98,6 +98,14 @@ kubectl apply -f deploy/k8s/07-backend.yaml
 print_info "Deploying AgentAI..."
 kubectl apply -f deploy/k8s/08-agentai.yaml
 
+# Without the custom metrics API the saturation HPA never scales down, so keep the CPU HPA from 08-agentai.yaml
+if kubectl get apiservice v1beta1.custom.metrics.k8s.io &> /dev/null; then
+    print_info "Creating AgentAI saturation autoscaler..."
+    kubectl apply -f deploy/k8s/12-agentai-hpa.yaml
+else
+    print_info "Custom metrics API not installed: keeping the CPU autoscaler. Install prometheus-adapter with deploy/k8s/prometheus-adapter-agentai.yaml and re-run to scale on saturation"
+fi
+
 print_info "Deploying Frontend..."
 kubectl apply -f deploy/k8s/09-frontend.yaml
 